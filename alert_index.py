@@ -0,0 +1,205 @@
+import heapq
+from itertools import count
+from typing import Dict, Iterable, List, Optional, Tuple
+from crypto_api import alert_price_key
+from alert_record import AlertRecord
+
+# Alert types evaluated by AlertIndex; they fire once and are then marked in the DB
+RELATIVE_TYPES = ('percent', 'trailing')
+
+class _PeakGroup:
+    """Trailing alerts that share one running peak"""
+    __slots__ = ('peak', 'stops', 'alive')
+
+    def __init__(self, peak: float):
+        self.peak = peak
+        self.stops: List[Tuple[float, int]] = []  # min-heap of (drawdown fraction, alert_id)
+        self.alive = True
+
+    def stop_price(self) -> float:
+        return self.peak * (1 - self.stops[0][0])
+
+class TickerAlerts:
+    """Percent and trailing alerts of one ticker.
+
+    Percent alerts become two fixed bounds kept in heaps. Trailing alerts are
+    grouped by running peak in a stack whose peaks decrease from bottom to
+    top: a new price merges every group it exceeds into one (each group is
+    merged at most once, smaller heap into larger), and a max-heap of group
+    stop prices finds the groups that fire. A tick costs O(1) amortized plus
+    O(log n) per merged group or fired alert, independent of how many
+    alerts are armed.
+    """
+
+    def __init__(self):
+        self.upper: List[Tuple[float, int]] = []  # min-heap (bound, alert_id): fires when price >= bound
+        self.lower: List[Tuple[float, int]] = []  # max-heap (-bound, alert_id): fires when price <= bound
+        self.groups: List[_PeakGroup] = []
+        self.stop_heap: List[Tuple[float, int, _PeakGroup]] = []  # max-heap (-stop price, seq, group)
+        self.group_of: Dict[int, _PeakGroup] = {}
+        self.dirty = set()  # Groups whose peak changed since the last checkpoint
+        self.seq = count()
+
+    def add_percent(self, alert_id: int, base_price: float, percent: float):
+        heapq.heappush(self.upper, (base_price * (1 + percent / 100), alert_id))
+        heapq.heappush(self.lower, (-base_price * (1 - percent / 100), alert_id))
+
+    def add_trailing(self, alert_id: int, peak: float, percent: float):
+        group = self._group_at(peak)
+        heapq.heappush(group.stops, (percent / 100, alert_id))
+        self.group_of[alert_id] = group
+        self._push_stop(group)
+
+    def _push_stop(self, group: _PeakGroup):
+        if group.stops:
+            heapq.heappush(self.stop_heap, (-group.stop_price(), next(self.seq), group))
+
+    def _group_at(self, peak: float) -> _PeakGroup:
+        """Group with exactly this peak, created at its sorted place in the stack if missing.
+
+        Existing groups keep their peaks, so the result does not depend on
+        the order alerts are added in (only a price can raise a peak).
+        """
+        groups = self.groups
+        lo, hi = 0, len(groups)
+        while lo < hi:  # First group with peak <= `peak`; peaks decrease towards the top
+            mid = (lo + hi) // 2
+            if groups[mid].peak > peak:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(groups) and groups[lo].peak == peak:
+            return groups[lo]
+        group = _PeakGroup(peak)
+        groups.insert(lo, group)
+        return group
+
+    def _raise_peak(self, price: float) -> Optional[_PeakGroup]:
+        """Lift every group with peak <= price to price, merged into the top group"""
+        merged = []
+        while self.groups and self.groups[-1].peak <= price:
+            merged.append(self.groups.pop())
+        if not merged:
+            return None
+        # Reuse the largest group, move the others into it
+        merged.sort(key=lambda group: len(group.stops), reverse=True)
+        target = merged[0]
+        for group in merged[1:]:
+            group.alive = False
+            self.dirty.discard(group)
+            for item in group.stops:
+                heapq.heappush(target.stops, item)
+                self.group_of[item[1]] = target
+        if target.peak != price:
+            target.peak = price
+            self.dirty.add(target)
+        self.groups.append(target)
+        # Old stop entries of target now underestimate it; this one is current
+        self._push_stop(target)
+        return target
+
+    def evaluate(self, price: float, live: set) -> List[Tuple[int, float]]:
+        """Return (alert_id, reference price) of alerts fired by `price` and drop them from `live`"""
+        fired = []
+        while self.upper and self.upper[0][0] <= price:
+            _, alert_id = heapq.heappop(self.upper)
+            if alert_id in live:
+                live.discard(alert_id)
+                fired.append((alert_id, price))
+        while self.lower and -self.lower[0][0] >= price:
+            _, alert_id = heapq.heappop(self.lower)
+            if alert_id in live:
+                live.discard(alert_id)
+                fired.append((alert_id, price))
+
+        self._raise_peak(price)
+        while self.stop_heap and -self.stop_heap[0][0] >= price:
+            _, _, group = heapq.heappop(self.stop_heap)
+            if not group.alive:
+                continue
+            while group.stops and group.stop_price() >= price:
+                _, alert_id = heapq.heappop(group.stops)
+                self.group_of.pop(alert_id, None)
+                if alert_id in live:
+                    live.discard(alert_id)
+                    fired.append((alert_id, group.peak))
+            self._push_stop(group)
+        return fired
+
+    def peak_of(self, alert_id: int) -> Optional[float]:
+        group = self.group_of.get(alert_id)
+        return group.peak if group else None
+
+class AlertIndex:
+    """Incremental index of armed percent/trailing alerts, per ticker and quote currency"""
+
+    def __init__(self):
+        self.tickers: Dict[str, TickerAlerts] = {}
+        self.alerts: Dict[int, AlertRecord] = {}  # Armed alerts by id
+        self.live = set()
+        self.fired = set()  # Fired ids, ignored by sync until the source stops listing them
+        self.garbage = 0  # Heap entries of removed alerts, compacted when they pile up
+
+    def __len__(self) -> int:
+        return len(self.alerts)
+
+    def add(self, alert: AlertRecord):
+        ticker = self.tickers.setdefault(alert_price_key(alert), TickerAlerts())
+        alert_id = alert.id
+        if alert.threshold_type == 'percent':
+            ticker.add_percent(alert_id, alert.base_price, alert.threshold_price)
+        else:
+            peak = max(alert.peak_price or 0.0, alert.base_price)
+            ticker.add_trailing(alert_id, peak, alert.threshold_price)
+        self.alerts[alert_id] = alert
+        self.live.add(alert_id)
+
+    def remove(self, alert_id: int):
+        if self.alerts.pop(alert_id, None) is not None:
+            self.live.discard(alert_id)
+            self.garbage += 1
+
+    def sync(self, alerts: Iterable[AlertRecord]):
+        """Add new armed alerts and drop the ones no longer in `alerts`"""
+        seen = set()
+        for alert in alerts:
+            seen.add(alert.id)
+            if alert.id not in self.alerts and alert.id not in self.fired:
+                self.add(alert)
+        for alert_id in [alert_id for alert_id in self.alerts if alert_id not in seen]:
+            self.remove(alert_id)
+        self.fired &= seen
+        if self.garbage > len(self.alerts) + 1000:
+            self.compact()
+
+    def compact(self):
+        """Rebuild the heaps from the armed alerts, keeping trailing peaks"""
+        alerts = []
+        for alert_id, alert in self.alerts.items():
+            peak = self.tickers[alert_price_key(alert)].peak_of(alert_id)
+            alerts.append(alert.replace(peak_price=peak) if peak else alert)
+        self.tickers, self.alerts, self.live, self.garbage = {}, {}, set(), 0
+        for alert in alerts:
+            self.add(alert)
+
+    def evaluate(self, prices: Dict[str, float]) -> List[Tuple[AlertRecord, float, float]]:
+        """Return (alert, current price, reference price) for every alert fired by this snapshot"""
+        fired = []
+        for ticker, price in prices.items():
+            alerts = self.tickers.get(ticker)
+            if alerts is None or price is None:
+                continue
+            for alert_id, reference in alerts.evaluate(price, self.live):
+                fired.append((self.alerts.pop(alert_id), price, reference))
+                self.fired.add(alert_id)
+                self.garbage += 1  # The other bound of a percent alert stays in its heap
+        return fired
+
+    def checkpoint_peaks(self) -> List[Tuple[float, int]]:
+        """(peak, alert_id) of armed trailing alerts whose peak moved since the last call"""
+        rows = []
+        for ticker in self.tickers.values():
+            for group in ticker.dirty:
+                rows.extend((group.peak, alert_id) for _, alert_id in group.stops if alert_id in self.live)
+            ticker.dirty.clear()
+        return rows
@@ -0,0 +1,131 @@
+import csv
+import io
+import json
+import math
+import re
+from typing import Dict, Iterable, List, Tuple
+from alert_record import UserAlertRecord
+from alert_index import RELATIVE_TYPES
+from config import CURRENCY_SYMBOLS, DEFAULT_CURRENCY
+
+# Columns of the import/export format (CSV header or JSON object keys); only the first three are required
+FIELDS = ('ticker', 'type', 'value', 'currency', 'base_price', 'once', 'expires_at')
+ALERT_TYPES = ('above', 'below') + RELATIVE_TYPES
+DURATION_UNITS = {'h': 3600, 'd': 86400}
+
+def parse_alerts_file(data: bytes, filename: str, now: int) -> Tuple[List[Dict], List[str]]:
+    """Parse a CSV or JSON alert list into validated rows and per-line error messages.
+
+    Tickers are only checked for shape here; the caller validates them
+    against the symbol index in one pass.
+    """
+    try:
+        text = data.decode('utf-8-sig')
+        if filename.lower().endswith('.json') or text.lstrip().startswith(('[', '{')):
+            items = json.loads(text)
+            if isinstance(items, dict):
+                items = items.get('alerts', [])
+            if not isinstance(items, list):
+                return [], ["JSON must be a list of alerts"]
+            entries = [(i, item) for i, item in enumerate(items, 1)]
+        else:
+            reader = csv.DictReader(io.StringIO(text))
+            entries = [(reader.line_num, item) for item in reader]
+    except (ValueError, csv.Error) as e:
+        return [], [f"Unreadable file: {e}"]
+
+    rows, errors = [], []
+    for line, item in entries:
+        try:
+            if not isinstance(item, dict):
+                raise ValueError("expected an object")
+            row = parse_alert_row({str(key).strip().lower(): value for key, value in item.items() if key}, now)
+        except (ValueError, TypeError) as e:
+            errors.append(f"line {line}: {e}")
+            continue
+        row['line'] = line
+        rows.append(row)
+    return rows, errors
+
+def finite(text: str, name: str) -> float:
+    """float() that refuses nan and inf"""
+    number = float(text)
+    if not math.isfinite(number):
+        raise ValueError(f"{name} must be a finite number")
+    return number
+
+def parse_alert_row(item: Dict, now: int) -> Dict:
+    """Validate one alert, raising ValueError with a short reason"""
+    def field(name):
+        value = item.get(name)
+        return str(value).strip() if value is not None else ''
+
+    ticker = field('ticker').upper()
+    if not 2 <= len(ticker) <= 10 or not ticker.isalnum():
+        raise ValueError(f"bad ticker '{ticker}'")
+    alert_type = field('type').lower()
+    if alert_type not in ALERT_TYPES:
+        raise ValueError(f"type must be one of {', '.join(ALERT_TYPES)}")
+    value = finite(field('value').replace(',', '').rstrip('%'), 'value')
+    if alert_type in RELATIVE_TYPES and not 0 < value < 100:
+        raise ValueError("percent must be between 0 and 100")
+    if value <= 0:
+        raise ValueError("price must be positive")
+
+    currency = field('currency').lower() or DEFAULT_CURRENCY
+    if currency not in CURRENCY_SYMBOLS:
+        raise ValueError(f"unsupported currency '{currency}'")
+    if alert_type in RELATIVE_TYPES and currency != DEFAULT_CURRENCY:
+        raise ValueError("percent and trailing alerts are USD only")
+    # A trailing alert starts from the current price: a file must not set the peak it trails
+    base_price = finite(field('base_price'), 'base_price') if field('base_price') and alert_type != 'trailing' else None
+    if base_price is not None and base_price <= 0:
+        raise ValueError("base_price must be positive")
+
+    expires_at = None
+    expires = field('expires_at').lower()
+    if expires:
+        duration = re.fullmatch(r'(\d+)([hd])', expires)
+        expires_at = now + int(duration.group(1)) * DURATION_UNITS[duration.group(2)] if duration else int(finite(expires, 'expires_at'))
+        if expires_at <= now:
+            raise ValueError("already expired")
+
+    once = field('once').lower() in ('1', 'true', 'yes')
+    return {
+        'ticker': ticker,
+        'type': alert_type,
+        'value': value,
+        'currency': currency,
+        'base_price': base_price,
+        # Percent/trailing alerts always fire once, like the ones added through the dialog
+        'once': once or expires_at is not None or alert_type in RELATIVE_TYPES,
+        'expires_at': expires_at,
+    }
+
+def export_rows(alerts: Iterable[UserAlertRecord], now: int) -> Iterable[Dict]:
+    """Armed alerts in the import format (trailing alerts restart from the current price, so no base_price)"""
+    for alert in alerts:
+        if alert.triggered_at or (alert.expires_at and alert.expires_at <= now):
+            continue
+        base_price = alert.base_price if alert.threshold_type != 'trailing' else None
+        yield {
+            'ticker': alert.coin_ticker,
+            'type': alert.threshold_type,
+            'value': alert.threshold_price,
+            'currency': alert.currency,
+            'base_price': base_price if base_price is not None else '',
+            'once': int(alert.one_shot),
+            'expires_at': alert.expires_at or '',
+        }
+
+def dump_alerts(alerts: Iterable[UserAlertRecord], fmt: str, now: int) -> bytes:
+    """Serialize alerts as CSV or JSON in the import format"""
+    rows = export_rows(alerts, now)
+    if fmt == 'json':
+        return json.dumps([{key: value for key, value in row.items() if value != ''} for row in rows],
+                          indent=1, ensure_ascii=False).encode('utf-8')
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=FIELDS)
+    writer.writeheader()
+    writer.writerows(rows)
+    return buffer.getvalue().encode('utf-8')
@@ -0,0 +1,56 @@
+from config import DEFAULT_CURRENCY
+
+class AlertRecord:
+    """An armed alert as the monitor evaluates it: only the columns it reads, no per-row dict"""
+    __slots__ = ('id', 'user_id', 'coin_ticker', 'threshold_type', 'threshold_price',
+                 'base_price', 'peak_price', 'one_shot', 'currency')
+
+    def __init__(self, id: int, user_id: int, coin_ticker: str, threshold_type: str, threshold_price: float,
+                 base_price: float = None, peak_price: float = None, one_shot: int = 0,
+                 currency: str = DEFAULT_CURRENCY):
+        self.id = id
+        self.user_id = user_id
+        self.coin_ticker = coin_ticker
+        self.threshold_type = threshold_type
+        self.threshold_price = threshold_price
+        self.base_price = base_price
+        self.peak_price = peak_price
+        self.one_shot = bool(one_shot)
+        self.currency = currency or DEFAULT_CURRENCY
+
+    @classmethod
+    def fields(cls) -> tuple:
+        """Attribute names in constructor (and SELECT) order, including subclass slots"""
+        names = ()
+        for klass in reversed(cls.__mro__[:-1]):
+            names += klass.__slots__
+        return names
+
+    @classmethod
+    def columns(cls, table: str = '') -> str:
+        """SELECT list matching the constructor, e.g. `a.id, a.user_id, ...`"""
+        prefix = f"{table}." if table else ''
+        return ', '.join(prefix + name for name in cls.fields())
+
+    def replace(self, **changes):
+        """Copy with some attributes changed"""
+        values = {name: getattr(self, name) for name in self.fields()}
+        values.update(changes)
+        return type(self)(**values)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({', '.join(f'{name}={getattr(self, name)!r}' for name in self.fields())})"
+
+class UserAlertRecord(AlertRecord):
+    """An alert as listed to its owner: the monitor columns plus creation, firing and expiry times"""
+    __slots__ = ('created_at', 'triggered_at', 'expires_at')
+
+    def __init__(self, id: int, user_id: int, coin_ticker: str, threshold_type: str, threshold_price: float,
+                 base_price: float = None, peak_price: float = None, one_shot: int = 0,
+                 currency: str = DEFAULT_CURRENCY, created_at: str = None, triggered_at: int = None,
+                 expires_at: int = None):
+        super().__init__(id, user_id, coin_ticker, threshold_type, threshold_price,
+                         base_price, peak_price, one_shot, currency)
+        self.created_at = created_at
+        self.triggered_at = triggered_at
+        self.expires_at = expires_at
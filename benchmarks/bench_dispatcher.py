@@ -0,0 +1,189 @@
+"""Load test for the aiogram handlers in bot.py.
+
+Feeds synthetic Update objects straight into `dp.feed_update` with a Bot
+whose session never touches the network, replays a mix of realistic user
+flows from many virtual users at once and reports p50/p99 handler latency,
+throughput and event-loop lag:
+
+    python benchmarks/bench_dispatcher.py --users 200 --rounds 5 --mix start=1,add_coin=2,prices=1,auto=1
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault('BOT_TOKEN', '123456:BENCHMARK')
+os.environ.setdefault('METRICS_PORT', '0')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import SendMessage, EditMessageText
+from aiogram.types import Update, Message, Chat, User, CallbackQuery
+
+_message_ids = itertools.count(1)
+_update_ids = itertools.count(1)
+
+class FakeSession(BaseSession):
+    """Bot API session answering every method locally"""
+
+    def __init__(self, latency: float = 0.0):
+        super().__init__()
+        self.latency = latency
+        self.calls = Counter()
+
+    async def make_request(self, bot, method, timeout=None):
+        self.calls[type(method).__name__] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if isinstance(method, (SendMessage, EditMessageText)):
+            chat_id = method.chat_id or 0
+            message = Message(
+                message_id=getattr(method, 'message_id', None) or next(_message_ids),
+                date=datetime.now(),
+                chat=Chat(id=chat_id, type='private'),
+                text=method.text,
+            )
+            return message.as_(bot)
+        return True
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        yield b''
+
+    async def close(self):
+        pass
+
+def make_message(bot: Bot, user_id: int, text: str) -> Update:
+    user = User(id=user_id, is_bot=False, first_name=f"Load{user_id}", username=f"load{user_id}")
+    message = Message(
+        message_id=next(_message_ids), date=datetime.now(),
+        chat=Chat(id=user_id, type='private'), from_user=user, text=text,
+    )
+    return Update(update_id=next(_update_ids), message=message)
+
+def make_callback(bot: Bot, user_id: int, data: str) -> Update:
+    user = User(id=user_id, is_bot=False, first_name=f"Load{user_id}", username=f"load{user_id}")
+    message = Message(
+        message_id=next(_message_ids), date=datetime.now(),
+        chat=Chat(id=user_id, type='private'), from_user=user, text="...",
+    )
+    callback = CallbackQuery(id=str(next(_update_ids)), from_user=user, chat_instance="bench",
+                             message=message, data=data)
+    return Update(update_id=next(_update_ids), callback_query=callback)
+
+# Flows: list of (label, kind, payload)
+FLOWS = {
+    'start': [('start', 'message', '/start')],
+    'add_coin': [
+        ('add_coin', 'message', '➕ Add Coin'),
+        ('ticker', 'message', '{ticker}'),
+        ('type', 'callback', 'type_above'),
+        ('price', 'message', '{price}'),
+    ],
+    'prices': [('prices', 'message', '/prices')],
+    'auto': [('auto_menu', 'message', '⚡ Auto-Alerts'), ('auto_toggle', 'message', 'Enable')],
+    'alerts': [('my_alerts', 'message', '📋 My Alerts')],
+}
+
+async def loop_lag_probe(samples: list, stop: asyncio.Event, interval: float = 0.01):
+    """Measure how late the event loop wakes up a sleeping task"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - started - interval)
+
+async def virtual_user(dp, bot, user_id: int, rounds: int, mix: list, tickers: list, rng: random.Random,
+                       latencies: dict):
+    await dp.feed_update(bot, make_message(bot, user_id, '/start'))
+    for _ in range(rounds):
+        flow = rng.choice(mix)
+        for label, kind, payload in FLOWS[flow]:
+            payload = payload.format(ticker=rng.choice(tickers), price=rng.randint(1, 60000))
+            update = make_message(bot, user_id, payload) if kind == 'message' else make_callback(bot, user_id, payload)
+            started = time.perf_counter()
+            await dp.feed_update(bot, update)
+            latencies[label].append(time.perf_counter() - started)
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+async def run(args):
+    from mock_services import MockPriceServer, synthetic_tickers
+
+    tickers = synthetic_tickers(args.tickers)
+    server = MockPriceServer(tickers, latency=args.api_latency)
+    await server.start()
+
+    import bot as bot_module
+    bot_module.crypto_api.base_url = server.coingecko_url
+    bot_module.crypto_api.binance_url = server.binance_url
+
+    session = FakeSession(latency=args.send_latency)
+    fake_bot = Bot(token=os.environ['BOT_TOKEN'], session=session)
+
+    mix = []
+    for item in args.mix.split(','):
+        name, _, weight = item.partition('=')
+        mix.extend([name] * int(weight or 1))
+
+    rng = random.Random(args.seed)
+    latencies = defaultdict(list)
+    lag_samples = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(loop_lag_probe(lag_samples, stop))
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(
+            virtual_user(bot_module.dp, fake_bot, 10_000 + i, args.rounds, mix, tickers, rng, latencies)
+            for i in range(args.users)
+        ))
+    finally:
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await probe
+        await bot_module.crypto_api.close_session()
+        await server.stop()
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    print(f"{'handler':<12} {'count':>7} {'p50 ms':>9} {'p99 ms':>9}")
+    for label, values in sorted(latencies.items()):
+        print(f"{label:<12} {len(values):>7} {statistics.median(values) * 1000:>9.2f} {percentile(values, 99) * 1000:>9.2f}")
+    print(f"\nupdates: {len(all_latencies)} in {elapsed:.2f}s -> {len(all_latencies) / elapsed:.1f} updates/s")
+    print(f"overall p50 {statistics.median(all_latencies) * 1000:.2f} ms, p99 {percentile(all_latencies, 99) * 1000:.2f} ms")
+    if lag_samples:
+        print(f"event-loop lag p50 {statistics.median(lag_samples) * 1000:.2f} ms, "
+              f"p99 {percentile(lag_samples, 99) * 1000:.2f} ms, max {max(lag_samples) * 1000:.2f} ms")
+    print(f"Bot API calls: {dict(session.calls)}")
+    print(f"Upstream price requests: {dict(server.requests)}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Dispatcher load test for bot.py handlers")
+    parser.add_argument('--users', type=int, default=100, help="concurrent virtual users")
+    parser.add_argument('--rounds', type=int, default=5, help="flows per user")
+    parser.add_argument('--mix', default='start=1,add_coin=2,prices=1,auto=1,alerts=1',
+                        help=f"weighted flows: {', '.join(FLOWS)}")
+    parser.add_argument('--tickers', type=int, default=20)
+    parser.add_argument('--api-latency', type=float, default=0.05, help="mock price API latency in seconds")
+    parser.add_argument('--send-latency', type=float, default=0.0, help="fake Bot API latency in seconds")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.environ['DATABASE_PATH'] = os.path.join(tmp_dir, 'bench.db')
+        asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
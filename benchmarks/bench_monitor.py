@@ -0,0 +1,187 @@
+"""Offline PriceMonitor benchmark.
+
+Seeds a throw-away database with synthetic users/alerts, points CryptoAPI at
+local mock CoinGecko/Binance servers and Bot.send_message at a fake sink,
+then runs monitor ticks and reports latency, throughput, memory and request
+counts. Compare against a stored baseline to catch regressions:
+
+    python benchmarks/bench_monitor.py --alerts 100000 --save-baseline
+    python benchmarks/bench_monitor.py --alerts 100000 --baseline benchmarks/baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Project modules read these at import time
+os.environ.setdefault('BOT_TOKEN', '123456:BENCHMARK')
+os.environ.setdefault('METRICS_PORT', '0')
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+# Report keys where a higher value is a regression
+LOWER_IS_BETTER = ('tick_p50', 'tick_p99', 'tick_max', 'peak_rss_mb', 'upstream_requests_per_tick')
+HIGHER_IS_BETTER = ('alerts_per_second',)
+
+def seed_database(db_path: str, users: int, alerts: int, tickers: list, auto_users: float, seed: int, prices: dict):
+    """Insert synthetic users, alerts and auto-alerts in bulk"""
+    rng = random.Random(seed)
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany(
+            'INSERT INTO users (user_id, username, first_name) VALUES (?, ?, ?)',
+            ((user_id, f"user{user_id}", "Bench") for user_id in range(1, users + 1))
+        )
+
+        def alert_rows():
+            for _ in range(alerts):
+                ticker = rng.choice(tickers)
+                threshold_type = rng.choice(('above', 'below'))
+                # Thresholds within ±10% of the start price so some of them trigger
+                threshold = prices[ticker] * rng.uniform(0.9, 1.1)
+                yield (rng.randint(1, users), ticker, threshold_type, threshold)
+
+        conn.executemany(
+            'INSERT INTO alerts (user_id, coin_ticker, threshold_type, threshold_price) VALUES (?, ?, ?, ?)',
+            alert_rows()
+        )
+        auto_count = int(users * auto_users)
+        conn.executemany(
+            'INSERT OR REPLACE INTO auto_alerts (user_id, coin_ticker, enabled) VALUES (?, ?, 1)',
+            ((user_id, ticker) for user_id in range(1, auto_count + 1) for ticker in tickers[:8])
+        )
+        conn.commit()
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list:
+    """Return human readable regressions of `report` against `baseline`"""
+    regressions = []
+    for key in LOWER_IS_BETTER:
+        if key in baseline and baseline[key] and report[key] > baseline[key] * (1 + tolerance):
+            regressions.append(f"{key}: {report[key]:.4f} vs baseline {baseline[key]:.4f}")
+    for key in HIGHER_IS_BETTER:
+        if key in baseline and baseline[key] and report[key] < baseline[key] * (1 - tolerance):
+            regressions.append(f"{key}: {report[key]:.4f} vs baseline {baseline[key]:.4f}")
+    return regressions
+
+async def run(args) -> dict:
+    from mock_services import MockPriceServer, FakeBot, synthetic_tickers
+
+    tickers = synthetic_tickers(args.tickers)
+    server = MockPriceServer(tickers, latency=args.latency, rate_limit_every=args.rate_limit_every,
+                             binance_only=args.binance_only, seed=args.seed)
+    await server.start()
+
+    # Imported after the environment is prepared
+    from database import Database
+    from monitor import PriceMonitor
+    import monitor as monitor_module
+    from sender import NotificationSender
+    import config
+
+    db = Database()
+    seed_started = time.perf_counter()
+    seed_database(db.db_path, args.users, args.alerts, tickers, args.auto_users, args.seed, server.prices)
+    seed_seconds = time.perf_counter() - seed_started
+
+    bot = FakeBot(latency=args.send_latency)
+    sender = NotificationSender(bot, rate=args.send_rate or config.SEND_RATE_LIMIT)
+    monitor = PriceMonitor(bot, sender=sender)
+    monitor.crypto_api.base_url = server.coingecko_url
+    monitor.crypto_api.binance_url = server.binance_url
+    # No snapshot writes inside the timed ticks (monitor.py binds the interval at import)
+    monitor_module.STATE_SNAPSHOT_INTERVAL = float('inf')
+
+    durations = []
+    requests_before = sum(v for k, v in server.requests.items() if ':' not in k)
+    try:
+        for _ in range(args.ticks):
+            server.move_prices(args.volatility)
+            # Every tick is a fresh minute for the price cache
+            monitor.crypto_api.price_cache.clear()
+            started = time.perf_counter()
+            await monitor.run_tick()
+            durations.append(time.perf_counter() - started)
+    finally:
+        await sender.stop()
+        await monitor.crypto_api.close_session()
+        await server.stop()
+
+    upstream = sum(v for k, v in server.requests.items() if ':' not in k) - requests_before
+    total_time = sum(durations)
+    return {
+        'users': args.users,
+        'alerts': args.alerts,
+        'tickers': args.tickers,
+        'ticks': args.ticks,
+        'seed_seconds': seed_seconds,
+        'tick_p50': statistics.median(durations),
+        'tick_p99': percentile(durations, 99),
+        'tick_max': max(durations),
+        'alerts_per_second': args.alerts * args.ticks / total_time if total_time else 0.0,
+        'messages_sent': bot.sent,
+        'upstream_requests_per_tick': upstream / args.ticks,
+        'requests': dict(server.requests),
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline PriceMonitor benchmark")
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--alerts', type=int, default=1000, help="1k .. 1M synthetic alerts")
+    parser.add_argument('--tickers', type=int, default=50)
+    parser.add_argument('--ticks', type=int, default=5)
+    parser.add_argument('--auto-users', type=float, default=0.1, help="fraction of users with auto-alerts")
+    parser.add_argument('--latency', type=float, default=0.0, help="mock API latency in seconds")
+    parser.add_argument('--rate-limit-every', type=int, default=0, help="answer 429 to every N-th CoinGecko request")
+    parser.add_argument('--binance-only', type=float, default=0.0, help="fraction of tickers unknown to CoinGecko")
+    parser.add_argument('--send-latency', type=float, default=0.0, help="fake Telegram latency in seconds")
+    parser.add_argument('--send-rate', type=float, default=0.0,
+                        help="messages per second through the sender (default: SEND_RATE_LIMIT)")
+    parser.add_argument('--volatility', type=float, default=0.02)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help="store this run as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.15, help="allowed relative regression")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.environ['DATABASE_PATH'] = os.path.join(tmp_dir, 'bench.db')
+        os.environ['STATE_SNAPSHOT_PATH'] = os.path.join(tmp_dir, 'monitor_state.snapshot')
+        report = asyncio.run(run(args))
+
+    print(json.dumps(report, indent=2))
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        workload = ('users', 'alerts', 'tickers', 'ticks')
+        if any(baseline.get(key) != report[key] for key in workload):
+            print("Baseline was recorded with a different workload, not comparing")
+            return
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print("REGRESSIONS:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print("No regressions against baseline")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Local stand-ins for CoinGecko, Binance and the Telegram Bot API used by the benchmarks"""
+import asyncio
+import random
+from collections import Counter
+from typing import Dict, List, Optional
+from aiohttp import web
+
+def synthetic_tickers(count: int) -> List[str]:
+    """Deterministic ticker symbols: C0000, C0001, ..."""
+    return [f"C{i:04d}" for i in range(count)]
+
+class MockPriceServer:
+    """aiohttp server emulating the CoinGecko and Binance endpoints used by CryptoAPI.
+
+    - `latency`: seconds added to every response
+    - `rate_limit_every`: every N-th CoinGecko request answers 429 (0 disables)
+    - `binance_only`: fraction of tickers unknown to CoinGecko (served by Binance only)
+    """
+
+    def __init__(self, tickers: List[str], latency: float = 0.0, rate_limit_every: int = 0,
+                 binance_only: float = 0.0, seed: int = 42):
+        self.rng = random.Random(seed)
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.prices: Dict[str, float] = {ticker: self.rng.uniform(0.1, 50000) for ticker in tickers}
+        cutoff = int(len(tickers) * (1 - binance_only))
+        self.gecko_ids: Dict[str, str] = {ticker: ticker.lower() + "-coin" for ticker in tickers[:cutoff]}
+        self.id_to_ticker = {coin_id: ticker for ticker, coin_id in self.gecko_ids.items()}
+        self.requests = Counter()
+        self.runner: Optional[web.AppRunner] = None
+        self.port = 0
+
+    @property
+    def coingecko_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/coingecko/api/v3"
+
+    @property
+    def binance_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/binance/api/v3"
+
+    def move_prices(self, volatility: float = 0.02):
+        """Random walk step for every price"""
+        for ticker, price in self.prices.items():
+            self.prices[ticker] = max(1e-6, price * (1 + self.rng.gauss(0, volatility)))
+
+    async def _delay(self):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def _rate_limited(self) -> bool:
+        total = self.requests['coingecko']
+        return bool(self.rate_limit_every) and total % self.rate_limit_every == 0
+
+    async def simple_price(self, request: web.Request) -> web.Response:
+        self.requests['coingecko'] += 1
+        self.requests['coingecko:simple/price'] += 1
+        await self._delay()
+        if self._rate_limited():
+            self.requests['coingecko:429'] += 1
+            return web.json_response({'status': {'error_code': 429}}, status=429)
+        currencies = request.query.get('vs_currencies', 'usd').split(',')
+        data = {}
+        for coin_id in request.query.get('ids', '').split(','):
+            ticker = self.id_to_ticker.get(coin_id)
+            if ticker:
+                # Non-USD quotes use fixed synthetic rates
+                rates = {'usd': 1.0, 'eur': 0.92, 'uah': 41.5, 'gbp': 0.79}
+                data[coin_id] = {cur: self.prices[ticker] * rates.get(cur, 1.0) for cur in currencies}
+        return web.json_response(data)
+
+    async def search(self, request: web.Request) -> web.Response:
+        self.requests['coingecko'] += 1
+        self.requests['coingecko:search'] += 1
+        await self._delay()
+        query = request.query.get('query', '').upper()
+        coin_id = self.gecko_ids.get(query)
+        coins = [{'id': coin_id, 'symbol': query.lower(), 'name': query}] if coin_id else []
+        return web.json_response({'coins': coins})
+
+    async def coins_list(self, request: web.Request) -> web.Response:
+        self.requests['coingecko'] += 1
+        self.requests['coingecko:coins/list'] += 1
+        await self._delay()
+        return web.json_response([
+            {'id': coin_id, 'symbol': ticker.lower(), 'name': f"{ticker} Coin"}
+            for ticker, coin_id in self.gecko_ids.items()
+        ])
+
+    async def binance_price(self, request: web.Request) -> web.Response:
+        self.requests['binance'] += 1
+        await self._delay()
+        symbol = request.query.get('symbol', '')
+        ticker = symbol[:-4] if symbol.endswith('USDT') else symbol
+        if ticker not in self.prices:
+            return web.json_response({'code': -1121, 'msg': 'Invalid symbol.'}, status=400)
+        return web.json_response({'symbol': symbol, 'price': f"{self.prices[ticker]:.8f}"})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/coingecko/api/v3/simple/price', self.simple_price)
+        app.router.add_get('/coingecko/api/v3/search', self.search)
+        app.router.add_get('/coingecko/api/v3/coins/list', self.coins_list)
+        app.router.add_get('/binance/api/v3/ticker/price', self.binance_price)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, '127.0.0.1', self.port).start()
+        self.port = self.runner.addresses[0][1]
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+
+class FakeBot:
+    """Stand-in for aiogram's Bot that only records send_message calls"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.sent = 0
+        self.sent_by_user = Counter()
+
+    async def send_message(self, chat_id: int, text: str, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.sent += 1
+        self.sent_by_user[chat_id] += 1
+
+class RecordingSender:
+    """Stand-in for NotificationSender that delivers instantly and keeps the messages"""
+
+    def __init__(self):
+        self.messages = []
+
+    def submit(self, chat_id: int, text: str, **kwargs) -> asyncio.Future:
+        self.messages.append((chat_id, text))
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(True)
+        return future
+
+    async def drain(self, timeout: float):
+        pass
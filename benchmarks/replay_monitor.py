@@ -0,0 +1,151 @@
+"""Accelerated PriceMonitor replay.
+
+Feeds a recorded price tape (PRICE_TAPE_PATH) or a synthetic random walk
+through PriceMonitor.evaluate_snapshot with a virtual clock, so a day of
+ticks is evaluated in seconds. Alerts are seeded into a throw-away
+database around the tape's first prices; every notification is logged with
+its virtual timestamp, so trigger behaviour can be pinned and re-checked:
+
+    python benchmarks/replay_monitor.py --ticks 1440 --save-triggers triggers.tsv
+    python benchmarks/replay_monitor.py --ticks 1440 --check-triggers triggers.tsv
+    python benchmarks/replay_monitor.py --tape monitor.tape.gz --alerts 100000
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Project modules read these at import time
+os.environ.setdefault('BOT_TOKEN', '123456:BENCHMARK')
+os.environ.setdefault('METRICS_PORT', '0')
+os.environ['PRICE_TAPE_PATH'] = ''
+
+class VirtualClock:
+    """Time source set by the replay loop instead of the wall clock"""
+
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+def load_frames(args) -> list:
+    from tape import read_tape, synthetic_tape
+    from mock_services import synthetic_tickers
+
+    if args.tape:
+        frames = list(read_tape(args.tape))
+        return frames[:args.ticks] if args.ticks else frames
+    rng = random.Random(args.seed)
+    start_prices = {ticker: rng.uniform(0.1, 50000) for ticker in synthetic_tickers(args.tickers)}
+    return list(synthetic_tape(start_prices, args.ticks or 1440, start=1_700_000_000,
+                               volatility=args.volatility, seed=args.seed))
+
+def seed_relative_alerts(db_path: str, users: int, count: int, tickers: list, seed: int, prices: dict):
+    """Insert percent and trailing alerts measured from the tape's first prices"""
+    rng = random.Random(seed + 1)
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany(
+            '''INSERT INTO alerts (user_id, coin_ticker, threshold_type, threshold_price, base_price)
+               VALUES (?, ?, ?, ?, ?)''',
+            ((rng.randint(1, users), ticker, rng.choice(('percent', 'trailing')), round(rng.uniform(1, 15), 1), prices[ticker])
+             for ticker in (rng.choice(tickers) for _ in range(count)))
+        )
+        conn.commit()
+
+async def run(args) -> dict:
+    from bench_monitor import seed_database
+    from mock_services import FakeBot, RecordingSender
+    from database import Database
+    from monitor import PriceMonitor
+
+    frames = load_frames(args)
+    if not frames:
+        raise SystemExit("Tape is empty")
+    first_prices = frames[0][1]
+    tickers = sorted(first_prices)
+
+    db = Database()
+    seed_database(db.db_path, args.users, args.alerts, tickers, args.auto_users, args.seed, first_prices)
+    seed_relative_alerts(db.db_path, args.users, args.relative_alerts, tickers, args.seed, first_prices)
+    sender = RecordingSender()
+    monitor = PriceMonitor(FakeBot(), sender=sender)
+    clock = VirtualClock()
+    monitor.clock = clock
+
+    # Alerts are static during a replay: read them once, like one long tick
+    alerts = db.get_all_alerts()
+    user_coins = monitor.get_auto_alert_coins()
+    followed = set(alert.coin_ticker for alert in alerts)
+    for coins in user_coins.values():
+        followed.update(coins)
+
+    triggers = []
+    started = time.perf_counter()
+    for timestamp, prices in frames:
+        clock.now = timestamp
+        await monitor.evaluate_snapshot(prices, alerts, user_coins, timestamp, followed)
+        for chat_id, text in sender.messages:
+            triggers.append(f"{timestamp}\t{chat_id}\t{text.splitlines()[0]}")
+        sender.messages.clear()
+    elapsed = time.perf_counter() - started
+
+    return {
+        'ticks': len(frames),
+        'tickers': len(tickers),
+        'alerts': len(alerts),
+        'virtual_seconds': frames[-1][0] - frames[0][0],
+        'wall_seconds': elapsed,
+        'ticks_per_second': len(frames) / elapsed if elapsed else 0.0,
+        'triggers': len(triggers),
+        'triggers_sha256': hashlib.sha256('\n'.join(triggers).encode()).hexdigest(),
+    }, triggers
+
+def main():
+    parser = argparse.ArgumentParser(description="Accelerated PriceMonitor replay")
+    parser.add_argument('--tape', help="recorded tape (default: synthetic random walk)")
+    parser.add_argument('--ticks', type=int, default=0, help="frames to replay (synthetic default: 1440, one day)")
+    parser.add_argument('--tickers', type=int, default=50, help="synthetic tickers")
+    parser.add_argument('--volatility', type=float, default=0.01, help="synthetic per-tick volatility")
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--alerts', type=int, default=10000)
+    parser.add_argument('--relative-alerts', type=int, default=0, help="percent/trailing alerts to seed")
+    parser.add_argument('--auto-users', type=float, default=0.1, help="fraction of users with auto-alerts")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--save-triggers', help="write the trigger log to this file")
+    parser.add_argument('--check-triggers', help="fail if the trigger log differs from this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.environ['DATABASE_PATH'] = os.path.join(tmp_dir, 'replay.db')
+        os.environ['STATE_SNAPSHOT_PATH'] = os.path.join(tmp_dir, 'monitor_state.snapshot')
+        report, triggers = asyncio.run(run(args))
+
+    print(json.dumps(report, indent=2))
+
+    if args.save_triggers:
+        with open(args.save_triggers, 'w') as f:
+            f.write('\n'.join(triggers) + '\n')
+        print(f"Trigger log saved to {args.save_triggers}")
+    if args.check_triggers:
+        with open(args.check_triggers) as f:
+            expected = f.read().splitlines()
+        if expected != triggers:
+            diverged = next((i for i, (a, b) in enumerate(zip(expected, triggers)) if a != b),
+                            min(len(expected), len(triggers)))
+            print(f"TRIGGERS DIFFER at line {diverged + 1}: expected {len(expected)}, got {len(triggers)}")
+            sys.exit(1)
+        print("Triggers identical")
+
+if __name__ == "__main__":
+    main()
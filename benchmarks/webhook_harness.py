@@ -0,0 +1,129 @@
+"""POSTs synthetic Telegram updates to a webhook endpoint.
+
+Against a running bot (BOT_MODE=webhook):
+    python benchmarks/webhook_harness.py --url http://127.0.0.1:8080/webhook --secret $WEBHOOK_SECRET
+
+Or fully local: starts bot.py's dispatcher behind WebhookServer with a fake
+Bot API session and mock price APIs, then posts to it:
+    python benchmarks/webhook_harness.py --in-process --updates 5000 --concurrency 50
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault('BOT_TOKEN', '123456:BENCHMARK')
+os.environ.setdefault('METRICS_PORT', '0')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+import aiohttp
+
+_ids = itertools.count(1)
+TEXTS = ['/start', '📋 My Alerts', '/help', '❓ Help', '🏠 Main Menu']
+
+def message_update(user_id: int, text: str) -> dict:
+    """Raw Bot API JSON of a private text message"""
+    user = {'id': user_id, 'is_bot': False, 'first_name': f"Hook{user_id}", 'username': f"hook{user_id}"}
+    return {
+        'update_id': next(_ids),
+        'message': {
+            'message_id': next(_ids),
+            'date': int(time.time()),
+            'chat': {'id': user_id, 'type': 'private'},
+            'from': user,
+            'text': text,
+        },
+    }
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+async def post_updates(url: str, secret: str, total: int, concurrency: int, users: int, seed: int):
+    rng = random.Random(seed)
+    latencies = []
+    statuses = {}
+    queue = asyncio.Queue()
+    for _ in range(total):
+        queue.put_nowait(message_update(rng.randint(1, users), rng.choice(TEXTS)))
+    headers = {'X-Telegram-Bot-Api-Secret-Token': secret} if secret else {}
+
+    async with aiohttp.ClientSession() as session:
+        async def worker():
+            while not queue.empty():
+                payload = queue.get_nowait()
+                started = time.perf_counter()
+                async with session.post(url, json=payload, headers=headers) as response:
+                    await response.read()
+                    statuses[response.status] = statuses.get(response.status, 0) + 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    print(f"posted {total} updates in {elapsed:.2f}s -> {total / elapsed:.1f} updates/s")
+    print(f"ack latency p50 {statistics.median(latencies) * 1000:.2f} ms, p99 {percentile(latencies, 99) * 1000:.2f} ms")
+    print(f"statuses: {statuses}")
+
+async def run_in_process(args):
+    from aiogram import Bot
+    from bench_dispatcher import FakeSession
+    from mock_services import MockPriceServer, synthetic_tickers
+    import bot as bot_module
+    from webhook import WebhookServer
+
+    prices = MockPriceServer(synthetic_tickers(20))
+    await prices.start()
+    bot_module.crypto_api.base_url = prices.coingecko_url
+    bot_module.crypto_api.binance_url = prices.binance_url
+
+    session = FakeSession()
+    fake_bot = Bot(token=os.environ['BOT_TOKEN'], session=session)
+    server = WebhookServer(bot_module.dp, fake_bot, secret=args.secret, concurrency=args.handler_concurrency)
+    runner = await server.start('127.0.0.1', 0)
+    port = runner.addresses[0][1]
+    try:
+        await post_updates(f"http://127.0.0.1:{port}{server.path}", args.secret, args.updates,
+                           args.concurrency, args.users, args.seed)
+        # Let accepted updates finish before reporting handler-side numbers
+        while server.tasks:
+            await asyncio.sleep(0.01)
+        print(f"Bot API calls: {dict(session.calls)}")
+    finally:
+        await runner.cleanup()
+        await bot_module.crypto_api.close_session()
+        await prices.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Webhook ingestion harness")
+    parser.add_argument('--url', help="webhook URL of a running bot")
+    parser.add_argument('--in-process', action='store_true', help="start a local webhook server with a fake Bot API")
+    parser.add_argument('--secret', default=os.getenv('WEBHOOK_SECRET', 'harness-secret'))
+    parser.add_argument('--updates', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=20, help="parallel POSTs")
+    parser.add_argument('--handler-concurrency', type=int, default=64, help="in-process WebhookServer concurrency")
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    if args.in_process:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.environ['DATABASE_PATH'] = os.path.join(tmp_dir, 'harness.db')
+            asyncio.run(run_in_process(args))
+    elif args.url:
+        asyncio.run(post_updates(args.url, args.secret, args.updates, args.concurrency, args.users, args.seed))
+    else:
+        parser.error("pass --url or --in-process")
+
+if __name__ == "__main__":
+    main()
@@ -6,32 +6,78 @@ from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.filters import StateFilter
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardMarkup, KeyboardButton
+from aiogram.types import InlineQueryResultArticle, InputTextMessageContent, BufferedInputFile
 from aiogram.filters import Command
 import re
+import signal
+import time
+from typing import Optional, Tuple
 
-from config import BOT_TOKEN, DARK_EMOJIS
+from config import (
+    validate_config, BOT_TOKEN, DARK_EMOJIS, MONITOR_MODE, METRICS_HOST, METRICS_PORT,
+    LOG_LEVEL, LOG_DEBUG_RATE, ADMIN_IDS, PROFILE_DEFAULT_COUNT,
+    FSM_STORAGE, BOT_MODE, WEBHOOK_URL, WEBHOOK_PATH, WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_SECRET, WEBHOOK_MAX_CONNECTIONS,
+    SHUTDOWN_DRAIN_TIMEOUT, DEFAULT_CURRENCY, CURRENCY_SYMBOLS, IMPORT_MAX_BYTES, ALERTS_PAGE_SIZE, DELETE_SELECTION_MAX
+)
 from database import Database
-from crypto_api import CryptoAPI
+from crypto_api import CryptoAPI, alert_price_key, format_money
 from monitor import PriceMonitor
+from sender import NotificationSender
+from broadcast import BroadcastPipeline
+from metrics import start_metrics_server, QUOTA_REJECTIONS
+from quotas import quota_error, user_costs
+from alert_io import FIELDS as ALERT_FILE_FIELDS, parse_alerts_file, dump_alerts
+from logging_setup import setup_logging, set_log_level, stop_logging
+from profiling import profiler, ProfilingMiddleware
+from webhook import WebhookServer
+from fsm_storage import SQLiteStorage
+from symbol_index import symbol_index
+from startup import startup
+from alert_index import RELATIVE_TYPES
+from alert_record import AlertRecord
+from price_history import DEFAULT_RANGE, parse_range, pick_resolution, render_history
+from shutdown import ShutdownCoordinator, InFlightMiddleware
+
+# Configure logging (queue-backed, written by a background thread)
+setup_logging(LOG_LEVEL, LOG_DEBUG_RATE)
+logger = logging.getLogger(__name__)
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+validate_config()
 
-# Initialize bot and dispatcher
+# Initialize database and API (schema is created once per process)
+_started = time.perf_counter()
+db = Database()
+startup.record('init_db', time.perf_counter() - _started)
+
+# Initialize bot and dispatcher (SQLite FSM storage is shared between bot processes)
 bot = Bot(token=BOT_TOKEN)
-storage = MemoryStorage()
+storage = SQLiteStorage() if FSM_STORAGE == 'sqlite' else MemoryStorage()
 dp = Dispatcher(storage=storage)
+dp.update.outer_middleware(ProfilingMiddleware())
+in_flight = InFlightMiddleware()
+dp.update.outer_middleware(in_flight)
 
-# Initialize database and API
-db = Database()
 crypto_api = CryptoAPI()
+sender = NotificationSender(bot)
 monitor = None
 
+# Expiry options of the add-coin dialog (seconds)
+ALERT_LIFETIMES = {"24h": 86400, "7d": 7 * 86400}
+
+ALERT_TYPE_EMOJIS = {
+    "above": DARK_EMOJIS['up'],
+    "below": DARK_EMOJIS['down'],
+    "percent": "↕️",
+    "trailing": "🪜"
+}
+
 # FSM States for adding alerts
 class AlertStates(StatesGroup):
     waiting_for_ticker = State()
     waiting_for_type = State()
     waiting_for_price = State()
+    waiting_for_lifetime = State()
+    waiting_for_import = State()
 
 # FSM States for deleting alerts
 class DeleteStates(StatesGroup):
@@ -136,25 +182,57 @@ async def process_ticker(message: types.Message, state: FSMContext):
         )
         return
     
+    # Validate against the local symbol index (no network call)
+    if symbol_index.is_loaded and not symbol_index.contains(ticker):
+        QUOTA_REJECTIONS.inc(reason='unknown_ticker')
+        suggestions = symbol_index.suggest(ticker)
+        hint = f"Did you mean: {', '.join(suggestions)}?\n\n" if suggestions else ""
+        await message.answer(
+            f"{DARK_EMOJIS['warning']} Unknown ticker **{ticker}**.\n\n"
+            f"{hint}"
+            f"💡 Type 'back' to return to the menu.",
+            parse_mode="Markdown"
+        )
+        return
+    
+    if not await admit_alert(message, message.from_user.id, ticker):
+        await state.clear()
+        return
+    
+    if symbol_index.is_loaded:
+        # Ticker is known: answer at once with whatever price we already have
+        current_price = crypto_api.get_cached_price(ticker) or (monitor.last_prices.get(ticker) if monitor else None)
+        loading_msg = None
+    else:
+        # Показуємо прогрес-бар
+        loading_msg = await message.answer(
+            f"⏳ **Checking price...**\n\nPlease wait, querying CoinGecko...",
+            parse_mode="Markdown"
+        )
+        progress_task = asyncio.create_task(progress_bar_updater(loading_msg))
+        try:
+            current_price = await crypto_api.get_coin_price(ticker)
+            progress_task.cancel()
+        except Exception:
+            current_price = None
+            progress_task.cancel()
+        if current_price is None:
+            # Without the index a ticker is only accepted once it has a price, so junk never reaches the monitor
+            QUOTA_REJECTIONS.inc(reason='unknown_ticker')
+            await loading_msg.edit_text(
+                f"{DARK_EMOJIS['warning']} Unknown ticker **{ticker}** or no price available for it. Try again.\n\n"
+                f"💡 Type 'back' to return to the menu.",
+                parse_mode="Markdown"
+            )
+            return
+    
     await state.update_data(ticker=ticker)
     await state.set_state(AlertStates.waiting_for_type)
     
-    # Показуємо прогрес-бар
-    loading_msg = await message.answer(
-        f"⏳ **Checking price...**\n\nPlease wait, querying CoinGecko...",
-        parse_mode="Markdown"
-    )
-    progress_task = asyncio.create_task(progress_bar_updater(loading_msg))
-    try:
-        current_price = await crypto_api.get_coin_price(ticker)
-        progress_task.cancel()
-    except Exception:
-        current_price = None
-        progress_task.cancel()
     if current_price:
         price_info = f"💰 Current price: ${current_price:,.2f}\n\n"
     else:
-        price_info = f"⚠️ Failed to get current price for {ticker}\n\n"
+        price_info = f"{symbol_index.name(ticker)}\n\n"
     
     # Create threshold type keyboard with back button
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
@@ -162,16 +240,22 @@ async def process_ticker(message: types.Message, state: FSMContext):
             InlineKeyboardButton(text=f"{DARK_EMOJIS['up']} Above", callback_data="type_above"),
             InlineKeyboardButton(text=f"{DARK_EMOJIS['down']} Below", callback_data="type_below")
         ],
+        [
+            InlineKeyboardButton(text="↕️ ±% from now", callback_data="type_percent"),
+            InlineKeyboardButton(text="🪜 Trailing stop", callback_data="type_trailing")
+        ],
         [InlineKeyboardButton(text="🏠 Back to menu", callback_data="back_to_menu")]
     ])
     
-    await loading_msg.edit_text(
+    text = (
         f"{DARK_EMOJIS['coin']} **{ticker}**\n"
         f"{price_info}"
-        f"Select threshold type:",
-        parse_mode="Markdown",
-        reply_markup=keyboard
+        f"Select threshold type:"
     )
+    if loading_msg:
+        await loading_msg.edit_text(text, parse_mode="Markdown", reply_markup=keyboard)
+    else:
+        await message.answer(text, parse_mode="Markdown", reply_markup=keyboard)
 
 @dp.callback_query(lambda c: c.data.startswith("type_"))
 async def process_threshold_type(callback: types.CallbackQuery, state: FSMContext):
@@ -185,8 +269,9 @@ async def process_threshold_type(callback: types.CallbackQuery, state: FSMContex
     data = await state.get_data()
     ticker = data['ticker']
     
-    # Get current price for the coin
+    # Get current price for the coin (reference price of percent/trailing alerts)
     current_price = await crypto_api.get_coin_price(ticker)
+    await state.update_data(base_price=current_price)
     
     # Create keyboard with back button
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
@@ -198,10 +283,21 @@ async def process_threshold_type(callback: types.CallbackQuery, state: FSMContex
     else:
         price_info = f"⚠️ Failed to get current price for {ticker}\n\n"
     
+    if threshold_type == "percent":
+        title = "Percent Move"
+        prompt = "Enter the move in % from the current price, up or down (e.g., 5):"
+    elif threshold_type == "trailing":
+        title = "Trailing Stop"
+        prompt = "Enter the drop in % from the highest price since now (e.g., 3):"
+    else:
+        title = "Price Threshold"
+        currencies = ", ".join(currency.upper() for currency in CURRENCY_SYMBOLS)
+        prompt = f"Enter your target price (e.g., 30000, or 28000 EUR for another currency: {currencies}):"
+    
     await callback.message.edit_text(
-        f"{DARK_EMOJIS['coin']} **Price Threshold**\n\n"
+        f"{DARK_EMOJIS['coin']} **{title}**\n\n"
         f"{price_info}"
-        f"Enter your target price (e.g., 30000):\n\n"
+        f"{prompt}\n\n"
         f"💡 Type 'back' to return to the menu.",
         parse_mode="Markdown",
         reply_markup=keyboard
@@ -236,37 +332,122 @@ async def back_to_menu_callback(callback: types.CallbackQuery, state: FSMContext
 
 @dp.message(AlertStates.waiting_for_price)
 async def process_price(message: types.Message, state: FSMContext):
-    """Process price input and save alert"""
+    """Process price (or percentage) input and ask how long the alert lives"""
     # Check for back to menu
     if message.text.lower() in ['back', 'menu', '🏠', 'main menu']:
         await state.clear()
         await cmd_main_menu(message)
         return
     
-    try:
-        price = float(message.text.replace(',', ''))
-        if price <= 0:
-            raise ValueError("Price must be positive")
-    except ValueError:
-        await message.answer(
-            f"{DARK_EMOJIS['warning']} Incorrect price. Enter a number (e.g., 30000).\n\n"
-            f"💡 Type 'back' to return to the menu.",
-            parse_mode="Markdown"
-        )
-        return
-    
     # Get data from state
     data = await state.get_data()
+    threshold_type = data['threshold_type']
+    
+    if threshold_type in RELATIVE_TYPES:
+        # Percent/trailing alerts: the value is a percentage
+        try:
+            value = float(message.text.replace(',', '.').rstrip('%'))
+            if not 0 < value < 100:
+                raise ValueError("Percent must be between 0 and 100")
+        except ValueError:
+            await message.answer(
+                f"{DARK_EMOJIS['warning']} Incorrect percentage. Enter a number between 0 and 100 (e.g., 5).\n\n"
+                f"💡 Type 'back' to return to the menu.",
+                parse_mode="Markdown"
+            )
+            return
+    else:
+        try:
+            value, currency = parse_price_input(message.text)
+            if value <= 0:
+                raise ValueError("Price must be positive")
+        except ValueError:
+            await message.answer(
+                f"{DARK_EMOJIS['warning']} Incorrect price. Enter a number, optionally with a currency (e.g., 30000 or 28000 EUR).\n\n"
+                f"💡 Type 'back' to return to the menu.",
+                parse_mode="Markdown"
+            )
+            return
+        await state.update_data(currency=currency)
+    
+    await state.update_data(price=value)
+    await state.set_state(AlertStates.waiting_for_lifetime)
+    
+    # Percent/trailing alerts always fire once, so only the expiry can be chosen
+    repeat_button = (
+        InlineKeyboardButton(text="1️⃣ Until it fires", callback_data="lifetime_once")
+        if threshold_type in RELATIVE_TYPES else
+        InlineKeyboardButton(text="🔁 Every time", callback_data="lifetime_repeat")
+    )
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[
+        [repeat_button] if threshold_type in RELATIVE_TYPES else
+        [repeat_button, InlineKeyboardButton(text="1️⃣ Once", callback_data="lifetime_once")],
+        [
+            InlineKeyboardButton(text="⏳ 24 hours", callback_data="lifetime_24h"),
+            InlineKeyboardButton(text="⏳ 7 days", callback_data="lifetime_7d")
+        ],
+        [InlineKeyboardButton(text="🏠 Back to menu", callback_data="back_to_menu")]
+    ])
+    await message.answer(
+        f"{DARK_EMOJIS['bell']} **How long should the alert live?**\n\n"
+        f"🔁 Every time — notify on every crossing\n"
+        f"1️⃣ Once — delete the alert after the first notification\n"
+        f"⏳ 24 hours / 7 days — delete it after the first notification or when time is up",
+        parse_mode="Markdown",
+        reply_markup=keyboard
+    )
+
+@dp.callback_query(AlertStates.waiting_for_lifetime, F.data.startswith("lifetime_"))
+async def process_lifetime(callback: types.CallbackQuery, state: FSMContext):
+    """Save the alert with the chosen lifetime"""
+    lifetime = callback.data.split("_")[1]
+    data = await state.get_data()
+    await state.clear()
+    await callback.message.delete()
+    
+    one_shot = lifetime != "repeat"
+    expires_at = int(time.time()) + ALERT_LIFETIMES[lifetime] if lifetime in ALERT_LIFETIMES else None
+    if data['threshold_type'] in RELATIVE_TYPES:
+        await save_relative_alert(callback.message, callback.from_user.id, data, expires_at)
+    else:
+        await save_price_alert(callback.message, callback.from_user.id, data, one_shot, expires_at)
+
+async def admit_alert(message: types.Message, user_id: int, ticker: str) -> bool:
+    """Check the user's alert quotas; explain and return False when the alert is refused"""
+    refusal = quota_error(db.get_user_alert_usage(user_id), ticker)
+    if refusal is None:
+        return True
+    reason, text = refusal
+    QUOTA_REJECTIONS.inc(reason=reason)
+    logger.info("Alert refused", extra={'user_id': user_id, 'ticker': ticker, 'reason': reason})
+    await message.answer(f"{DARK_EMOJIS['warning']} {text}", reply_markup=main_menu_keyboard)
+    return False
+
+def lifetime_note(one_shot: bool, expires_at: Optional[int]) -> str:
+    """Line describing when the alert goes away"""
+    if expires_at:
+        return f"⏳ Removed after the first notification or in {(expires_at - int(time.time())) // 3600}h.\n"
+    if one_shot:
+        return "1️⃣ Removed after the first notification.\n"
+    return ""
+
+async def save_price_alert(message: types.Message, user_id: int, data: dict, one_shot: bool, expires_at: Optional[int]):
+    """Save an above/below alert and report how far the price is from it"""
     ticker = data['ticker']
     threshold_type = data['threshold_type']
+    price = data['price']
+    currency = data.get('currency', DEFAULT_CURRENCY)
+    
+    if not await admit_alert(message, user_id, ticker):
+        return
     
     # Save alert to database
-    user_id = message.from_user.id
-    success = db.add_alert(user_id, ticker, threshold_type, price)
+    success = db.add_alert(user_id, ticker, threshold_type, price, one_shot=one_shot, expires_at=expires_at,
+                           currency=currency)
     
     if success:
-        # Get current price for comparison
-        current_price = await crypto_api.get_coin_price(ticker)
+        # Get current price for comparison, in the alert's currency
+        current_price = await crypto_api.get_coin_price(ticker, currency)
         
         # Create success message
         type_text = "above" if threshold_type == "above" else "below"
@@ -284,54 +465,159 @@ async def process_price(message: types.Message, state: FSMContext):
                 if current_price >= price:
                     status = f"🚨 **THRESHOLD ALREADY MET!**"
                 else:
-                    status = f"📉 Need +${abs(price_diff):,.2f} ({abs(price_percent):.1f}%)"
+                    status = f"📉 Need +{format_money(abs(price_diff), currency)} ({abs(price_percent):.1f}%)"
             else:  # below
                 if current_price <= price:
                     status = f"🚨 **THRESHOLD ALREADY MET!**"
                 else:
-                    status = f"📈 Need -${abs(price_diff):,.2f} ({price_percent:.1f}%)"
+                    status = f"📈 Need -{format_money(abs(price_diff), currency)} ({price_percent:.1f}%)"
             
             success_message += (
-                f"💰 **Current Price:** ${current_price:,.2f}\n"
-                f"🎯 **Target Price:** ${price:,.2f}\n"
+                f"💰 **Current Price:** {format_money(current_price, currency)}\n"
+                f"🎯 **Target Price:** {format_money(price, currency)}\n"
                 f"📊 **Status:** {status}\n\n"
             )
         else:
             success_message += (
-                f"🎯 **Target Price:** ${price:,.2f}\n"
+                f"🎯 **Target Price:** {format_money(price, currency)}\n"
                 f"⚠️ Failed to get current price\n\n"
             )
         
         success_message += (
-            f"{emoji} I will notify you when it will be {type_text} {price:,.0f}$.\n\n"
+            f"{emoji} I will notify you when it will be {type_text} {format_money(price, currency, 0)}.\n"
+            f"{lifetime_note(one_shot, expires_at)}\n"
             f"{DARK_EMOJIS['shadow']} *Monitoring enabled*"
         )
         
-        # Create keyboard with main menu button
-        keyboard = ReplyKeyboardMarkup(
-            keyboard=[[KeyboardButton(text="🏠 Main Menu")]],
-            resize_keyboard=True
-        )
-        
         await message.answer(success_message, parse_mode="Markdown", reply_markup=main_menu_keyboard)
     else:
-        await message.answer(f"{DARK_EMOJIS['error']} Saving error. Please try again.")
+        await message.answer(f"{DARK_EMOJIS['error']} Saving error. Please try again.", reply_markup=main_menu_keyboard)
+
+async def save_relative_alert(message: types.Message, user_id: int, data: dict, expires_at: Optional[int]):
+    """Save a percent or trailing alert; the percentage is stored as threshold_price"""
+    ticker = data['ticker']
+    threshold_type = data['threshold_type']
+    percent = data['price']
     
-    await state.clear()
+    base_price = data.get('base_price') or await crypto_api.get_coin_price(ticker)
+    if not base_price:
+        await message.answer(
+            f"{DARK_EMOJIS['error']} Failed to get the current {ticker} price, which this alert is measured from. "
+            f"Please try again later.",
+            reply_markup=main_menu_keyboard
+        )
+        return
+    
+    if not await admit_alert(message, user_id, ticker):
+        return
+    if not db.add_alert(user_id, ticker, threshold_type, percent, base_price=base_price,
+                        one_shot=True, expires_at=expires_at):
+        await message.answer(f"{DARK_EMOJIS['error']} Saving error. Please try again.", reply_markup=main_menu_keyboard)
+        return
+    
+    if threshold_type == "percent":
+        details = (
+            f"🎯 **Range:** ${base_price * (1 - percent / 100):,.2f} – ${base_price * (1 + percent / 100):,.2f}\n\n"
+            f"↕️ I will notify you once when {ticker} moves ±{percent:g}% from ${base_price:,.2f}."
+        )
+    else:
+        details = (
+            f"🎯 **Stop now:** ${base_price * (1 - percent / 100):,.2f}\n\n"
+            f"🪜 I will notify you once when {ticker} drops {percent:g}% below its highest price from now on."
+        )
+    await message.answer(
+        f"{DARK_EMOJIS['success']} **Coin {ticker} added!**\n\n"
+        f"💰 **Current Price:** ${base_price:,.2f}\n"
+        f"{details}\n"
+        f"{lifetime_note(False, expires_at)}\n"
+        f"{DARK_EMOJIS['shadow']} *Monitoring enabled*",
+        parse_mode="Markdown",
+        reply_markup=main_menu_keyboard
+    )
+
+def parse_price_input(text: str) -> Tuple[float, str]:
+    """Parse `30000`, `28000 EUR` or `€28000` into (price, currency); raises ValueError"""
+    match = re.fullmatch(r'\s*([^\d.,\s]*)\s*([\d.,]+)\s*([^\d.,\s]*)\s*', text)
+    if not match or (match.group(1) and match.group(3)):
+        raise ValueError("Unrecognized price")
+    mark = (match.group(1) or match.group(3)).lower()
+    currency = DEFAULT_CURRENCY
+    if mark:
+        marks = {**{code: code for code in CURRENCY_SYMBOLS}, **{symbol: code for code, symbol in CURRENCY_SYMBOLS.items()}}
+        if mark not in marks:
+            raise ValueError(f"Unsupported currency: {mark}")
+        currency = marks[mark]
+    return float(match.group(2).replace(',', '')), currency
+
+def alert_label(alert: AlertRecord) -> str:
+    """Short description of an alert's condition, e.g. `> 50,000$` or `trailing 3%`"""
+    threshold_type = alert.threshold_type
+    currency = alert.currency
+    if threshold_type == "percent":
+        label = f"±{alert.threshold_price:g}% from {format_money(alert.base_price, currency)}"
+    elif threshold_type == "trailing":
+        peak = max(alert.peak_price or 0.0, alert.base_price or 0.0)
+        label = f"trailing {alert.threshold_price:g}% (peak {format_money(peak, currency)})"
+    else:
+        type_symbol = ">" if threshold_type == "above" else "<"
+        label = f"{type_symbol} {format_money(alert.threshold_price, currency, 0)}"
+    if alert.triggered_at:
+        label += " — fired"
+    elif alert.expires_at:
+        label += f" ⏳{max(0, alert.expires_at - int(time.time())) // 3600}h"
+    elif alert.one_shot:
+        label += " 1️⃣"
+    return label
+
+def page_position(alert) -> str:
+    """Keyset position of an alert for callback data: `created_at|id`"""
+    return f"{alert.created_at}|{alert.id}"
+
+def load_alert_page(user_id: int, position: Optional[str] = None, backward: bool = False):
+    """One page of a user's alerts (newest first) and whether newer/older pages exist"""
+    if position:
+        created_at, alert_id = position.rsplit("|", 1)
+        alerts = db.get_user_alerts_page(user_id, ALERTS_PAGE_SIZE + 1, (created_at, int(alert_id)), backward)
+        if not alerts:
+            # Everything past the position was deleted meanwhile
+            return load_alert_page(user_id)
+        if backward:
+            # The extra row is the newest one and belongs to the page before
+            return alerts[-ALERTS_PAGE_SIZE:], len(alerts) > ALERTS_PAGE_SIZE, True
+        return alerts[:ALERTS_PAGE_SIZE], True, len(alerts) > ALERTS_PAGE_SIZE
+    alerts = db.get_user_alerts_page(user_id, ALERTS_PAGE_SIZE + 1)
+    return alerts[:ALERTS_PAGE_SIZE], False, len(alerts) > ALERTS_PAGE_SIZE
+
+def page_nav(prefix: str, alerts: list, has_newer: bool, has_older: bool) -> list:
+    """Newer/Older buttons carrying the keyset positions of the page edges"""
+    buttons = []
+    if has_newer:
+        buttons.append(InlineKeyboardButton(text="◀️ Newer", callback_data=f"{prefix}_prev|{page_position(alerts[0])}"))
+    if has_older:
+        buttons.append(InlineKeyboardButton(text="Older ▶️", callback_data=f"{prefix}_next|{page_position(alerts[-1])}"))
+    return buttons
+
+def render_alerts_page(alerts: list) -> str:
+    """Text of one My Alerts page"""
+    alerts_text = f"{DARK_EMOJIS['list']} **Monitored Coins:**\n\n"
+    for alert in alerts:
+        emoji = ALERT_TYPE_EMOJIS.get(alert.threshold_type, DARK_EMOJIS['down'])
+        alerts_text += f"{emoji} **{alert.coin_ticker}** {alert_label(alert)}\n"
+    return alerts_text + f"\n{DARK_EMOJIS['shadow']} *Newest first, up to {ALERTS_PAGE_SIZE} per page*"
 
 @dp.message(F.text == f"{DARK_EMOJIS['list']} My Alerts")
 async def cmd_show_alerts(message: types.Message):
-    """Show user's alerts"""
+    """Show the first page of the user's alerts"""
     user_id = message.from_user.id
-    alerts = db.get_user_alerts(user_id)
+    alerts, has_newer, has_older = load_alert_page(user_id)
+    
+    # Create keyboard with main menu button
+    keyboard = ReplyKeyboardMarkup(
+        keyboard=[[KeyboardButton(text="🏠 Main Menu")]],
+        resize_keyboard=True
+    )
     
     if not alerts:
-        # Create keyboard with main menu button
-        keyboard = ReplyKeyboardMarkup(
-            keyboard=[[KeyboardButton(text="🏠 Main Menu")]],
-            resize_keyboard=True
-        )
-        
         await message.answer(
             f"{DARK_EMOJIS['list']} **Your Alerts:**\n\n"
             f"You have no active alerts.\n"
@@ -341,35 +627,65 @@ async def cmd_show_alerts(message: types.Message):
         )
         return
     
-    # Create alerts list
-    alerts_text = f"{DARK_EMOJIS['list']} **Monitored Coins:**\n\n"
-    
-    for i, alert in enumerate(alerts, 1):
-        type_symbol = ">" if alert['threshold_type'] == "above" else "<"
-        emoji = DARK_EMOJIS['up'] if alert['threshold_type'] == "above" else DARK_EMOJIS['down']
-        
-        alerts_text += (
-            f"{i}. {emoji} **{alert['coin_ticker']}** {type_symbol} "
-            f"**{alert['threshold_price']:,.0f}$**\n"
-        )
+    nav = page_nav("alerts", alerts, has_newer, has_older)
+    if nav:
+        keyboard = InlineKeyboardMarkup(inline_keyboard=[nav])
+    await message.answer(render_alerts_page(alerts), parse_mode="Markdown", reply_markup=keyboard)
+
+@dp.callback_query(lambda c: c.data.startswith(("alerts_prev|", "alerts_next|")))
+async def process_alerts_page(callback: types.CallbackQuery):
+    """Page through My Alerts"""
+    action, position = callback.data.split("|", 1)
+    alerts, has_newer, has_older = load_alert_page(callback.from_user.id, position, backward=action == "alerts_prev")
+    if not alerts:
+        await callback.message.edit_text(f"{DARK_EMOJIS['list']} You have no active alerts.")
+        await callback.answer()
+        return
+    nav = page_nav("alerts", alerts, has_newer, has_older)
+    await callback.message.edit_text(
+        render_alerts_page(alerts),
+        parse_mode="Markdown",
+        reply_markup=InlineKeyboardMarkup(inline_keyboard=[nav]) if nav else None
+    )
+    await callback.answer()
+
+async def render_delete_page(user_id: int, state: FSMContext, position: Optional[str] = None, backward: bool = False):
+    """Alerts, text and keyboard of one Delete Alert page with the current bulk selection"""
+    selected = set((await state.get_data()).get('selected', []))
+    alerts, has_newer, has_older = load_alert_page(user_id, position, backward)
+    await state.update_data(page=[position, backward])
     
-    alerts_text += f"\n{DARK_EMOJIS['shadow']} *Total: {len(alerts)} alerts*"
+    rows = [
+        [InlineKeyboardButton(
+            text=f"{'✅' if alert.id in selected else '▫️'} {alert.coin_ticker} {alert_label(alert)}",
+            callback_data=f"delsel_toggle|{alert.id}"
+        )]
+        for alert in alerts
+    ]
+    nav = page_nav("delsel", alerts, has_newer, has_older)
+    if nav:
+        rows.append(nav)
+    actions = [InlineKeyboardButton(text="🏠 Back to menu", callback_data="back_to_menu")]
+    if selected:
+        actions.insert(0, InlineKeyboardButton(text=f"🗑 Delete selected ({len(selected)})", callback_data="delsel_confirm"))
+    rows.append(actions)
     
-    # Create keyboard with main menu button
-    keyboard = ReplyKeyboardMarkup(
-        keyboard=[[KeyboardButton(text="🏠 Main Menu")]],
-        resize_keyboard=True
+    text = (
+        f"{DARK_EMOJIS['delete']} **Select alerts to delete:**\n\n"
+        f"Tap alerts on any page to select them, then delete them all at once."
     )
-    
-    await message.answer(alerts_text, parse_mode="Markdown", reply_markup=keyboard)
+    return alerts, text, InlineKeyboardMarkup(inline_keyboard=rows)
 
 @dp.message(F.text == f"{DARK_EMOJIS['delete']} Delete Alert")
 async def cmd_delete_alert(message: types.Message, state: FSMContext):
-    """Start deleting alerts"""
+    """Start deleting alerts: a paged list with bulk selection"""
     user_id = message.from_user.id
-    alerts = db.get_user_alerts(user_id)
+    await state.set_state(DeleteStates.waiting_for_choice)
+    await state.update_data(selected=[])
+    alerts, text, keyboard = await render_delete_page(user_id, state)
     
     if not alerts:
+        await state.clear()
         # Create keyboard with main menu button
         keyboard = ReplyKeyboardMarkup(
             keyboard=[[KeyboardButton(text="🏠 Main Menu")]],
@@ -384,22 +700,59 @@ async def cmd_delete_alert(message: types.Message, state: FSMContext):
         )
         return
     
-    await state.set_state(DeleteStates.waiting_for_choice)
+    await message.answer(text, parse_mode="Markdown", reply_markup=keyboard)
+
+@dp.callback_query(DeleteStates.waiting_for_choice, lambda c: c.data.startswith("delsel_"))
+async def process_delete_selection(callback: types.CallbackQuery, state: FSMContext):
+    """Toggle, page through and delete the selected alerts"""
+    action, _, arg = callback.data.partition("|")
+    data = await state.get_data()
+    user_id = callback.from_user.id
     
-    # Create delete keyboard
-    keyboard_buttons = []
-    for i, alert in enumerate(alerts, 1):
-        type_symbol = ">" if alert['threshold_type'] == "above" else "<"
-        button_text = f"{i}. {alert['coin_ticker']} {type_symbol} {alert['threshold_price']:,.0f}$"
-        keyboard_buttons.append([InlineKeyboardButton(text=button_text, callback_data=f"delete_{alert['id']}")])
+    if action == "delsel_confirm":
+        # One DELETE ... WHERE id IN for the whole selection
+        deleted = db.delete_user_alerts(user_id, data.get('selected', []))
+        if monitor:
+            for alert_id in deleted:
+                monitor.forget_alert(alert_id)
+        await state.clear()
+        await callback.message.edit_text(
+            f"{DARK_EMOJIS['success']} **Deleted {len(deleted)} alerts!**\n\n"
+            f"{DARK_EMOJIS['shadow']} *Monitoring updated*",
+            parse_mode="Markdown"
+        )
+        keyboard = ReplyKeyboardMarkup(
+            keyboard=[[KeyboardButton(text="🏠 Main Menu")]],
+            resize_keyboard=True
+        )
+        await callback.message.answer("Click the button below to return to the menu:", reply_markup=keyboard)
+        await callback.answer()
+        return
     
-    keyboard = InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
+    if action == "delsel_toggle":
+        selected = data.get('selected', [])
+        alert_id = int(arg)
+        if alert_id in selected:
+            selected.remove(alert_id)
+        elif len(selected) >= DELETE_SELECTION_MAX:
+            await callback.answer(f"Up to {DELETE_SELECTION_MAX} alerts at once")
+            return
+        else:
+            selected.append(alert_id)
+        await state.update_data(selected=selected)
+        # Redraw the page being shown
+        position, backward = data.get('page', [None, False])
+    else:
+        position, backward = arg, action == "delsel_prev"
     
-    await message.answer(
-        f"{DARK_EMOJIS['delete']} **Select an alert to delete:**",
-        parse_mode="Markdown",
-        reply_markup=keyboard
-    )
+    alerts, text, keyboard = await render_delete_page(user_id, state, position, backward)
+    await callback.message.edit_text(text, parse_mode="Markdown", reply_markup=keyboard)
+    await callback.answer()
+
+@dp.callback_query(lambda c: c.data.startswith("delsel_"))
+async def process_stale_delete_selection(callback: types.CallbackQuery):
+    """Delete menu from a finished or expired dialog"""
+    await callback.answer("This menu has expired. Open Delete Alert again.")
 
 @dp.callback_query(lambda c: c.data.startswith("delete_"))
 async def process_delete_choice(callback: types.CallbackQuery, state: FSMContext):
@@ -411,6 +764,8 @@ async def process_delete_choice(callback: types.CallbackQuery, state: FSMContext
     success = db.delete_alert(alert_id, user_id)
     
     if success:
+        if monitor:
+            monitor.forget_alert(alert_id)
         await callback.message.edit_text(
             f"{DARK_EMOJIS['success']} **Alert deleted!**\n\n"
             f"{DARK_EMOJIS['shadow']} *Monitoring updated*",
@@ -464,6 +819,151 @@ async def cmd_get_price(message: types.Message):
             parse_mode="Markdown"
         )
 
+@dp.message(Command("history"))
+async def cmd_price_history(message: types.Message):
+    """Price history of a coin from locally recorded prices: /history BTC [24h]"""
+    args = message.text.split()[1:]
+    if not args:
+        await message.answer(
+            f"{DARK_EMOJIS['coin']} **Price History**\n\n"
+            f"Usage: `/history BTC [range]`\n"
+            f"Range: `90m`, `24h`, `7d`, `4w`, `1y` (default `{DEFAULT_RANGE}`)",
+            parse_mode="Markdown"
+        )
+        return
+    
+    ticker = args[0].upper()
+    range_text = args[1].lower() if len(args) > 1 else DEFAULT_RANGE
+    seconds = parse_range(range_text)
+    if seconds is None:
+        await message.answer(f"{DARK_EMOJIS['warning']} Invalid range. Use e.g. `90m`, `24h`, `7d`, `1y`.", parse_mode="Markdown")
+        return
+    
+    resolution = pick_resolution(seconds)
+    bars = db.get_price_bars(ticker, resolution, int(time.time()) - seconds)
+    text = render_history(ticker, range_text, bars)
+    if not text:
+        await message.answer(
+            f"{DARK_EMOJIS['warning']} No recorded history for **{ticker}** yet.\n\n"
+            f"History is collected for coins that have alerts.",
+            parse_mode="Markdown"
+        )
+        return
+    await message.answer(text, parse_mode="Markdown")
+
+@dp.message(Command("import"))
+async def cmd_import_alerts(message: types.Message, state: FSMContext):
+    """Bulk-add alerts from a CSV or JSON file (sent with /import as caption, or right after it)"""
+    if message.document:
+        await import_alerts_file(message)
+        return
+    await state.set_state(AlertStates.waiting_for_import)
+    await message.answer(
+        f"{DARK_EMOJIS['add']} **Import Alerts**\n\n"
+        f"Send a `.csv` or `.json` file with the columns:\n"
+        f"`{','.join(ALERT_FILE_FIELDS)}`\n\n"
+        f"Only `ticker`, `type` (above, below, percent, trailing) and `value` are required. "
+        f"`/export` produces a file in the same format.\n\n"
+        f"💡 Type 'back' to return to the menu.",
+        parse_mode="Markdown"
+    )
+
+@dp.message(AlertStates.waiting_for_import, F.document)
+async def process_import_file(message: types.Message, state: FSMContext):
+    """Import the file sent after /import"""
+    await state.clear()
+    await import_alerts_file(message)
+
+@dp.message(AlertStates.waiting_for_import)
+async def process_import_text(message: types.Message, state: FSMContext):
+    """Anything but a file while waiting for the import"""
+    await state.clear()
+    if message.text and message.text.lower() in ['back', 'menu', '🏠', 'main menu']:
+        await cmd_main_menu(message)
+        return
+    await message.answer(f"{DARK_EMOJIS['warning']} Please send the alerts as a file. Start again with /import.",
+                         reply_markup=main_menu_keyboard)
+
+def escape_markdown(text: str) -> str:
+    """Escape Markdown entity characters in user-supplied text"""
+    return re.sub(r'([_*`\[])', r'\\\1', text)
+
+async def import_alerts_file(message: types.Message):
+    """Validate every row, check tickers and quotas in one pass, insert in one transaction"""
+    user_id = message.from_user.id
+    document = message.document
+    if document.file_size and document.file_size > IMPORT_MAX_BYTES:
+        await message.answer(f"{DARK_EMOJIS['warning']} File too large (max {IMPORT_MAX_BYTES // 1024} KB).")
+        return
+    now = int(time.time())
+    try:
+        data = (await bot.download(document)).read()
+    except Exception as e:
+        logger.warning("Import download failed: %s", e, extra={'user_id': user_id})
+        await message.answer(f"{DARK_EMOJIS['error']} Could not download the file. Please try again.")
+        return
+    rows, errors = parse_alerts_file(data, document.file_name or '', now)
+    parsed = len(rows) + len(errors)
+    
+    # Tickers: the local index when loaded, otherwise whatever has a price; one batched call for both cases
+    tickers = {row['ticker'] for row in rows}
+    if symbol_index.is_loaded:
+        # Unknown tickers are dropped before any price request is made for them
+        known = {ticker for ticker in tickers if symbol_index.contains(ticker)}
+        need_prices = {row['ticker'] for row in rows
+                       if row['ticker'] in known and row['type'] in RELATIVE_TYPES and not row['base_price']}
+    else:
+        need_prices = tickers
+    prices = await crypto_api.get_quotes(list(need_prices)) if need_prices else {}
+    if not symbol_index.is_loaded:
+        known = set(prices)
+    
+    admitted = []
+    usage = db.get_user_alert_usage(user_id)
+    for row in rows:
+        ticker = row['ticker']
+        if ticker not in known:
+            QUOTA_REJECTIONS.inc(reason='unknown_ticker')
+            errors.append(f"line {row['line']}: unknown ticker {ticker}")
+            continue
+        if row['type'] in RELATIVE_TYPES and not row['base_price']:
+            row['base_price'] = prices.get(ticker)
+            if not row['base_price']:
+                errors.append(f"line {row['line']}: no current price for {ticker}")
+                continue
+        refusal = quota_error(usage, ticker)
+        if refusal:
+            QUOTA_REJECTIONS.inc(reason=refusal[0])
+            errors.append(f"line {row['line']}: over the limit of {refusal[0]}")
+            continue
+        usage[ticker] = usage.get(ticker, 0) + 1
+        admitted.append(row)
+    
+    inserted = db.add_alerts(user_id, admitted) if admitted else 0
+    logger.info("Alerts imported", extra={'user_id': user_id, 'rows': parsed,
+                                          'inserted': inserted, 'errors': len(errors)})
+    report = f"{DARK_EMOJIS['success']} **Imported {inserted} alerts**\n"
+    if errors:
+        # Error lines quote the file, so they are escaped for Markdown
+        shown = "\n".join(f"• {escape_markdown(error)}" for error in errors[:10])
+        more = f"\n…and {len(errors) - 10} more" if len(errors) > 10 else ""
+        report += f"\n{DARK_EMOJIS['warning']} Skipped {len(errors)}:\n{shown}{more}\n"
+    await message.answer(report, parse_mode="Markdown", reply_markup=main_menu_keyboard)
+
+@dp.message(Command("export"))
+async def cmd_export_alerts(message: types.Message):
+    """Send the user's armed alerts as a file: /export [csv|json]"""
+    args = message.text.split()[1:]
+    fmt = args[0].lower() if args else "csv"
+    if fmt not in ("csv", "json"):
+        await message.answer("Usage: `/export [csv|json]`", parse_mode="Markdown")
+        return
+    data = dump_alerts(db.get_user_alerts(message.from_user.id), fmt, int(time.time()))
+    await message.answer_document(
+        BufferedInputFile(data, filename=f"alerts.{fmt}"),
+        caption=f"{DARK_EMOJIS['list']} Your alerts. Send this file with /import to restore them."
+    )
+
 @dp.message(Command("prices"))
 async def cmd_get_user_prices(message: types.Message):
     """Get current prices for all user's monitored coins"""
@@ -497,10 +997,10 @@ async def cmd_get_user_prices(message: types.Message):
     progress_task = asyncio.create_task(progress_bar_updater(loading_msg))
     try:
         # Get unique coin tickers
-        coin_tickers = list(set(alert['coin_ticker'] for alert in alerts))
+        coin_tickers = list(set(alert.coin_ticker for alert in alerts))
         
-        # Get current prices for all coins
-        prices = await crypto_api.get_multiple_prices(coin_tickers)
+        # Get current prices for all coins, in every currency the user's alerts use (one request)
+        prices = await crypto_api.get_quotes(coin_tickers, {alert.currency for alert in alerts})
         progress_task.cancel()
         
         if not prices:
@@ -516,12 +1016,20 @@ async def cmd_get_user_prices(message: types.Message):
         price_report = f"{DARK_EMOJIS['coin']} **Current Prices of Your Coins:**\n\n"
         
         for alert in alerts:
-            ticker = alert['coin_ticker']
-            current_price = prices.get(ticker)
-            threshold_price = alert['threshold_price']
-            threshold_type = alert['threshold_type']
+            ticker = alert.coin_ticker
+            currency = alert.currency
+            current_price = prices.get(alert_price_key(alert))
+            threshold_price = alert.threshold_price
+            threshold_type = alert.threshold_type
             
-            if current_price:
+            if current_price and threshold_type in RELATIVE_TYPES:
+                status_emoji = ALERT_TYPE_EMOJIS[threshold_type]
+                price_report += (
+                    f"**{ticker}** {status_emoji}\n"
+                    f"💰 **{format_money(current_price, currency)}**\n"
+                    f"🎯 {alert_label(alert)}\n\n"
+                )
+            elif current_price:
                 # Calculate price difference and percentage
                 price_diff = current_price - threshold_price
                 price_percent = (price_diff / threshold_price) * 100
@@ -533,20 +1041,20 @@ async def cmd_get_user_prices(message: types.Message):
                         status_text = "🚨 THRESHOLD MET!"
                     else:
                         status_emoji = DARK_EMOJIS['down']
-                        status_text = f"📉 Need +${abs(price_diff):,.2f} ({abs(price_percent):.1f}%)"
+                        status_text = f"📉 Need +{format_money(abs(price_diff), currency)} ({abs(price_percent):.1f}%)"
                 else:  # below
                     if current_price <= threshold_price:
                         status_emoji = DARK_EMOJIS['alert']
                         status_text = "🚨 THRESHOLD MET!"
                     else:
                         status_emoji = DARK_EMOJIS['up']
-                        status_text = f"📈 Need -${abs(price_diff):,.2f} ({abs(price_percent):.1f}%)"
+                        status_text = f"📈 Need -{format_money(abs(price_diff), currency)} ({abs(price_percent):.1f}%)"
                 
                 # Format price with color indicators
                 price_report += (
                     f"**{ticker}** {status_emoji}\n"
-                    f"💰 **${current_price:,.2f}**\n"
-                    f"🎯 Threshold: ${threshold_price:,.2f}\n"
+                    f"💰 **{format_money(current_price, currency)}**\n"
+                    f"🎯 Threshold: {format_money(threshold_price, currency)}\n"
                     f"📊 {status_text}\n\n"
                 )
             else:
@@ -556,7 +1064,7 @@ async def cmd_get_user_prices(message: types.Message):
                 )
         
         # Add footer
-        price_report += f"{DARK_EMOJIS['shadow']} *Updated: {len(prices)}/{len(coin_tickers)} coins*"
+        price_report += f"{DARK_EMOJIS['shadow']} *Updated: {sum(ticker in prices for ticker in coin_tickers)}/{len(coin_tickers)} coins*"
         
         # Create keyboard with main menu button
         keyboard = ReplyKeyboardMarkup(
@@ -620,6 +1128,9 @@ async def cmd_help(message: types.Message):
         f"📋 `/alerts` - Show your alerts\n"
         f"💰 `/prices` - Current prices of your coins\n"
         f"💰 `/price BTC` - Current price of a specific coin\n"
+        f"📈 `/history BTC 7d` - Price history of a coin\n"
+        f"📥 `/import` - Add many alerts from a CSV/JSON file\n"
+        f"📤 `/export` - Download your alerts as a file\n"
         f"❌ `/delete` - Delete an alert\n"
         f"❓ `/help` - This help\n\n"
         f"**Examples of usage:**\n"
@@ -635,45 +1146,58 @@ async def cmd_help(message: types.Message):
 
 @dp.message(Command("broadcast"))
 async def cmd_broadcast_prices(message: types.Message):
-    """Admin command to broadcast price updates to all users"""
-    # Check if user is admin (you can modify this logic)
+    """Admin command to broadcast price updates to all users (`/broadcast resume` continues an interrupted run)"""
     user_id = message.from_user.id
-    # For now, allow any user to test this feature
-    # In production, you might want to restrict this to specific admin IDs
+    if not is_admin(user_id):
+        await message.answer(f"{DARK_EMOJIS['warning']} Admins only.")
+        return
     
     try:
-        users = db.get_all_users()
-        if not users:
+        resume = len(message.text.split()) > 1 and message.text.split()[1].lower() == "resume"
+        run = db.get_unfinished_broadcast_run() if resume else None
+        if resume and not run:
             await message.answer(
-                f"{DARK_EMOJIS['warning']} **No users**\n\n"
-                f"There are currently no registered users.",
+                f"{DARK_EMOJIS['warning']} **Nothing to resume**\n\n"
+                f"There is no interrupted broadcast.",
                 parse_mode="Markdown"
             )
             return
+        if not run:
+            run = {'id': db.create_broadcast_run(user_id), 'cursor_user_id': 0, 'sent': 0, 'failed': 0}
         
         # Send loading message
         loading_msg = await message.answer(
-            f"{DARK_EMOJIS['coin']} **Price Broadcast...**\n\n"
-            f"⏳ Sending price updates to {len(users)} users...",
+            f"{DARK_EMOJIS['coin']} **Price Broadcast #{run['id']}...**\n\n"
+            f"⏳ Taking a price snapshot...",
             parse_mode="Markdown"
         )
         
-        success_count = 0
-        error_count = 0
+        last_edit = 0.0
         
-        for user in users:
+        async def report_progress(progress):
+            nonlocal last_edit
+            # Telegram limits message edits, so refresh at most every 3 seconds
+            if time.monotonic() - last_edit < 3:
+                return
+            last_edit = time.monotonic()
             try:
-                await monitor.send_price_update_to_user(user['user_id'])
-                success_count += 1
-                await asyncio.sleep(0.1)  # Small delay to avoid rate limiting
-            except Exception as e:
-                error_count += 1
-                print(f"Error sending to user {user['user_id']}: {e}")
+                await loading_msg.edit_text(
+                    f"{DARK_EMOJIS['coin']} **Price Broadcast #{progress['id']}...**\n\n"
+                    f"✅ Sent: {progress['sent']}\n"
+                    f"❌ Errors: {progress['failed']}\n"
+                    f"📍 Cursor: user {progress['cursor_user_id']}",
+                    parse_mode="Markdown"
+                )
+            except Exception:
+                pass
+        
+        pipeline = BroadcastPipeline(db, crypto_api, sender, monitor)
+        result = await pipeline.run(run, report_progress)
         
         await loading_msg.edit_text(
             f"{DARK_EMOJIS['success']} **Broadcast complete!**\n\n"
-            f"✅ Success: {success_count} users\n"
-            f"❌ Errors: {error_count} users\n\n"
+            f"✅ Success: {result['sent']} users\n"
+            f"❌ Errors: {result['failed']} users\n\n"
             f"{DARK_EMOJIS['shadow']} *Price updates sent*",
             parse_mode="Markdown"
         )
@@ -681,14 +1205,111 @@ async def cmd_broadcast_prices(message: types.Message):
     except Exception as e:
         await message.answer(
             f"{DARK_EMOJIS['error']} **Broadcast error**\n\n"
-            f"Technical error: {str(e)}",
+            f"Technical error: {str(e)}\n"
+            f"Use `/broadcast resume` to continue.",
             parse_mode="Markdown"
         )
 
+def is_admin(user_id: int) -> bool:
+    """Check admin rights (nobody is an admin while ADMIN_IDS is empty)"""
+    return user_id in ADMIN_IDS
+
+@dp.message(Command("loglevel"))
+async def cmd_log_level(message: types.Message):
+    """Admin command to change the log level at runtime: /loglevel DEBUG [logger]"""
+    if not is_admin(message.from_user.id):
+        await message.answer(f"{DARK_EMOJIS['warning']} Admins only.")
+        return
+    
+    args = message.text.split()[1:]
+    if not args:
+        current = logging.getLevelName(logging.getLogger().level)
+        await message.answer(f"📜 Log level: `{current}`\n\nUsage: `/loglevel DEBUG [logger]`", parse_mode="Markdown")
+        return
+    
+    logger_name = args[1] if len(args) > 1 else ''
+    if set_log_level(args[0], logger_name):
+        logger.info("Log level changed", extra={'level': args[0].upper(), 'target': logger_name or 'root'})
+        await message.answer(f"{DARK_EMOJIS['success']} Log level set to `{args[0].upper()}`", parse_mode="Markdown")
+    else:
+        await message.answer(f"{DARK_EMOJIS['warning']} Unknown level. Use DEBUG, INFO, WARNING or ERROR.")
+
+@dp.message(Command("costs"))
+async def cmd_costs(message: types.Message):
+    """Admin command: users with the largest share of the monitor workload"""
+    if not is_admin(message.from_user.id):
+        await message.answer(f"{DARK_EMOJIS['warning']} Admins only.")
+        return
+    
+    # Costs of the latest tick, or computed now when this process runs no monitor loop (sharded mode)
+    costs = monitor.user_costs if monitor else {}
+    if not costs and monitor:
+        costs = user_costs(db.iter_all_alerts(), monitor.get_auto_alert_coins(), crypto_api.coin_id_cache)
+    if not costs:
+        await message.answer("No active alerts.")
+        return
+    heaviest = sorted(costs.items(), key=lambda item: item[1]['requests'], reverse=True)[:10]
+    lines = [
+        f"`{user_id}`: {cost['alerts']} alerts, {cost['tickers']} coins, {cost['requests']:.2f} req/tick"
+        for user_id, cost in heaviest
+    ]
+    await message.answer(
+        f"📊 **Monitor cost per user** (upstream requests per tick)\n\n" + "\n".join(lines),
+        parse_mode="Markdown"
+    )
+
+@dp.message(Command("profile"))
+async def cmd_profile(message: types.Message):
+    """Admin command to profile the next N monitor ticks or handler calls: /profile ticks|handlers [N]"""
+    if not is_admin(message.from_user.id):
+        await message.answer(f"{DARK_EMOJIS['warning']} Admins only.")
+        return
+    
+    args = message.text.split()[1:]
+    target = args[0].lower() if args else "ticks"
+    if target not in ("ticks", "handlers"):
+        await message.answer("Usage: `/profile ticks|handlers [N]`", parse_mode="Markdown")
+        return
+    try:
+        count = int(args[1]) if len(args) > 1 else PROFILE_DEFAULT_COUNT
+    except ValueError:
+        count = PROFILE_DEFAULT_COUNT
+    
+    profiler.arm(target[:-1], count)
+    await message.answer(
+        f"🔬 **Profiling armed**\n\n"
+        f"Next {count} {target} will be profiled.\n"
+        f"Results (`.prof`, `.tracemalloc`, `.json`) go to `{profiler.output_dir}/`.",
+        parse_mode="Markdown"
+    )
+
+@dp.inline_query()
+async def inline_ticker_autocomplete(inline_query: types.InlineQuery):
+    """Ticker autocomplete for inline mode (@bot BT...) served from the local index"""
+    results = [
+        InlineQueryResultArticle(
+            id=symbol,
+            title=symbol,
+            description=symbol_index.name(symbol),
+            input_message_content=InputTextMessageContent(message_text=symbol)
+        )
+        for symbol in symbol_index.prefix(inline_query.query, limit=20)
+    ]
+    await inline_query.answer(results, cache_time=300, is_personal=False)
+
+async def refresh_symbol_index():
+    """Load the cached coin list and refresh it in the background when stale"""
+    symbol_index.load_snapshot()
+    if symbol_index.is_stale():
+        try:
+            await symbol_index.refresh(crypto_api)
+        except Exception as e:
+            logger.warning("Symbol index refresh failed: %s", e)
+
 # === Хендлер для авто-сповіщень (універсальний, emoji/case/space insensitive) ===
 @dp.message(lambda msg: msg.text and re.search(r"auto[- ]?alerts", msg.text, re.IGNORECASE))
 async def cmd_auto_alerts_menu(message: types.Message, state: FSMContext):
-    print("[DEBUG] Auto-alerts handler triggered, text:", message.text)
+    logger.debug("Auto-alerts handler triggered", extra={'user_id': message.from_user.id})
     user_id = message.from_user.id
     enabled = db.is_global_auto_alert_enabled(user_id)
     if enabled:
@@ -747,25 +1368,110 @@ async def handle_unknown(message: types.Message):
 async def start_monitoring():
     """Start the price monitoring in background"""
     global monitor
-    monitor = PriceMonitor(bot)
+    if monitor is None:
+        monitor = PriceMonitor(bot, sender=sender)
     await monitor.start_monitoring()
 
+async def warm_up():
+    """Warm caches concurrently and restore monitor state before serving"""
+    tasks = [startup.phase('symbol_index', refresh_symbol_index)]
+    if MONITOR_MODE != 'sharded':
+        # Coin ids and prices for every followed ticker; the first tick then hits the cache
+        tasks.append(startup.phase('price_snapshot', monitor.warm_prices))
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    for result in results:
+        if isinstance(result, Exception):
+            logger.warning("Warm-up phase failed: %s", result)
+    if MONITOR_MODE != 'sharded':
+        await startup.phase('monitor_state', monitor.load_state)
+
+async def start_webhook():
+    """Serve updates over a webhook instead of long polling"""
+    server = WebhookServer(dp, bot)
+    server.runner = await server.start(WEBHOOK_HOST, WEBHOOK_PORT)
+    if WEBHOOK_URL:
+        # Idempotent, so every instance behind the load balancer may call it
+        await bot.set_webhook(
+            url=WEBHOOK_URL.rstrip('/') + WEBHOOK_PATH,
+            secret_token=WEBHOOK_SECRET or None,
+            max_connections=WEBHOOK_MAX_CONNECTIONS,
+            drop_pending_updates=False
+        )
+    return server
+
+async def stop_intake(webhook_server, polling_task):
+    """Stop taking new updates and let handlers already running finish"""
+    if webhook_server:
+        # Telegram gets 503 and redelivers pending updates to the next instance
+        webhook_server.is_accepting = False
+    if polling_task and not polling_task.done():
+        try:
+            await dp.stop_polling()
+        except RuntimeError:
+            pass  # Polling has not started yet
+    await in_flight.wait_idle(SHUTDOWN_DRAIN_TIMEOUT)
+
 async def main():
     """Main function"""
-    print(f"{DARK_EMOJIS['bot']} ShadowPrice Bot starting...")
+    global monitor
+    logger.info("ShadowPrice Bot starting")
     
-    # Start monitoring in background
-    asyncio.create_task(start_monitoring())
+    # SIGTERM/SIGINT trigger the shutdown sequence at the end of main()
+    shutdown = ShutdownCoordinator()
+    shutdown.install_signal_handlers()
+    
+    # SIGUSR1 profiles the next monitor ticks without going through Telegram
+    try:
+        asyncio.get_running_loop().add_signal_handler(
+            signal.SIGUSR1, profiler.arm, 'tick', PROFILE_DEFAULT_COUNT
+        )
+    except (NotImplementedError, AttributeError):
+        pass
+    
+    metrics_runner = None
+    if METRICS_PORT:
+        metrics_runner = await start_metrics_server(METRICS_HOST, METRICS_PORT)
+    
+    # Sharded mode runs the monitoring loop in monitor_worker.py
+    monitor = PriceMonitor(bot, sender=sender)
+    await warm_up()
+    if MONITOR_MODE != 'sharded':
+        asyncio.create_task(start_monitoring())
+    startup.mark_ready()
     
     # Start bot
+    webhook_server = None
+    polling_task = None
+    polling_error = None
     try:
-        await dp.start_polling(bot)
-    except KeyboardInterrupt:
-        print(f"\n{DARK_EMOJIS['bot']} Bot stopped by user")
+        if BOT_MODE == 'webhook':
+            webhook_server = await start_webhook()
+            await shutdown.wait()
+        else:
+            polling_task = asyncio.create_task(dp.start_polling(bot, handle_signals=False))
+            shutdown_waiter = asyncio.create_task(shutdown.wait())
+            await asyncio.wait({polling_task, shutdown_waiter}, return_when=asyncio.FIRST_COMPLETED)
+            shutdown_waiter.cancel()
+            if polling_task.done() and not polling_task.cancelled() and polling_task.exception():
+                # Bad token or no network at startup: shut down cleanly, then exit with the error
+                polling_error = polling_task.exception()
+                logger.error("Polling failed: %s", polling_error, exc_info=polling_error)
     finally:
-        if monitor:
-            await monitor.stop_monitoring()
-        await bot.session.close()
+        # Intake first, then the current tick, queued messages, pending writes and state
+        shutdown.add_step('stop_intake', stop_intake, webhook_server, polling_task)
+        shutdown.add_step('stop_monitor', monitor.stop_monitoring)
+        shutdown.add_step('drain_sender', sender.drain, SHUTDOWN_DRAIN_TIMEOUT)
+        shutdown.add_step('flush_fsm', storage.close)
+        shutdown.add_step('save_state', monitor.close)
+        if webhook_server:
+            shutdown.add_step('stop_webhook', webhook_server.runner.cleanup)
+        if metrics_runner:
+            shutdown.add_step('stop_metrics', metrics_runner.cleanup)
+        shutdown.add_step('close_session', bot.session.close)
+        await shutdown.run()
+        stop_logging()
+    if polling_error:
+        raise polling_error
 
 async def progress_bar_updater(msg):
     try:
@@ -776,34 +1482,5 @@ async def progress_bar_updater(msg):
     except Exception:
         pass
 
-# Add logging to all CoinGecko API calls
-
-# Patch: wrap all calls to crypto_api.get_coin_price and crypto_api.get_multiple_prices with logging
-import functools
-
-old_get_coin_price = crypto_api.get_coin_price
-async def logged_get_coin_price(ticker, *args, **kwargs):
-    print(f"[GECKO] Requesting price for: {ticker}")
-    try:
-        price = await old_get_coin_price(ticker, *args, **kwargs)
-        print(f"[GECKO] Price for {ticker}: {price}")
-        return price
-    except Exception as e:
-        print(f"[GECKO] ERROR for {ticker}: {e}")
-        raise
-crypto_api.get_coin_price = logged_get_coin_price
-
-old_get_multiple_prices = crypto_api.get_multiple_prices
-async def logged_get_multiple_prices(tickers, *args, **kwargs):
-    print(f"[GECKO] Requesting prices for: {tickers}")
-    try:
-        prices = await old_get_multiple_prices(tickers, *args, **kwargs)
-        print(f"[GECKO] Prices: {prices}")
-        return prices
-    except Exception as e:
-        print(f"[GECKO] ERROR for {tickers}: {e}")
-        raise
-crypto_api.get_multiple_prices = logged_get_multiple_prices
-
 if __name__ == "__main__":
     asyncio.run(main()) 
\ No newline at end of file
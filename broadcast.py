@@ -0,0 +1,75 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional
+from database import Database
+from crypto_api import CryptoAPI, price_key
+from sender import NotificationSender
+from monitor import PriceMonitor
+from config import BROADCAST_PAGE_SIZE, CHECK_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+ProgressCallback = Callable[[Dict], Awaitable[None]]
+
+class BroadcastPipeline:
+    """Price update broadcast: one price snapshot, paged users, concurrent rate-limited sending.
+
+    Progress is checkpointed in `broadcast_runs` after every page, so an
+    interrupted run can be resumed from its cursor.
+    """
+
+    def __init__(self, db: Database, crypto_api: CryptoAPI, sender: NotificationSender,
+                 monitor: Optional[PriceMonitor] = None, page_size: int = BROADCAST_PAGE_SIZE):
+        self.db = db
+        self.crypto_api = crypto_api
+        self.sender = sender
+        self.monitor = monitor
+        self.page_size = page_size
+
+    async def take_snapshot(self) -> Dict[str, float]:
+        """Prices keyed by price_key() for every alerted ticker and currency, reusing the monitor's snapshot while it is fresh"""
+        pairs = self.db.get_alert_quote_pairs()
+        keys = [price_key(ticker, currency) for ticker, currency in pairs]
+        if self.monitor and time.time() - self.monitor.last_prices_time <= CHECK_INTERVAL * 2:
+            prices = {key: self.monitor.last_prices[key] for key in keys if key in self.monitor.last_prices}
+            if len(prices) == len(keys):
+                return prices
+        # Same batched vs_currencies requests as a monitor tick
+        return await self.crypto_api.get_quotes({ticker for ticker, _ in pairs}, {currency for _, currency in pairs})
+
+    async def run(self, run: Dict, progress: Optional[ProgressCallback] = None) -> Dict:
+        """Broadcast to every user after run['cursor_user_id'], return final counters"""
+        prices = await self.take_snapshot()
+        if not prices:
+            raise RuntimeError("could not retrieve prices")
+
+        cursor_user_id = run['cursor_user_id']
+        sent = run['sent']
+        failed = run['failed']
+        while True:
+            if self.monitor:
+                # Paused while the monitor sheds load; threshold alerts go first
+                await self.monitor.overload.wait_broadcasts_allowed()
+            page = self.db.get_alerts_page_by_user(cursor_user_id, self.page_size)
+            if not page:
+                break
+
+            # Render the whole page, then hand it to the sender at once
+            futures = []
+            for user_id, alerts in page.items():
+                text = PriceMonitor.render_price_update(alerts, prices)
+                if text:
+                    futures.append(self.sender.submit(user_id, text, parse_mode="Markdown"))
+            results = await asyncio.gather(*futures)
+            sent += sum(1 for delivered in results if delivered)
+            failed += sum(1 for delivered in results if not delivered)
+
+            cursor_user_id = max(page)
+            self.db.update_broadcast_run(run['id'], cursor_user_id, sent, failed)
+            if progress:
+                await progress({'id': run['id'], 'cursor_user_id': cursor_user_id, 'sent': sent, 'failed': failed})
+
+        self.db.update_broadcast_run(run['id'], cursor_user_id, sent, failed, status='done')
+        logger.info("Broadcast done", extra={'run_id': run['id'], 'sent': sent, 'failed': failed})
+        return {'id': run['id'], 'cursor_user_id': cursor_user_id, 'sent': sent, 'failed': failed}
@@ -5,18 +5,125 @@ load_dotenv()
 
 # Bot Configuration
 BOT_TOKEN = os.getenv('BOT_TOKEN')
-if not BOT_TOKEN:
-    raise ValueError("BOT_TOKEN not found in environment variables")
+
+def validate_config():
+    """Fail fast on missing required settings (called by the entry points, not at import)"""
+    if not BOT_TOKEN:
+        raise ValueError("BOT_TOKEN not found in environment variables")
+    if BOT_MODE == 'webhook' and not WEBHOOK_SECRET:
+        # Without it anyone who can reach the endpoint could inject updates
+        raise ValueError("WEBHOOK_SECRET is required when BOT_MODE=webhook")
 
 # CoinGecko API Configuration
-COINGECKO_API_URL = "https://api.coingecko.com/api/v3"
+COINGECKO_API_URL = os.getenv('COINGECKO_API_URL', "https://api.coingecko.com/api/v3")
+BINANCE_API_URL = os.getenv('BINANCE_API_URL', "https://api.binance.com/api/v3")
+
+# Cached CoinGecko coin list for the local symbol index
+COIN_LIST_PATH = os.getenv('COIN_LIST_PATH', 'coins_list.json.gz')
+COIN_LIST_MAX_AGE = 86400  # refresh the coin list once a day
 
 # Database Configuration
-DATABASE_PATH = "bot_database.db"
+DATABASE_PATH = os.getenv('DATABASE_PATH', "bot_database.db")
 
 # Monitoring Configuration
 CHECK_INTERVAL = 60  # 1 minute in seconds
 PRICE_CHECK_DELAY = 10  # seconds between API calls to avoid rate limiting
+PRICE_CACHE_TTL = 20  # seconds a fetched price is reused
+COIN_ID_CACHE_TTL = 86400  # seconds a resolved CoinGecko coin id is reused
+PRICE_BATCH_SIZE = 100  # coin ids per /simple/price request
+
+# Per-user admission limits, checked when an alert is created (0 disables a limit)
+MAX_ALERTS_PER_USER = int(os.getenv('MAX_ALERTS_PER_USER', '50'))
+MAX_TICKERS_PER_USER = int(os.getenv('MAX_TICKERS_PER_USER', '15'))
+
+# My Alerts / Delete Alert views
+ALERTS_PAGE_SIZE = 10  # alerts per page
+DELETE_SELECTION_MAX = 500  # alerts selectable for one bulk delete (bound parameters of one statement)
+
+# Bulk /import of alerts from a CSV or JSON file
+IMPORT_MAX_BYTES = 512 * 1024
+
+# Quote currencies an alert threshold can be set in (CoinGecko vs_currencies)
+DEFAULT_CURRENCY = 'usd'
+CURRENCY_SYMBOLS = {'usd': '$', 'eur': '€', 'uah': '₴', 'gbp': '£'}
+
+# Logging (level can be changed at runtime with /loglevel)
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+LOG_DEBUG_RATE = 5  # max DEBUG lines per second per message template
+
+# Admin user ids, comma separated (empty = admin commands are disabled)
+ADMIN_IDS = {int(user_id) for user_id in os.getenv('ADMIN_IDS', '').split(',') if user_id.strip()}
+
+# On-demand profiling output (/profile command or SIGUSR1)
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+PROFILE_DEFAULT_COUNT = 3
+
+# Metrics endpoint (0 disables it)
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', '9108'))
+
+# Telegram sending
+SEND_RATE_LIMIT = 25  # messages per second (Telegram allows ~30)
+SEND_CONCURRENCY = 8  # parallel send_message calls
+BROADCAST_PAGE_SIZE = 200  # users loaded from the DB per broadcast page
+
+# Update ingestion: "polling" (long polling) or "webhook" (aiohttp server)
+BOT_MODE = os.getenv('BOT_MODE', 'polling')
+WEBHOOK_URL = os.getenv('WEBHOOK_URL', '')  # public base URL, e.g. https://bot.example.com
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/webhook')
+WEBHOOK_HOST = os.getenv('WEBHOOK_HOST', '0.0.0.0')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', '8080'))
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET', '')
+WEBHOOK_CONCURRENCY = int(os.getenv('WEBHOOK_CONCURRENCY', '64'))  # updates processed at once per process
+WEBHOOK_MAX_CONNECTIONS = 40  # parallel connections Telegram may open (setWebhook max_connections)
+
+# FSM storage: "sqlite" (shared by all bot processes, survives restarts) or "memory"
+FSM_STORAGE = os.getenv('FSM_STORAGE', 'sqlite')
+FSM_CACHE_TTL = 1.0  # seconds a state read from SQLite is served from the local cache
+FSM_FLUSH_INTERVAL = 0.05  # seconds between batched FSM writes
+
+# Sharded monitoring ("inline" runs the monitor inside the bot process,
+# "sharded" expects separate `python monitor_worker.py` processes)
+MONITOR_MODE = os.getenv('MONITOR_MODE', 'inline')
+MONITOR_WORKERS = int(os.getenv('MONITOR_WORKERS', '2'))
+WORKER_HEARTBEAT_INTERVAL = 15  # seconds between worker heartbeats
+WORKER_TTL = 60  # worker is considered gone after this many seconds without heartbeat
+
+# Overload control: staged load shedding when ticks run long or the send queue backs up.
+# Pressure = max(tick seconds / CHECK_INTERVAL, queued messages / OVERLOAD_QUEUE_DEPTH)
+OVERLOAD_QUEUE_DEPTH = 500
+OVERLOAD_ENTER = 0.8  # pressure that raises the level by one stage per tick
+OVERLOAD_EXIT = 0.5  # pressure under which a tick counts as calm
+OVERLOAD_RECOVER_TICKS = 3  # calm ticks in a row before stepping one stage down
+OVERLOAD_SLOW_EVERY = 5  # shed tickers are still fetched every N-th tick
+OVERLOAD_HOT_MOVE = 2.0  # % move within the auto-alert window that keeps a coin hot
+OVERLOAD_FAR_DISTANCE = 0.1  # a ticker this far (fraction of price) from all its thresholds is "far"
+
+# Warm-restart snapshot of monitor state
+STATE_SNAPSHOT_PATH = os.getenv('STATE_SNAPSHOT_PATH', 'monitor_state.snapshot')
+STATE_SNAPSHOT_INTERVAL = 60  # seconds between snapshots
+STATE_SNAPSHOT_MAX_AGE = 3600  # older snapshots are discarded at startup
+
+# Local price history: bar resolution in seconds -> retention in seconds
+PRICE_HISTORY_RETENTION = {
+    60: 2 * 86400,          # 1m bars for 2 days
+    3600: 90 * 86400,       # 1h bars for 90 days
+    86400: 5 * 365 * 86400  # 1d bars for 5 years
+}
+PRICE_HISTORY_PRUNE_INTERVAL = 3600  # seconds between retention passes
+
+# Price tape: every tick's price snapshot is appended here for offline replay (empty disables)
+PRICE_TAPE_PATH = os.getenv('PRICE_TAPE_PATH', '')
+PRICE_TAPE_FLUSH_INTERVAL = 600  # seconds of frames buffered between flushes (each flush ends a deflate block)
+
+# Removal of fired one-shot and expired alerts (batched background deletes)
+ALERT_CLEANUP_INTERVAL = 60  # seconds between cleanup passes
+ALERT_CLEANUP_BATCH = 500  # alerts deleted per statement
+
+# Graceful shutdown (SIGTERM/SIGINT); keep SHUTDOWN_TIMEOUT below the supervisor's kill timeout
+SHUTDOWN_TIMEOUT = 25  # seconds for the whole shutdown sequence
+SHUTDOWN_TICK_TIMEOUT = 10  # seconds a monitor tick in progress may take to finish
+SHUTDOWN_DRAIN_TIMEOUT = 10  # seconds to deliver queued notifications
 
 # Dark theme emojis and styling
 DARK_EMOJIS = {
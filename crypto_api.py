@@ -1,12 +1,37 @@
 import aiohttp
 import asyncio
-from typing import Optional, Dict
-from config import COINGECKO_API_URL, PRICE_CHECK_DELAY
+import logging
+import time
+from typing import Optional, Dict, Iterable, List, Tuple
+from config import (COINGECKO_API_URL, BINANCE_API_URL, PRICE_CHECK_DELAY, PRICE_CACHE_TTL, COIN_ID_CACHE_TTL,
+                    PRICE_BATCH_SIZE, DEFAULT_CURRENCY, CURRENCY_SYMBOLS)
+from metrics import PRICE_REQUEST_LATENCY, PRICE_REQUEST_ERRORS, CACHE_REQUESTS
+from symbol_index import symbol_index
+from alert_record import AlertRecord
+
+logger = logging.getLogger(__name__)
+
+def price_key(coin_ticker: str, currency: str = DEFAULT_CURRENCY) -> str:
+    """Key of a quote in price snapshots: 'BTC' for USD, 'BTC/EUR' for other currencies"""
+    currency = (currency or DEFAULT_CURRENCY).lower()
+    return coin_ticker.upper() if currency == DEFAULT_CURRENCY else f"{coin_ticker.upper()}/{currency.upper()}"
+
+def alert_price_key(alert: AlertRecord) -> str:
+    """Snapshot key an alert is evaluated against (its ticker in its quote currency)"""
+    return price_key(alert.coin_ticker, alert.currency)
+
+def format_money(value: float, currency: str = DEFAULT_CURRENCY, digits: int = 2) -> str:
+    """Amount with its currency sign, e.g. 1,234.50$ or 1,234.50€"""
+    currency = (currency or DEFAULT_CURRENCY).lower()
+    return f"{value:,.{digits}f}{CURRENCY_SYMBOLS.get(currency, ' ' + currency.upper())}"
 
 class CryptoAPI:
     def __init__(self):
         self.base_url = COINGECKO_API_URL
+        self.binance_url = BINANCE_API_URL
         self.session = None
+        self.price_cache = {}  # {(ticker, currency): (timestamp, price)}
+        self.coin_id_cache = {}  # {ticker: (timestamp, coin_id or None)}
     
     async def get_session(self):
         """Get or create aiohttp session"""
@@ -19,52 +44,126 @@ class CryptoAPI:
         if self.session and not self.session.closed:
             await self.session.close()
     
-    async def get_coin_price(self, coin_ticker: str) -> Optional[float]:
-        """Get current price for a coin by ticker, with Binance fallback and 5s timeout for CoinGecko"""
+    async def get_coin_price(self, coin_ticker: str, currency: str = DEFAULT_CURRENCY) -> Optional[float]:
+        """Get current price for a coin by ticker, served from a short-lived cache when possible"""
+        quotes = await self.get_quotes([coin_ticker], [currency])
+        return quotes.get(price_key(coin_ticker, currency))
+
+    async def get_quotes(self, coin_tickers: Iterable[str], currencies: Iterable[str] = (DEFAULT_CURRENCY,)) -> Dict[str, float]:
+        """Get prices of coins in several currencies, keyed by price_key().
+
+        Fresh (ticker, currency) pairs come from the cache; the other coins are
+        fetched in chunks of PRICE_BATCH_SIZE ids, each chunk asking for every
+        currency in one vs_currencies list, so extra currencies cost no extra requests.
+        """
+        currencies = sorted({currency.lower() for currency in currencies} | {DEFAULT_CURRENCY})
+        quotes = {}
+        missing = []
+        now = time.time()
+        for ticker in dict.fromkeys(ticker.upper() for ticker in coin_tickers):
+            cached = [self.price_cache.get((ticker, currency)) for currency in currencies]
+            if all(entry and now - entry[0] < PRICE_CACHE_TTL for entry in cached):
+                CACHE_REQUESTS.inc(cache='price', result='hit')
+                for currency, entry in zip(currencies, cached):
+                    quotes[price_key(ticker, currency)] = entry[1]
+            else:
+                CACHE_REQUESTS.inc(cache='price', result='miss')
+                missing.append(ticker)
+        if missing:
+            fetched = await self._fetch_quotes(missing, currencies)
+            now = time.time()
+            for (ticker, currency), price in fetched.items():
+                self.price_cache[(ticker, currency)] = (now, price)
+                quotes[price_key(ticker, currency)] = price
+            logger.debug("Prices fetched", extra={'tickers': len(missing), 'currencies': ','.join(currencies), 'quotes': len(fetched)})
+        return quotes
+
+    async def _fetch_quotes(self, coin_tickers: List[str], currencies: List[str]) -> Dict[Tuple[str, str], float]:
+        """Fetch {(ticker, currency): price} from CoinGecko in chunks, with Binance fallback for USD"""
+        tickers_by_id: Dict[str, List[str]] = {}
+        fallback = []
+        for ticker in coin_tickers:
+            coin_id = await self._get_coin_id(ticker)
+            if coin_id:
+                tickers_by_id.setdefault(coin_id, []).append(ticker)
+            else:
+                fallback.append(ticker)
+
+        quotes = {}
+        rates = {}  # currency -> units per USD, taken from any coin quoted in both
+        coin_ids = list(tickers_by_id)
+        for i in range(0, len(coin_ids), PRICE_BATCH_SIZE):
+            chunk = coin_ids[i:i + PRICE_BATCH_SIZE]
+            data = await self._fetch_simple_prices(chunk, currencies)
+            for coin_id in chunk:
+                row = data.get(coin_id) or {}
+                for ticker in tickers_by_id[coin_id]:
+                    if row.get(DEFAULT_CURRENCY) is None:
+                        fallback.append(ticker)
+                        continue
+                    for currency in currencies:
+                        if row.get(currency) is not None:
+                            quotes[(ticker, currency)] = row[currency]
+                if row.get(DEFAULT_CURRENCY):
+                    for currency in currencies:
+                        if currency not in rates and row.get(currency) is not None:
+                            rates[currency] = row[currency] / row[DEFAULT_CURRENCY]
+
+        if fallback:
+            # Binance only quotes USDT pairs; other currencies are converted at this batch's rates
+            prices = await asyncio.gather(*(self._get_binance_price(ticker) for ticker in fallback))
+            for ticker, price in zip(fallback, prices):
+                if price is None:
+                    continue
+                logger.debug("Binance price", extra={'ticker': ticker, 'price': price})
+                quotes[(ticker, DEFAULT_CURRENCY)] = price
+                for currency, rate in rates.items():
+                    quotes.setdefault((ticker, currency), price * rate)
+        return quotes
+
+    async def _fetch_simple_prices(self, coin_ids: List[str], currencies: List[str], retry: bool = True) -> Dict[str, Dict[str, float]]:
+        """One CoinGecko /simple/price request for many ids and currencies (5s timeout, one retry on 429)"""
+        params = {
+            'ids': ','.join(coin_ids),
+            'vs_currencies': ','.join(currencies)
+        }
         try:
             session = await self.get_session()
-            coin_id = await self._get_coin_id(coin_ticker)
-            if not coin_id:
-                price = await self._get_binance_price(coin_ticker)
-                if price is not None:
-                    print(f"[BINANCE] Price for {coin_ticker}: {price}")
-                return price
-            url = f"{self.base_url}/simple/price"
-            params = {
-                'ids': coin_id,
-                'vs_currencies': 'usd'
-            }
-            try:
-                async def coingecko_request():
-                    async with session.get(url, params=params) as response:
+
+            async def coingecko_request():
+                with PRICE_REQUEST_LATENCY.time(provider='coingecko', endpoint='simple/price'):
+                    async with session.get(f"{self.base_url}/simple/price", params=params) as response:
                         if response.status == 200:
-                            data = await response.json()
-                            if coin_id in data and 'usd' in data[coin_id]:
-                                return data[coin_id]['usd']
-                        if response.status == 429:
-                            await asyncio.sleep(PRICE_CHECK_DELAY)
-                            return await self.get_coin_price(coin_ticker)
-                        return None
-                price = await asyncio.wait_for(coingecko_request(), timeout=5)
-                if price is not None:
-                    return price
-            except asyncio.TimeoutError:
-                print(f"[GECKO] Timeout for {coin_ticker}, trying Binance...")
-            except Exception as e:
-                print(f"[GECKO] Error for {coin_ticker}: {e}")
-            price = await self._get_binance_price(coin_ticker)
-            if price is not None:
-                print(f"[BINANCE] Price for {coin_ticker}: {price}")
-            return price
+                            return await response.json(), 200
+                        PRICE_REQUEST_ERRORS.inc(provider='coingecko', endpoint='simple/price', reason=response.status)
+                        return {}, response.status
+
+            data, status = await asyncio.wait_for(coingecko_request(), timeout=5)
+            if status == 429 and retry:
+                await asyncio.sleep(PRICE_CHECK_DELAY)
+                return await self._fetch_simple_prices(coin_ids, currencies, retry=False)
+            return data
+        except asyncio.TimeoutError:
+            PRICE_REQUEST_ERRORS.inc(provider='coingecko', endpoint='simple/price', reason='timeout')
+            logger.warning("CoinGecko timeout, trying Binance", extra={'coins': len(coin_ids)})
         except Exception as e:
-            print(f"Error getting price for {coin_ticker}: {e}")
-            price = await self._get_binance_price(coin_ticker)
-            if price is not None:
-                print(f"[BINANCE] Price for {coin_ticker}: {price}")
-            return price
+            logger.warning("CoinGecko error: %s", e, extra={'coins': len(coin_ids)})
+        return {}
     
     async def _get_coin_id(self, coin_ticker: str) -> Optional[str]:
-        """Get CoinGecko coin ID from ticker symbol"""
+        """Get CoinGecko coin ID from ticker symbol (cached, including misses)"""
+        cached = self.coin_id_cache.get(coin_ticker.upper())
+        # Misses are kept shorter: they may come from a transient /search error
+        if cached and time.time() - cached[0] < (COIN_ID_CACHE_TTL if cached[1] else 300):
+            CACHE_REQUESTS.inc(cache='coin_id', result='hit')
+            return cached[1]
+        CACHE_REQUESTS.inc(cache='coin_id', result='miss')
+        coin_id = await self._resolve_coin_id(coin_ticker)
+        self.coin_id_cache[coin_ticker.upper()] = (time.time(), coin_id)
+        return coin_id
+    
+    async def _resolve_coin_id(self, coin_ticker: str) -> Optional[str]:
+        """Resolve CoinGecko coin ID from ticker symbol"""
         try:
             session = await self.get_session()
             
@@ -96,21 +195,29 @@ class CryptoAPI:
             if coin_ticker.upper() in coin_mappings:
                 return coin_mappings[coin_ticker.upper()]
             
+            # Unambiguous symbols are resolved by the local index
+            coin_id = symbol_index.coin_id(coin_ticker)
+            if coin_id:
+                return coin_id
+            
             # Search API for other coins
             url = f"{self.base_url}/search"
             params = {'query': coin_ticker}
             
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    if 'coins' in data and len(data['coins']) > 0:
-                        # Return the first (most relevant) result
-                        return data['coins'][0]['id']
-                
-                return None
+            with PRICE_REQUEST_LATENCY.time(provider='coingecko', endpoint='search'):
+                async with session.get(url, params=params) as response:
+                    if response.status == 200:
+                        data = await response.json()
+                        if 'coins' in data and len(data['coins']) > 0:
+                            # Return the first (most relevant) result
+                            return data['coins'][0]['id']
+                    else:
+                        PRICE_REQUEST_ERRORS.inc(provider='coingecko', endpoint='search', reason=response.status)
+                    
+                    return None
                 
         except Exception as e:
-            print(f"Error getting coin ID for {coin_ticker}: {e}")
+            logger.error("Error getting coin ID: %s", e, extra={'ticker': coin_ticker})
             return None
     
     async def _get_binance_price(self, coin_ticker: str) -> Optional[float]:
@@ -118,23 +225,41 @@ class CryptoAPI:
         try:
             session = await self.get_session()
             symbol = coin_ticker.upper() + 'USDT'
-            url = f'https://api.binance.com/api/v3/ticker/price?symbol={symbol}'
-            async with session.get(url) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    if 'price' in data:
-                        return float(data['price'])
+            url = f'{self.binance_url}/ticker/price?symbol={symbol}'
+            with PRICE_REQUEST_LATENCY.time(provider='binance', endpoint='ticker/price'):
+                async with session.get(url) as response:
+                    if response.status == 200:
+                        data = await response.json()
+                        if 'price' in data:
+                            return float(data['price'])
+                    else:
+                        PRICE_REQUEST_ERRORS.inc(provider='binance', endpoint='ticker/price', reason=response.status)
             return None
         except Exception as e:
-            print(f"[BINANCE] Error for {coin_ticker}: {e}")
+            logger.warning("Binance error: %s", e, extra={'ticker': coin_ticker})
             return None
 
+    def get_cached_price(self, coin_ticker: str, currency: str = DEFAULT_CURRENCY) -> Optional[float]:
+        """Get a still fresh cached price without any network call"""
+        cached = self.price_cache.get((coin_ticker.upper(), currency.lower()))
+        if cached and time.time() - cached[0] < PRICE_CACHE_TTL:
+            return cached[1]
+        return None
+    
+    async def get_coin_list(self) -> List[Dict]:
+        """Get the full CoinGecko coin list ({id, symbol, name} entries)"""
+        try:
+            session = await self.get_session()
+            with PRICE_REQUEST_LATENCY.time(provider='coingecko', endpoint='coins/list'):
+                async with session.get(f"{self.base_url}/coins/list") as response:
+                    if response.status == 200:
+                        return await response.json()
+                    PRICE_REQUEST_ERRORS.inc(provider='coingecko', endpoint='coins/list', reason=response.status)
+            return []
+        except Exception as e:
+            logger.error("Error getting coin list: %s", e)
+            return []
+    
     async def get_multiple_prices(self, coin_tickers: list) -> Dict[str, float]:
-        """Get prices for multiple coins efficiently, with Binance fallback and 5s timeout for CoinGecko"""
-        prices = {}
-        for ticker in coin_tickers:
-            price = await self.get_coin_price(ticker)
-            if price is not None:
-                prices[ticker.upper()] = price
-            await asyncio.sleep(1)
-        return prices 
\ No newline at end of file
+        """Get USD prices for multiple coins, {TICKER: price}"""
+        return await self.get_quotes(coin_tickers)
@@ -1,12 +1,23 @@
 import sqlite3
 import json
-from typing import List, Dict, Optional
-from config import DATABASE_PATH
+import logging
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from config import DATABASE_PATH, DEFAULT_CURRENCY
+from alert_record import AlertRecord, UserAlertRecord
+from metrics import db_timed
+
+logger = logging.getLogger(__name__)
+
+TICKER_FILTER_CHUNK = 500  # tickers per IN (...) list, below SQLite's 999 bound parameters
 
 class Database:
+    _initialized_paths = set()  # DDL runs once per database file per process
+    
     def __init__(self):
         self.db_path = DATABASE_PATH
-        self.init_database()
+        if self.db_path not in Database._initialized_paths:
+            self.init_database()
+            Database._initialized_paths.add(self.db_path)
     
     def init_database(self):
         """Initialize database tables"""
@@ -32,10 +43,34 @@ class Database:
                     threshold_type TEXT,
                     threshold_price REAL,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    base_price REAL,
+                    peak_price REAL,
+                    triggered_at INTEGER,
+                    one_shot INTEGER DEFAULT 0,
+                    expires_at INTEGER,
+                    currency TEXT DEFAULT 'usd',
                     FOREIGN KEY (user_id) REFERENCES users (user_id)
                 )
             ''')
             
+            # Columns added after the first release (percent/trailing, one-shot, expiring and non-USD alerts)
+            cursor.execute('PRAGMA table_info(alerts)')
+            alert_columns = {row[1] for row in cursor.fetchall()}
+            for column, column_type in (('base_price', 'REAL'), ('peak_price', 'REAL'), ('triggered_at', 'INTEGER'),
+                                        ('one_shot', 'INTEGER DEFAULT 0'), ('expires_at', 'INTEGER'),
+                                        ('currency', "TEXT DEFAULT 'usd'")):
+                if column not in alert_columns:
+                    cursor.execute(f'ALTER TABLE alerts ADD COLUMN {column} {column_type}')
+            # Cleanup finds fired and expired alerts without a table scan
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_alerts_triggered ON alerts (triggered_at) WHERE triggered_at IS NOT NULL')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_alerts_expires ON alerts (expires_at) WHERE expires_at IS NOT NULL')
+            # Quota checks count one user's alerts on every add
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_alerts_user ON alerts (user_id, coin_ticker)')
+            # Keyset pages of My Alerts / Delete Alert
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_alerts_user_created ON alerts (user_id, created_at, id)')
+            # Sharded workers read only the alerts of their tickers
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_alerts_ticker ON alerts (coin_ticker)')
+            
             # Auto alerts table
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS auto_alerts (
@@ -47,8 +82,71 @@ class Database:
                 )
             ''')
             
+            # FSM states table (shared dialog state, see fsm_storage.py)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS fsm_states (
+                    key TEXT PRIMARY KEY,
+                    state TEXT,
+                    data TEXT,
+                    updated_at REAL
+                )
+            ''')
+            
+            # Monitor workers table (sharded monitoring)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS monitor_workers (
+                    worker_id TEXT PRIMARY KEY,
+                    started_at INTEGER,
+                    heartbeat_at INTEGER
+                )
+            ''')
+            
+            # Monitor state handed over between sharded workers when tickers move
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS monitor_triggered (
+                    alert_id INTEGER PRIMARY KEY
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS monitor_cooldowns (
+                    user_id INTEGER,
+                    coin_ticker TEXT,
+                    last_alert_at INTEGER,
+                    PRIMARY KEY (user_id, coin_ticker)
+                ) WITHOUT ROWID
+            ''')
+            
+            # Broadcast runs table (resumable /broadcast)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS broadcast_runs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    started_by INTEGER,
+                    cursor_user_id INTEGER DEFAULT 0,
+                    sent INTEGER DEFAULT 0,
+                    failed INTEGER DEFAULT 0,
+                    status TEXT DEFAULT 'running',
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            # Price bars table (local price history, one row per ticker and bucket)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS price_bars (
+                    resolution INTEGER,
+                    coin_ticker TEXT,
+                    bucket INTEGER,
+                    open REAL,
+                    high REAL,
+                    low REAL,
+                    close REAL,
+                    samples INTEGER,
+                    PRIMARY KEY (resolution, coin_ticker, bucket)
+                ) WITHOUT ROWID
+            ''')
+            
             conn.commit()
     
+    @db_timed
     def add_user(self, user_id: int, username: str, first_name: str) -> bool:
         """Add new user to database"""
         try:
@@ -61,9 +159,10 @@ class Database:
                 conn.commit()
                 return True
         except Exception as e:
-            print(f"Error adding user: {e}")
+            logger.error("Error adding user: %s", e)
             return False
     
+    @db_timed
     def get_user(self, user_id: int) -> Optional[Dict]:
         """Get user by user_id"""
         try:
@@ -80,48 +179,82 @@ class Database:
                     }
                 return None
         except Exception as e:
-            print(f"Error getting user: {e}")
+            logger.error("Error getting user: %s", e)
             return None
     
-    def add_alert(self, user_id: int, coin_ticker: str, threshold_type: str, threshold_price: float) -> bool:
-        """Add new price alert"""
+    @db_timed
+    def add_alert(self, user_id: int, coin_ticker: str, threshold_type: str, threshold_price: float,
+                  base_price: Optional[float] = None, one_shot: bool = False, expires_at: Optional[int] = None,
+                  currency: str = DEFAULT_CURRENCY) -> bool:
+        """Add new price alert (for percent/trailing alerts threshold_price is the percentage)"""
         try:
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
-                    INSERT INTO alerts (user_id, coin_ticker, threshold_type, threshold_price)
-                    VALUES (?, ?, ?, ?)
-                ''', (user_id, coin_ticker.upper(), threshold_type, threshold_price))
+                    INSERT INTO alerts (user_id, coin_ticker, threshold_type, threshold_price, base_price, one_shot, expires_at,
+                                        currency)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (user_id, coin_ticker.upper(), threshold_type, threshold_price, base_price, int(one_shot), expires_at,
+                      currency.lower()))
                 conn.commit()
                 return True
         except Exception as e:
-            print(f"Error adding alert: {e}")
+            logger.error("Error adding alert: %s", e)
             return False
     
-    def get_user_alerts(self, user_id: int) -> List[Dict]:
+    @db_timed
+    def add_alerts(self, user_id: int, alerts: Iterable[Dict]) -> int:
+        """Add many alerts (alert_io rows) in one executemany transaction; returns how many were inserted"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.executemany('''
+                    INSERT INTO alerts (user_id, coin_ticker, threshold_type, threshold_price, base_price, one_shot, expires_at,
+                                        currency)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', ((user_id, alert['ticker'], alert['type'], alert['value'], alert['base_price'], int(alert['once']),
+                       alert['expires_at'], alert['currency']) for alert in alerts))
+                conn.commit()
+                return cursor.rowcount
+        except Exception as e:
+            logger.error("Error adding alerts: %s", e)
+            return 0
+    
+    @db_timed
+    def get_user_alerts(self, user_id: int) -> List[UserAlertRecord]:
         """Get all alerts for a user"""
         try:
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT * FROM alerts WHERE user_id = ? ORDER BY created_at DESC
+                cursor.execute(f'''
+                    SELECT {UserAlertRecord.columns()}
+                    FROM alerts WHERE user_id = ? ORDER BY created_at DESC
                 ''', (user_id,))
-                alerts = cursor.fetchall()
-                return [
-                    {
-                        'id': alert[0],
-                        'user_id': alert[1],
-                        'coin_ticker': alert[2],
-                        'threshold_type': alert[3],
-                        'threshold_price': alert[4],
-                        'created_at': alert[5]
-                    }
-                    for alert in alerts
-                ]
+                return [UserAlertRecord(*row) for row in cursor.fetchall()]
         except Exception as e:
-            print(f"Error getting alerts: {e}")
+            logger.error("Error getting alerts: %s", e)
             return []
     
+    @db_timed
+    def delete_user_alerts(self, user_id: int, alert_ids: List[int]) -> List[int]:
+        """Delete several alerts of one user with a single DELETE ... WHERE id IN; returns the deleted ids"""
+        if not alert_ids:
+            return []
+        placeholders = ','.join('?' * len(alert_ids))
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                # Ids that really belong to the user, read in the same transaction as the delete
+                cursor.execute(f'SELECT id FROM alerts WHERE user_id = ? AND id IN ({placeholders})', (user_id, *alert_ids))
+                deleted = [row[0] for row in cursor.fetchall()]
+                cursor.execute(f'DELETE FROM alerts WHERE user_id = ? AND id IN ({placeholders})', (user_id, *alert_ids))
+                conn.commit()
+                return deleted
+        except Exception as e:
+            logger.error("Error deleting alerts: %s", e)
+            return []
+    
+    @db_timed
     def delete_alert(self, alert_id: int, user_id: int) -> bool:
         """Delete specific alert"""
         try:
@@ -133,38 +266,158 @@ class Database:
                 conn.commit()
                 return cursor.rowcount > 0
         except Exception as e:
-            print(f"Error deleting alert: {e}")
+            logger.error("Error deleting alert: %s", e)
             return False
     
-    def get_all_alerts(self) -> List[Dict]:
-        """Get all alerts for monitoring"""
+    @db_timed
+    def get_user_alerts_page(self, user_id: int, limit: int, position: Optional[Tuple[str, int]] = None,
+                             backward: bool = False) -> List[UserAlertRecord]:
+        """Up to `limit` alerts of a user, newest first, after the (created_at, id) `position` (before it when `backward`)"""
         try:
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT a.*, u.username, u.first_name 
-                    FROM alerts a 
+                if position is None:
+                    cursor.execute(f'''
+                        SELECT {UserAlertRecord.columns()} FROM alerts WHERE user_id = ?
+                        ORDER BY created_at DESC, id DESC LIMIT ?
+                    ''', (user_id, limit))
+                elif backward:
+                    cursor.execute(f'''
+                        SELECT {UserAlertRecord.columns()} FROM alerts WHERE user_id = ? AND (created_at, id) > (?, ?)
+                        ORDER BY created_at, id LIMIT ?
+                    ''', (user_id, position[0], position[1], limit))
+                else:
+                    cursor.execute(f'''
+                        SELECT {UserAlertRecord.columns()} FROM alerts WHERE user_id = ? AND (created_at, id) < (?, ?)
+                        ORDER BY created_at DESC, id DESC LIMIT ?
+                    ''', (user_id, position[0], position[1], limit))
+                alerts = [UserAlertRecord(*row) for row in cursor.fetchall()]
+                return alerts[::-1] if position is not None and backward else alerts
+        except Exception as e:
+            logger.error("Error getting alerts page: %s", e)
+            return []
+    
+    @staticmethod
+    def _ticker_filters(column: str, tickers: Optional[Iterable[str]]) -> Iterator[Tuple[str, tuple]]:
+        """`AND column IN (...)` clauses with their parameters, in chunks under SQLite's variable limit
+        (one empty clause when `tickers` is None)"""
+        if tickers is None:
+            yield '', ()
+            return
+        tickers = list(tickers)
+        for start in range(0, len(tickers), TICKER_FILTER_CHUNK):
+            chunk = tuple(tickers[start:start + TICKER_FILTER_CHUNK])
+            yield f"AND {column} IN ({','.join('?' * len(chunk))})", chunk
+    
+    @db_timed
+    def get_all_alerts(self, tickers: Optional[Iterable[str]] = None) -> List[AlertRecord]:
+        """Get all armed alerts for monitoring (fired one-shot and expired alerts are left out)"""
+        return list(self.iter_all_alerts(tickers=tickers))
+    
+    def iter_all_alerts(self, batch_size: int = 10000, tickers: Optional[Iterable[str]] = None) -> Iterator[AlertRecord]:
+        """Stream armed alerts in `fetchmany` batches, without building the full result list.
+        
+        `tickers` limits them to those tickers (a sharded worker's partition).
+        """
+        conn = sqlite3.connect(self.db_path)
+        try:
+            for ticker_filter, params in self._ticker_filters('a.coin_ticker', tickers):
+                # Only the columns the monitor evaluates; id order needs no sort
+                cursor = conn.execute(f'''
+                    SELECT {AlertRecord.columns('a')}
+                    FROM alerts a
                     JOIN users u ON a.user_id = u.user_id
-                    ORDER BY a.created_at DESC
+                    WHERE a.triggered_at IS NULL
+                      AND (a.expires_at IS NULL OR a.expires_at > CAST(strftime('%s', 'now') AS INTEGER))
+                      {ticker_filter}
+                    ORDER BY a.id DESC
+                ''', params)
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    for row in rows:
+                        yield AlertRecord(*row)
+        except Exception as e:
+            logger.error("Error getting all alerts: %s", e)
+        finally:
+            conn.close()
+    
+    @db_timed
+    def get_alert_quote_pairs(self) -> List[Tuple[str, str]]:
+        """Distinct (ticker, currency) pairs of armed alerts"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT DISTINCT coin_ticker, COALESCE(currency, ?) FROM alerts
+                    WHERE triggered_at IS NULL
+                      AND (expires_at IS NULL OR expires_at > CAST(strftime('%s', 'now') AS INTEGER))
+                ''', (DEFAULT_CURRENCY,))
+                return cursor.fetchall()
+        except Exception as e:
+            logger.error("Error getting alert quote pairs: %s", e)
+            return []
+    
+    @db_timed
+    def get_followed_tickers(self) -> List[str]:
+        """Distinct tickers with an alert or an enabled auto-alert"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT coin_ticker FROM alerts
+                    UNION
+                    SELECT coin_ticker FROM auto_alerts WHERE enabled = 1
                 ''')
-                alerts = cursor.fetchall()
-                return [
-                    {
-                        'id': alert[0],
-                        'user_id': alert[1],
-                        'coin_ticker': alert[2],
-                        'threshold_type': alert[3],
-                        'threshold_price': alert[4],
-                        'created_at': alert[5],
-                        'username': alert[6],
-                        'first_name': alert[7]
-                    }
-                    for alert in alerts
-                ]
+                return [row[0] for row in cursor.fetchall()]
         except Exception as e:
-            print(f"Error getting all alerts: {e}")
+            logger.error("Error getting followed tickers: %s", e)
             return []
     
+    @db_timed
+    def get_user_alert_usage(self, user_id: int) -> Dict[str, int]:
+        """Armed alerts of one user per ticker, for quota checks"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT coin_ticker, COUNT(*) FROM alerts
+                    WHERE user_id = ? AND triggered_at IS NULL
+                      AND (expires_at IS NULL OR expires_at > CAST(strftime('%s', 'now') AS INTEGER))
+                    GROUP BY coin_ticker
+                ''', (user_id,))
+                return dict(cursor.fetchall())
+        except Exception as e:
+            logger.error("Error getting alert usage: %s", e)
+            return {}
+    
+    @db_timed
+    def get_alerts_page_by_user(self, after_user_id: int, limit: int) -> Dict[int, List[UserAlertRecord]]:
+        """Get armed alerts of the next `limit` users (ordered by user_id) after `after_user_id`"""
+        armed = "triggered_at IS NULL AND (expires_at IS NULL OR expires_at > CAST(strftime('%s', 'now') AS INTEGER))"
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                # Fired one-shot and expired alerts wait for the cleanup task; they are not broadcast
+                cursor.execute(f'''
+                    SELECT {UserAlertRecord.columns()}
+                    FROM alerts
+                    WHERE user_id IN (
+                        SELECT DISTINCT user_id FROM alerts WHERE user_id > ? AND {armed} ORDER BY user_id LIMIT ?
+                    ) AND {armed}
+                    ORDER BY user_id, created_at DESC
+                ''', (after_user_id, limit))
+                page = {}
+                for row in cursor.fetchall():
+                    alert = UserAlertRecord(*row)
+                    page.setdefault(alert.user_id, []).append(alert)
+                return page
+        except Exception as e:
+            logger.error("Error getting alerts page: %s", e)
+            return {}
+    
+    @db_timed
     def get_all_users(self) -> List[Dict]:
         """Get all registered users"""
         try:
@@ -181,9 +434,10 @@ class Database:
                     for user in users
                 ]
         except Exception as e:
-            print(f"Error getting all users: {e}")
+            logger.error("Error getting all users: %s", e)
             return [] 
 
+    @db_timed
     def set_auto_alert(self, user_id: int, coin_ticker: str, enabled: bool):
         """Enable or disable auto alert for a coin for a user"""
         with sqlite3.connect(self.db_path) as conn:
@@ -194,6 +448,7 @@ class Database:
             ''', (user_id, coin_ticker.upper(), int(enabled)))
             conn.commit()
 
+    @db_timed
     def get_auto_alerts(self, user_id: int):
         """Get all auto-alert coins for a user"""
         with sqlite3.connect(self.db_path) as conn:
@@ -203,6 +458,23 @@ class Database:
             ''', (user_id,))
             return cursor.fetchall()
 
+    @db_timed
+    def get_enabled_auto_alerts(self, tickers: Optional[Iterable[str]] = None) -> Dict[int, List[str]]:
+        """Enabled auto-alert coins of every registered user in one query, optionally only for `tickers`"""
+        user_coins = {}
+        with sqlite3.connect(self.db_path) as conn:
+            for ticker_filter, params in self._ticker_filters('aa.coin_ticker', tickers):
+                cursor = conn.execute(f'''
+                    SELECT aa.user_id, aa.coin_ticker FROM auto_alerts aa
+                    JOIN users u ON aa.user_id = u.user_id
+                    WHERE aa.enabled = 1 {ticker_filter}
+                    ORDER BY aa.user_id, aa.coin_ticker
+                ''', params)
+                for user_id, coin_ticker in cursor.fetchall():
+                    user_coins.setdefault(user_id, []).append(coin_ticker)
+        return user_coins
+
+    @db_timed
     def remove_auto_alert(self, user_id: int, coin_ticker: str):
         """Remove auto alert for a coin for a user"""
         with sqlite3.connect(self.db_path) as conn:
@@ -212,6 +484,7 @@ class Database:
             ''', (user_id, coin_ticker.upper()))
             conn.commit() 
 
+    @db_timed
     def set_global_auto_alert(self, user_id: int, enabled: bool):
         """Enable/disable global auto-alert for all popular coins for a user"""
         coins = ["BTC", "ETH", "SOL", "BNB", "ADA", "XRP", "DOGE", "MATIC"]
@@ -224,6 +497,7 @@ class Database:
                 ''', (user_id, coin, int(enabled)))
             conn.commit()
 
+    @db_timed
     def is_global_auto_alert_enabled(self, user_id: int):
         """Check if global auto-alert is enabled for all popular coins for a user"""
         coins = ["BTC", "ETH", "SOL", "BNB", "ADA", "XRP", "DOGE", "MATIC"]
@@ -233,4 +507,203 @@ class Database:
                 SELECT COUNT(*) FROM auto_alerts WHERE user_id = ? AND coin_ticker IN ({}) AND enabled = 1
             '''.format(','.join(['?']*len(coins))), [user_id] + coins)
             count = cursor.fetchone()[0]
-            return count == len(coins) 
\ No newline at end of file
+            return count == len(coins)
+
+    @db_timed
+    def heartbeat_worker(self, worker_id: str, now: int):
+        """Register a monitor worker or refresh its heartbeat"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO monitor_workers (worker_id, started_at, heartbeat_at)
+                VALUES (?, ?, ?)
+                ON CONFLICT(worker_id) DO UPDATE SET heartbeat_at = excluded.heartbeat_at
+            ''', (worker_id, now, now))
+            conn.commit()
+
+    @db_timed
+    def get_live_workers(self, since: int) -> List[str]:
+        """Get ids of monitor workers that sent a heartbeat after `since`"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT worker_id FROM monitor_workers WHERE heartbeat_at >= ? ORDER BY worker_id
+            ''', (since,))
+            return [row[0] for row in cursor.fetchall()]
+
+    @db_timed
+    def remove_worker(self, worker_id: str):
+        """Unregister a monitor worker"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM monitor_workers WHERE worker_id = ?', (worker_id,))
+            conn.commit()
+
+    @db_timed
+    def prune_workers(self, before: int):
+        """Remove monitor workers whose last heartbeat is older than `before`"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM monitor_workers WHERE heartbeat_at < ?', (before,))
+            conn.commit()
+
+    @db_timed
+    def save_monitor_handover(self, triggered: Dict[int, bool], cooldowns: Dict[Tuple[int, str], int]):
+        """Write a sharded worker's triggered/cooldown changes ({id: set?}, {(user_id, ticker): last or 0})"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.executemany('INSERT OR IGNORE INTO monitor_triggered (alert_id) VALUES (?)',
+                               [(alert_id,) for alert_id, on in triggered.items() if on])
+            cursor.executemany('DELETE FROM monitor_triggered WHERE alert_id = ?',
+                               [(alert_id,) for alert_id, on in triggered.items() if not on])
+            cursor.executemany('INSERT OR REPLACE INTO monitor_cooldowns (user_id, coin_ticker, last_alert_at) VALUES (?, ?, ?)',
+                               [(user_id, ticker, last) for (user_id, ticker), last in cooldowns.items() if last])
+            cursor.executemany('DELETE FROM monitor_cooldowns WHERE user_id = ? AND coin_ticker = ?',
+                               [key for key, last in cooldowns.items() if not last])
+            conn.commit()
+
+    @db_timed
+    def get_monitor_handover(self, since: int) -> Tuple[List[int], List[Tuple[int, str, int]]]:
+        """Triggered alert ids and (user_id, ticker, last_alert_at) cooldowns started after `since`"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT alert_id FROM monitor_triggered')
+            triggered = [row[0] for row in cursor.fetchall()]
+            cursor.execute('SELECT user_id, coin_ticker, last_alert_at FROM monitor_cooldowns WHERE last_alert_at > ?',
+                           (since,))
+            return triggered, cursor.fetchall()
+
+    @db_timed
+    def prune_monitor_handover(self, before: int) -> int:
+        """Drop cooldowns that ended before `before` and triggered ids of deleted alerts"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM monitor_cooldowns WHERE last_alert_at <= ?', (before,))
+            removed = cursor.rowcount
+            cursor.execute('DELETE FROM monitor_triggered WHERE alert_id NOT IN (SELECT id FROM alerts)')
+            conn.commit()
+            return removed + cursor.rowcount
+
+    @db_timed
+    def create_broadcast_run(self, started_by: int) -> int:
+        """Start a new broadcast run and return its id"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('INSERT INTO broadcast_runs (started_by) VALUES (?)', (started_by,))
+            conn.commit()
+            return cursor.lastrowid
+
+    @db_timed
+    def get_unfinished_broadcast_run(self) -> Optional[Dict]:
+        """Get the latest broadcast run that did not finish"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT id, cursor_user_id, sent, failed FROM broadcast_runs
+                WHERE status = 'running' ORDER BY id DESC LIMIT 1
+            ''')
+            run = cursor.fetchone()
+            if run:
+                return {'id': run[0], 'cursor_user_id': run[1], 'sent': run[2], 'failed': run[3]}
+            return None
+
+    @db_timed
+    def update_broadcast_run(self, run_id: int, cursor_user_id: int, sent: int, failed: int, status: str = 'running'):
+        """Checkpoint a broadcast run"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE broadcast_runs SET cursor_user_id = ?, sent = ?, failed = ?, status = ? WHERE id = ?
+            ''', (cursor_user_id, sent, failed, status, run_id))
+            conn.commit()
+
+    @db_timed
+    def record_prices(self, prices: Dict[str, float], now: int, resolutions: Iterable[int]):
+        """Fold one price sample per ticker into the bars of every resolution (one batched upsert)"""
+        rows = [
+            (resolution, ticker, now - now % resolution, price, price, price, price)
+            for resolution in resolutions
+            for ticker, price in prices.items()
+            if price is not None
+        ]
+        if not rows:
+            return
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.executemany('''
+                INSERT INTO price_bars (resolution, coin_ticker, bucket, open, high, low, close, samples)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 1)
+                ON CONFLICT(resolution, coin_ticker, bucket) DO UPDATE SET
+                    high = MAX(high, excluded.high),
+                    low = MIN(low, excluded.low),
+                    close = excluded.close,
+                    samples = samples + 1
+            ''', rows)
+            conn.commit()
+
+    @db_timed
+    def get_price_bars(self, coin_ticker: str, resolution: int, since: int) -> List[Tuple]:
+        """Get (bucket, open, high, low, close) bars of a ticker from `since` on, oldest first"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT bucket, open, high, low, close FROM price_bars
+                WHERE resolution = ? AND coin_ticker = ? AND bucket >= ?
+                ORDER BY bucket
+            ''', (resolution, coin_ticker, since))
+            return cursor.fetchall()
+
+    @db_timed
+    def prune_price_bars(self, retention: Dict[int, int], now: int) -> int:
+        """Delete bars older than the retention of their resolution, return rows removed"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            removed = 0
+            for resolution, keep in retention.items():
+                cursor.execute('''
+                    DELETE FROM price_bars WHERE resolution = ? AND bucket < ?
+                ''', (resolution, now - keep))
+                removed += cursor.rowcount
+            conn.commit()
+            return removed
+
+    @db_timed
+    def mark_alerts_triggered(self, alert_ids: List[int], now: int):
+        """Disarm fired one-shot alerts (deleted later by `delete_dead_alerts`)"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.executemany('UPDATE alerts SET triggered_at = ? WHERE id = ?',
+                               [(now, alert_id) for alert_id in alert_ids])
+            conn.commit()
+
+    @db_timed
+    def rearm_alert(self, alert_id: int):
+        """Arm a fired alert again (its notification was never delivered)"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('UPDATE alerts SET triggered_at = NULL WHERE id = ?', (alert_id,))
+            conn.commit()
+
+    @db_timed
+    def update_alert_peaks(self, peaks: List[Tuple[float, int]]):
+        """Checkpoint running peaks of trailing alerts: [(peak_price, alert_id)]"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.executemany('UPDATE alerts SET peak_price = ? WHERE id = ?', peaks)
+            conn.commit()
+
+    @db_timed
+    def delete_dead_alerts(self, now: int, limit: int) -> int:
+        """Delete up to `limit` fired one-shot or expired alerts, return how many were deleted"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                DELETE FROM alerts WHERE id IN (
+                    SELECT id FROM alerts WHERE triggered_at IS NOT NULL
+                    UNION ALL
+                    SELECT id FROM alerts WHERE expires_at <= ?
+                    LIMIT ?
+                )
+            ''', (now, limit))
+            conn.commit()
+            return cursor.rowcount
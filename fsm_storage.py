@@ -0,0 +1,113 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from typing import Any, Dict, Optional, Tuple
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StorageKey, StateType
+from config import DATABASE_PATH, FSM_CACHE_TTL, FSM_FLUSH_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+class SQLiteStorage(BaseStorage):
+    """FSM storage in the bot's SQLite database, shareable between processes.
+
+    Reads are served from an in-process cache for `cache_ttl` seconds (and
+    always for keys with unflushed writes); writes land in the cache at once
+    and are flushed to the `fsm_states` table in one transaction every
+    `flush_interval` seconds. Another process therefore sees a change after
+    at most flush_interval + cache_ttl.
+    """
+
+    def __init__(self, db_path: str = DATABASE_PATH, cache_ttl: float = FSM_CACHE_TTL,
+                 flush_interval: float = FSM_FLUSH_INTERVAL):
+        self.cache_ttl = cache_ttl
+        self.flush_interval = flush_interval
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.cache: Dict[str, Tuple[float, Optional[str], Dict[str, Any]]] = {}  # key -> (loaded_at, state, data)
+        self.dirty: Dict[str, Tuple[Optional[str], Dict[str, Any]]] = {}
+        self.flush_task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _key(key: StorageKey) -> str:
+        parts = [
+            key.bot_id, key.chat_id, key.user_id,
+            getattr(key, 'thread_id', None) or '',
+            getattr(key, 'business_connection_id', None) or '',
+            key.destiny,
+        ]
+        return ':'.join(str(part) for part in parts)
+
+    def _load(self, db_key: str) -> Tuple[Optional[str], Dict[str, Any]]:
+        if db_key in self.dirty:
+            return self.dirty[db_key]
+        cached = self.cache.get(db_key)
+        if cached and time.monotonic() - cached[0] < self.cache_ttl:
+            return cached[1], cached[2]
+        row = self.conn.execute('SELECT state, data FROM fsm_states WHERE key = ?', (db_key,)).fetchone()
+        state, data = (row[0], json.loads(row[1]) if row[1] else {}) if row else (None, {})
+        self.cache[db_key] = (time.monotonic(), state, data)
+        return state, data
+
+    def _store(self, db_key: str, state: Optional[str], data: Dict[str, Any]):
+        self.cache[db_key] = (time.monotonic(), state, data)
+        self.dirty[db_key] = (state, data)
+        if self.flush_task is None or self.flush_task.done():
+            self.flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_interval)
+        self.flush()
+
+    def flush(self):
+        """Write pending changes in one transaction"""
+        if not self.dirty:
+            return
+        pending, self.dirty = self.dirty, {}
+        upserts = []
+        deletes = []
+        for db_key, (state, data) in pending.items():
+            if state is None and not data:
+                deletes.append((db_key,))
+            else:
+                upserts.append((db_key, state, json.dumps(data, ensure_ascii=False), time.time()))
+        try:
+            with self.conn:
+                if upserts:
+                    self.conn.executemany('''
+                        INSERT INTO fsm_states (key, state, data, updated_at) VALUES (?, ?, ?, ?)
+                        ON CONFLICT(key) DO UPDATE SET
+                            state = excluded.state, data = excluded.data, updated_at = excluded.updated_at
+                    ''', upserts)
+                if deletes:
+                    self.conn.executemany('DELETE FROM fsm_states WHERE key = ?', deletes)
+        except sqlite3.Error as e:
+            logger.error("Error flushing FSM states: %s", e)
+            # Keep the changes for the next flush, newer writes win
+            for db_key, value in pending.items():
+                self.dirty.setdefault(db_key, value)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        db_key = self._key(key)
+        _, data = self._load(db_key)
+        self._store(db_key, state.state if isinstance(state, State) else state, data)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return self._load(self._key(key))[0]
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        db_key = self._key(key)
+        state, _ = self._load(db_key)
+        self._store(db_key, state, dict(data))
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return dict(self._load(self._key(key))[1])
+
+    async def close(self) -> None:
+        if self.flush_task and not self.flush_task.done():
+            self.flush_task.cancel()
+        self.flush()
+        self.conn.close()
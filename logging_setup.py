@@ -0,0 +1,102 @@
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+from typing import Dict, Optional, Tuple
+
+# Attributes every LogRecord has - everything else came in through `extra=`
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+class KeyValueFormatter(logging.Formatter):
+    """Formats records as `ts=... level=... logger=... msg="..." key=value ...`"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = [
+            f"ts={self.formatTime(record, '%Y-%m-%dT%H:%M:%S')}",
+            f"level={record.levelname}",
+            f"logger={record.name}",
+            f"msg={self._quote(record.getMessage())}",
+        ]
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                fields.append(f"{key}={self._quote(value)}")
+        if record.exc_info:
+            fields.append(f"exc={self._quote(self.formatException(record.exc_info))}")
+        return ' '.join(fields)
+
+    @staticmethod
+    def _quote(value) -> str:
+        text = str(value)
+        if not text or any(ch in text for ch in ' "=\n'):
+            return '"' + text.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        return text
+
+class DebugRateLimitFilter(logging.Filter):
+    """Lets through at most `per_second` DEBUG records per message template.
+
+    Per-request debug lines (one per price lookup, one per alert) would
+    otherwise grow with traffic; suppressed records are counted and the
+    count is attached to the next record that gets through.
+    """
+
+    def __init__(self, per_second: float = 5.0):
+        super().__init__()
+        self.per_second = per_second
+        self.buckets: Dict[Tuple[str, str], Tuple[float, float]] = {}  # key -> (tokens, last_refill)
+        self.suppressed: Dict[Tuple[str, str], int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG:
+            return True
+        key = (record.name, str(record.msg))
+        now = time.monotonic()
+        tokens, last = self.buckets.get(key, (self.per_second, now))
+        tokens = min(self.per_second, tokens + (now - last) * self.per_second)
+        if tokens < 1:
+            self.buckets[key] = (tokens, now)
+            self.suppressed[key] = self.suppressed.get(key, 0) + 1
+            return False
+        self.buckets[key] = (tokens - 1, now)
+        dropped = self.suppressed.pop(key, 0)
+        if dropped:
+            record.suppressed = dropped
+        return True
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+def setup_logging(level: str = 'INFO', debug_rate: float = 5.0) -> logging.handlers.QueueListener:
+    """Route all logging through a queue drained by a background writer thread"""
+    global _listener
+    if _listener:
+        return _listener
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    # Rate-limit before enqueueing so dropped debug lines cost almost nothing
+    queue_handler.addFilter(DebugRateLimitFilter(debug_rate))
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(KeyValueFormatter())
+
+    root = logging.getLogger()
+    root.handlers[:] = [queue_handler]
+    root.setLevel(level.upper())
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+def set_log_level(level: str, logger_name: str = '') -> bool:
+    """Change a logger's level at runtime (root logger by default)"""
+    level = level.upper()
+    if level not in ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'):
+        return False
+    logging.getLogger(logger_name).setLevel(level)
+    return True
+
+def stop_logging():
+    """Flush and stop the background writer"""
+    global _listener
+    if _listener:
+        _listener.stop()
+        _listener = None
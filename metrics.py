@@ -0,0 +1,219 @@
+import functools
+import logging
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _format_labels(labelnames: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+class Metric:
+    """Base class for metrics with optional labels"""
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return '\n'.join(lines)
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        return self.values.get(self._key(labels), 0)
+
+    def samples(self):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in self.values.items()]
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self.values: Dict[Tuple[str, ...], float] = {}
+        self.callback: Optional[Callable[[], Dict]] = None
+
+    def set(self, value: float, **labels):
+        self.values[self._key(labels)] = value
+
+    def set_function(self, callback: Callable):
+        """Read the value(s) at scrape time: callback returns a number or {label_value: number}"""
+        self.callback = callback
+
+    def samples(self):
+        values = dict(self.values)
+        if self.callback:
+            try:
+                result = self.callback()
+                if isinstance(result, dict):
+                    values.update({(str(key),): value for key, value in result.items()})
+                else:
+                    values[()] = result
+            except Exception:
+                pass
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in values.items()]
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        self.counts: Dict[Tuple[str, ...], List[int]] = {}
+        self.sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        counts = self.counts.get(key)
+        if counts is None:
+            counts = self.counts[key] = [0] * (len(self.buckets) + 1)
+            self.sums[key] = 0.0
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+        self.sums[key] += value
+
+    def time(self, **labels) -> 'Timer':
+        """Context manager observing the elapsed time of its block"""
+        return Timer(self, labels)
+
+    def samples(self):
+        lines = []
+        for key, counts in self.counts.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                labels = _format_labels(self.labelnames, key, 'le="%s"' % le)
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {self.sums[key]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+class Timer:
+    def __init__(self, histogram: Histogram, labels: Dict):
+        self.histogram = histogram
+        self.labels = labels
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        return '\n'.join(metric.render() for metric in self.metrics.values()) + '\n'
+
+REGISTRY = MetricsRegistry()
+
+# Price APIs
+PRICE_REQUEST_LATENCY = REGISTRY.register(Histogram(
+    'shadowprice_price_request_seconds', 'Latency of upstream price API requests', ('provider', 'endpoint')))
+PRICE_REQUEST_ERRORS = REGISTRY.register(Counter(
+    'shadowprice_price_request_errors_total', 'Failed upstream price API requests', ('provider', 'endpoint', 'reason')))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    'shadowprice_cache_requests_total', 'Cache lookups by result (hit/miss)', ('cache', 'result')))
+
+# Monitor
+TICK_DURATION = REGISTRY.register(Histogram(
+    'shadowprice_tick_seconds', 'Duration of a monitor tick'))
+TICK_STAGE_DURATION = REGISTRY.register(Histogram(
+    'shadowprice_tick_stage_seconds', 'Time spent per monitor tick stage', ('stage',)))
+TICK_LATENESS = REGISTRY.register(Histogram(
+    'shadowprice_tick_lateness_seconds', 'How late a monitor tick started compared to its schedule'))
+OVERLOAD_LEVEL = REGISTRY.register(Gauge(
+    'shadowprice_overload_level', 'Current load-shedding stage of the monitor (0 = normal)'))
+OVERLOAD_TRANSITIONS = REGISTRY.register(Counter(
+    'shadowprice_overload_transitions_total', 'Load-shedding stages entered', ('level',)))
+MONITOR_STATE = REGISTRY.register(Gauge(
+    'shadowprice_monitor_state_entries', 'Sizes and eviction counters of the monitor state', ('key',)))
+
+# Quotas
+QUOTA_REJECTIONS = REGISTRY.register(Counter(
+    'shadowprice_quota_rejections_total', 'Alerts refused at creation', ('reason',)))
+USER_COST = REGISTRY.register(Gauge(
+    'shadowprice_user_cost', 'Monitor cost of the heaviest user (alerts, tickers, upstream requests per tick)', ('key',)))
+
+# Startup
+STARTUP_PHASE_SECONDS = REGISTRY.register(Gauge(
+    'shadowprice_startup_phase_seconds', 'Duration of each startup phase', ('phase',)))
+TIME_TO_FIRST_ALERT = REGISTRY.register(Gauge(
+    'shadowprice_time_to_first_alert_seconds', 'Seconds from process start to the first delivered alert'))
+
+# Database
+DB_QUERY_DURATION = REGISTRY.register(Histogram(
+    'shadowprice_db_query_seconds', 'Duration of Database methods', ('method',)))
+
+# Telegram
+SEND_QUEUE_DEPTH = REGISTRY.register(Gauge(
+    'shadowprice_send_queue_depth', 'Messages waiting in the notification queue'))
+MESSAGES_SENT = REGISTRY.register(Counter(
+    'shadowprice_messages_sent_total', 'Messages delivered to Telegram'))
+TELEGRAM_ERRORS = REGISTRY.register(Counter(
+    'shadowprice_telegram_errors_total', 'Errors returned by Telegram when sending', ('error',)))
+
+def db_timed(func):
+    """Decorator recording the duration of a Database method"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with DB_QUERY_DURATION.time(method=func.__name__):
+            return func(*args, **kwargs)
+    return wrapper
+
+async def handle_metrics(request: web.Request) -> web.Response:
+    return web.Response(text=REGISTRY.render(), content_type='text/plain', charset='utf-8')
+
+async def start_metrics_server(host: str, port: int) -> Optional[web.AppRunner]:
+    """Serve /metrics in Prometheus text format (None if the port is taken, e.g. by another bot process)"""
+    app = web.Application()
+    app.router.add_get('/metrics', handle_metrics)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, host, port).start()
+    except OSError as e:
+        logger.error("Metrics endpoint disabled, cannot listen on %s:%s: %s", host, port, e)
+        await runner.cleanup()
+        return None
+    logger.info("Metrics available at http://%s:%s/metrics", host, port)
+    return runner
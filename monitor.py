@@ -1,76 +1,502 @@
 import asyncio
-from typing import List, Dict
+import logging
+from typing import List, Dict, Optional
 from database import Database
-from crypto_api import CryptoAPI
-from config import CHECK_INTERVAL, DARK_EMOJIS
+from crypto_api import CryptoAPI, alert_price_key, format_money
+from config import (
+    CHECK_INTERVAL, DARK_EMOJIS,
+    STATE_SNAPSHOT_PATH, STATE_SNAPSHOT_INTERVAL, STATE_SNAPSHOT_MAX_AGE, SHUTDOWN_TICK_TIMEOUT,
+    PRICE_HISTORY_RETENTION, PRICE_HISTORY_PRUNE_INTERVAL, PRICE_TAPE_PATH,
+    ALERT_CLEANUP_INTERVAL, ALERT_CLEANUP_BATCH, DEFAULT_CURRENCY, OVERLOAD_HOT_MOVE, OVERLOAD_FAR_DISTANCE
+)
+from monitor_state import MonitorState
+from sender import NotificationSender
+from tape import TapeWriter
+from alert_index import AlertIndex, RELATIVE_TYPES
+from alert_record import AlertRecord
+from profiling import profiler, stage, observe_stages
+from metrics import TICK_DURATION, TICK_LATENESS, MONITOR_STATE, TIME_TO_FIRST_ALERT, USER_COST
+from quotas import user_costs
+from overload import OverloadController
+from startup import PROCESS_STARTED
 import time
 
+logger = logging.getLogger(__name__)
+
 class PriceMonitor:
-    def __init__(self, bot_instance):
+    def __init__(self, bot_instance, shard=None, sender: Optional[NotificationSender] = None):
         self.bot = bot_instance
+        self.shard = shard  # ShardCoordinator when running as a sharded worker
+        self.sender = sender or NotificationSender(bot_instance)
         self.db = Database()
         self.crypto_api = CryptoAPI()
         self.is_running = False
-        self.triggered_alerts = set()  # Track triggered alerts to avoid spam
-        self.price_history = {}  # {ticker: [(timestamp, price), ...]}
-        self.auto_alert_triggered = {}  # {(user_id, ticker): last_alert_time}
+        self.state = MonitorState()  # Triggered alerts, auto-alert cooldowns and price history
+        self.handover_ticks = 0  # Ticks left that reload state handed over by other workers
+        if shard:
+            # Sharded: every change is written to the DB for whichever worker owns the ticker next
+            self.state.track_changes()
+            self.handover_ticks = 1
+        self.alert_index = AlertIndex()  # Armed percent/trailing alerts
+        self.synced_alerts = None  # Alert list the index and state were last synced with
+        self.disarmed = []  # Ids of one-shot alerts fired this tick, disarmed in one batch
+        self.fixed_alerts = []
+        self.last_prices = {}  # Price snapshot of the latest tick {ticker: price}
+        self.last_prices_time = 0
+        self.last_snapshot_time = 0
+        self.last_prune_time = 0
+        self.clock = time.time  # Evaluation time source (replaced by a virtual clock on replay)
+        self.tape = TapeWriter(self.snapshot_path_for(PRICE_TAPE_PATH)) if PRICE_TAPE_PATH else None
+        self.tick_stages = {}  # Seconds per stage of the current tick
+        self.state_loaded = False
+        self.first_alert_sent = False
+        self.started = False
+        self.pending_sends = []  # Delivery futures of notifications queued this tick
+        self.user_costs = {}  # {user_id: {'alerts', 'tickers', 'requests'}} as of the latest tick
+        self.overload = OverloadController()  # Load-shedding stage, updated after every tick
+        self.wakeup = asyncio.Event()  # Interrupts the pause between ticks on shutdown
+        self.tick_done = asyncio.Event()
+        self.tick_done.set()
+        MONITOR_STATE.set_function(self.state.stats)
+        USER_COST.set_function(self.heaviest_user_cost)
     
     async def start_monitoring(self):
         """Start the price monitoring loop"""
         self.is_running = True
-        print(f"{DARK_EMOJIS['bot']} ShadowPrice Bot - Monitoring started")
+        self.started = True
+        if not self.state_loaded:
+            self.load_state()
+        logger.info("Monitoring started")
+        cleanup_task = asyncio.create_task(self.run_alert_cleanup())
         
+        next_tick = time.monotonic()
         while self.is_running:
             try:
-                await self.check_all_alerts()
-                await self.check_auto_alerts()
-                await asyncio.sleep(CHECK_INTERVAL)
+                started = time.monotonic()
+                TICK_LATENESS.observe(max(0.0, started - next_tick))
+                capture = profiler.begin('tick')
+                self.tick_done.clear()
+                try:
+                    with TICK_DURATION.time():
+                        await self.run_tick()
+                finally:
+                    self.tick_done.set()
+                    if capture:
+                        profiler.end(capture, self.tick_stages)
+                self.overload.observe(time.monotonic() - started, self.sender.queue_depth)
+                # Fixed-rate schedule: a slow tick shortens the pause instead of shifting every later tick
+                next_tick = started + CHECK_INTERVAL
+                await self._pause(next_tick - time.monotonic())
             except Exception as e:
-                print(f"{DARK_EMOJIS['error']} Monitoring error: {e}")
-                await asyncio.sleep(60)  # Wait 1 minute on error
+                logger.exception("Monitoring error: %s", e)
+                await self._pause(60)  # Wait 1 minute on error
+                next_tick = time.monotonic()
+        cleanup_task.cancel()
+    
+    async def run_alert_cleanup(self):
+        """Delete fired one-shot and expired alerts in small batches while monitoring runs"""
+        while self.is_running:
+            await self._pause(ALERT_CLEANUP_INTERVAL)
+            # One sharded worker is enough; rendezvous hashing picks it
+            if not self.is_running or (self.shard and not self.shard.owns('__alert_cleanup__')):
+                continue
+            try:
+                removed = 0
+                while True:
+                    batch = self.db.delete_dead_alerts(int(time.time()), ALERT_CLEANUP_BATCH)
+                    removed += batch
+                    if batch < ALERT_CLEANUP_BATCH:
+                        break
+                    await asyncio.sleep(0)  # Let ticks and handlers run between batches
+                if removed:
+                    logger.info("Dead alerts removed", extra={'alerts': removed})
+                if self.shard:
+                    self.db.prune_monitor_handover(int(time.time()) - self.state.cooldown)
+            except Exception as e:
+                logger.error("Error removing dead alerts: %s", e)
+    
+    async def _pause(self, seconds: float):
+        """Sleep between ticks, returning early when the monitor is stopped"""
+        try:
+            await asyncio.wait_for(self.wakeup.wait(), max(0.0, seconds))
+        except asyncio.TimeoutError:
+            pass
     
-    async def stop_monitoring(self):
-        """Stop the price monitoring loop"""
+    async def stop_monitoring(self, timeout: float = SHUTDOWN_TICK_TIMEOUT):
+        """Stop the loop; a tick in progress gets `timeout` seconds to finish"""
         self.is_running = False
+        self.wakeup.set()
+        if not self.tick_done.is_set():
+            try:
+                await asyncio.wait_for(self.tick_done.wait(), timeout)
+            except asyncio.TimeoutError:
+                # Its undelivered notifications are cancelled by the sender drain and re-armed
+                logger.warning("Tick still running at shutdown, checkpointing its state")
+        logger.info("Monitoring stopped")
+    
+    async def close(self):
+        """Snapshot state and release resources (after stop_monitoring and the sender drain)"""
+        if self.started:
+            self.save_state()
+            self.checkpoint_peaks()
+            self.save_handover_state()
+        if self.tape:
+            self.tape.close()
         await self.crypto_api.close_session()
-        print(f"{DARK_EMOJIS['bot']} ShadowPrice Bot - Monitoring stopped")
     
-    async def check_all_alerts(self):
+    async def shutdown(self, drain_timeout: float):
+        """Stop the loop, deliver queued notifications and save state"""
+        await self.stop_monitoring()
+        await self.sender.drain(drain_timeout)
+        await self.close()
+    
+    def snapshot_path_for(self, path: str) -> str:
+        """Per-worker variant of a file path in sharded mode"""
+        if self.shard:
+            worker_slug = ''.join(ch if ch.isalnum() else '_' for ch in self.shard.worker_id)
+            return f"{path}.{worker_slug}"
+        return path
+    
+    @property
+    def snapshot_path(self) -> str:
+        """State file of this monitor (one per worker in sharded mode)"""
+        return self.snapshot_path_for(STATE_SNAPSHOT_PATH)
+    
+    def load_state(self):
+        """Restore state saved by a previous run"""
+        self.state_loaded = True
+        # Sharded workers merge every worker's file: tickers may have moved between them
+        pattern = f"{STATE_SNAPSHOT_PATH}*" if self.shard else STATE_SNAPSHOT_PATH
+        try:
+            loaded = self.state.load_snapshot(pattern, int(time.time()), STATE_SNAPSHOT_MAX_AGE, self.snapshot_path)
+            if loaded:
+                logger.info("Monitor state restored", extra=self.state.stats())
+        except Exception as e:
+            logger.error("Error loading monitor state: %s", e)
+    
+    def load_handover_state(self):
+        """Merge triggered alerts and auto-alert cooldowns written by every worker (sharded mode).
+        
+        Runs after a rebalance, so tickers that moved here keep the state of
+        their previous owner and already-fired alerts do not fire again.
+        """
+        try:
+            now = int(time.time())
+            triggered, cooldowns = self.db.get_monitor_handover(now - self.state.cooldown)
+            self.state.merge_dict({'triggered': triggered, 'cooldowns': cooldowns}, now)
+        except Exception as e:
+            logger.error("Error loading handed-over monitor state: %s", e)
+    
+    def save_handover_state(self):
+        """Write this tick's triggered/cooldown changes for the other workers (sharded mode)"""
+        triggered, cooldowns = self.state.take_changes()
+        if not triggered and not cooldowns:
+            return
+        try:
+            self.db.save_monitor_handover(triggered, cooldowns)
+        except Exception as e:
+            logger.error("Error saving monitor handover state: %s", e)
+    
+    def owned_tickers(self) -> Optional[List[str]]:
+        """Followed tickers of this worker's partition (None when not sharded)"""
+        if not self.shard:
+            return None
+        return [ticker for ticker in self.db.get_followed_tickers() if self.shard.owns(ticker)]
+    
+    def save_state(self):
+        """Snapshot state to disk"""
+        try:
+            now = int(time.time())
+            self.state.save_snapshot(self.snapshot_path, now)
+            self.last_snapshot_time = now
+        except Exception as e:
+            logger.error("Error saving monitor state: %s", e)
+    
+    async def warm_prices(self):
+        """Fetch an initial price snapshot for every followed ticker before the first tick"""
+        owned = self.owned_tickers()
+        coin_tickers = set(owned) if owned is not None else set(self.db.get_followed_tickers())
+        if not coin_tickers:
+            return
+        # Fills the price and coin-id caches, so the first tick is served from them
+        self.last_prices = await self.crypto_api.get_multiple_prices(list(coin_tickers))
+        self.last_prices_time = int(time.time())
+    
+    def record_alert_delivered(self):
+        """Measure time-to-first-alert once"""
+        if not self.first_alert_sent:
+            self.first_alert_sent = True
+            seconds = time.monotonic() - PROCESS_STARTED
+            TIME_TO_FIRST_ALERT.set(seconds)
+            logger.info("First alert delivered", extra={'seconds_since_start': round(seconds, 3)})
+    
+    def record_history(self, prices: Dict[str, float], now: int):
+        """Append the tick's prices to the price bars and apply retention hourly"""
+        try:
+            self.db.record_prices(prices, now, PRICE_HISTORY_RETENTION)
+            if now - self.last_prune_time >= PRICE_HISTORY_PRUNE_INTERVAL:
+                self.last_prune_time = now
+                removed = self.db.prune_price_bars(PRICE_HISTORY_RETENTION, now)
+                if removed:
+                    logger.info("Price history pruned", extra={'rows': removed})
+        except Exception as e:
+            logger.error("Error recording price history: %s", e)
+    
+    def queue_notification(self, user_id: int, text: str, on_cancelled=None):
+        """Hand a notification to the sender; `on_cancelled` re-arms it if shutdown drops it unsent"""
+        future = self.sender.submit(user_id, text, parse_mode="Markdown")
+        
+        def done(future):
+            if future.cancelled():
+                if on_cancelled:
+                    on_cancelled()
+            elif future.result():
+                self.record_alert_delivered()
+        
+        future.add_done_callback(done)
+        self.pending_sends.append(future)
+        return future
+    
+    async def run_tick(self):
+        """Run one monitoring tick: one price fetch shared by all checks"""
+        self.tick_stages = stages = {}
+        try:
+            await self._run_tick(stages)
+        finally:
+            observe_stages(stages)
+    
+    async def _run_tick(self, stages: Dict[str, float]):
+        """Tick body, timed per stage: db_read, price_fetch, evaluation, send"""
+        with stage(stages, 'db_read'):
+            if self.shard and self.shard.refresh():
+                # Tickers moved: take over their state now and once more after the previous
+                # owners have finished the tick they were in
+                self.handover_ticks = 2
+            if self.handover_ticks:
+                self.handover_ticks -= 1
+                self.load_handover_state()
+            # Sharded worker: only read the alerts and auto-alert coins of our partition
+            owned = self.owned_tickers()
+            alerts = self.db.get_all_alerts(owned)
+            user_coins = self.get_auto_alert_coins(owned)
+        
+        # Union of every ticker anyone follows, fetched once per tick
+        coin_tickers = set(alert.coin_ticker for alert in alerts)
+        for coins in user_coins.values():
+            coin_tickers.update(coins)
+        if not coin_tickers:
+            return
+        followed = set(coin_tickers)
+        
+        # Under overload, skip tickers this tick can do without (never on refresh ticks)
+        shedding = self.overload.level and not self.overload.refresh_tick
+        if shedding:
+            user_coins, coin_tickers = self.shed_load(alerts, user_coins)
+        
+        # Quote currencies in use; every chunk asks for all of them in one request
+        currencies = {alert.currency for alert in alerts}
+        with stage(stages, 'price_fetch'):
+            prices = await self.crypto_api.get_quotes(list(coin_tickers), currencies)
+        now = int(self.clock())
+        # Per-user share of this tick's work (uses the coin ids resolved by the fetch)
+        self.user_costs = user_costs(alerts, user_coins, self.crypto_api.coin_id_cache)
+        
+        # Single snapshot for this tick; shed tickers keep their last known price
+        self.last_prices = {**self.last_prices, **prices} if shedding else prices
+        self.last_prices_time = now
+        
+        # Local price history: one batched upsert into the 1m/1h/1d bars
+        with stage(stages, 'db_write'):
+            self.record_history(prices, now)
+            if self.tape:
+                self.tape.write(now, prices)
+        
+        await self.evaluate_snapshot(prices, alerts, user_coins, now, followed | set(prices))
+        if self.shard:
+            self.save_handover_state()
+        
+        if now - self.last_snapshot_time >= STATE_SNAPSHOT_INTERVAL:
+            self.save_state()
+            self.checkpoint_peaks()
+    
+    def shed_load(self, alerts: List[AlertRecord], user_coins: Dict[int, List[str]]):
+        """Auto-alert coins and tickers to fetch this tick at the current overload level.
+        
+        Stage 1 evaluates auto-alerts only for coins that moved at least
+        OVERLOAD_HOT_MOVE % within the history window; stage 2 also skips
+        tickers whose every alert is more than OVERLOAD_FAR_DISTANCE from its
+        threshold. Skipped tickers are still fetched on refresh ticks.
+        """
+        now = int(self.clock())
+        if self.overload.shed_cold_auto_alerts:
+            hot = {}
+            for coins in user_coins.values():
+                for coin in coins:
+                    if coin not in hot:
+                        change = self.state.price_change(coin, now, 0)
+                        hot[coin] = change is None or not change[0] or abs(change[1] / change[0] - 1) * 100 >= OVERLOAD_HOT_MOVE
+            user_coins = {
+                user_id: kept
+                for user_id, coins in user_coins.items()
+                if (kept := [coin for coin in coins if hot[coin]])
+            }
+        
+        alert_tickers = set(alert.coin_ticker for alert in alerts)
+        if self.overload.slow_far_tickers:
+            near = set()
+            for alert in alerts:
+                if alert.coin_ticker in near:
+                    continue
+                price = self.last_prices.get(alert_price_key(alert))
+                if (alert.threshold_type in RELATIVE_TYPES or not price
+                        or abs(price - alert.threshold_price) / price < OVERLOAD_FAR_DISTANCE):
+                    near.add(alert.coin_ticker)
+            alert_tickers = near
+        
+        coin_tickers = set(alert_tickers)
+        for coins in user_coins.values():
+            coin_tickers.update(coins)
+        return user_coins, coin_tickers
+    
+    def heaviest_user_cost(self) -> Dict[str, float]:
+        """Largest per-user alerts, tickers and request share of the latest tick"""
+        return {
+            key: max((cost[key] for cost in self.user_costs.values()), default=0)
+            for key in ('alerts', 'tickers', 'requests')
+        }
+    
+    def checkpoint_peaks(self):
+        """Persist trailing-alert peaks that moved, so a restart resumes from them"""
+        try:
+            peaks = self.alert_index.checkpoint_peaks()
+            if peaks:
+                self.db.update_alert_peaks(peaks)
+        except Exception as e:
+            logger.error("Error saving alert peaks: %s", e)
+    
+    def forget_alert(self, alert_id: int):
+        """Drop all monitor state of a deleted alert"""
+        self.state.forget_alert(alert_id)
+        self.alert_index.remove(alert_id)
+    
+    async def evaluate_snapshot(self, prices: Dict[str, float], alerts: List[AlertRecord],
+                                user_coins: Dict[int, List[str]], now: int, coin_tickers=None):
+        """Evaluate every alert against one price snapshot taken at `now` (no DB or API access).
+        
+        Used by the live tick and by the offline replay (benchmarks/replay_monitor.py).
+        """
+        stages = self.tick_stages
+        self.state.add_prices(prices, now)
+        
+        # Evict state of deleted alerts, finished cooldowns and unfollowed tickers
+        if coin_tickers is None:
+            coin_tickers = set(alert.coin_ticker for alert in alerts)
+            coin_tickers.update(alert_price_key(alert) for alert in alerts if alert.currency != DEFAULT_CURRENCY)
+            for coins in user_coins.values():
+                coin_tickers.update(coins)
+        if alerts is not self.synced_alerts:
+            # New alert list (every live tick, once per replay)
+            self.synced_alerts = alerts
+            self.state.retain_alerts(alert.id for alert in alerts)
+            # Percent/trailing alerts live in the incremental index, only fixed thresholds are scanned
+            self.fixed_alerts = [alert for alert in alerts if alert.threshold_type not in RELATIVE_TYPES]
+            self.alert_index.sync(alert for alert in alerts if alert.threshold_type in RELATIVE_TYPES)
+        fixed_alerts = self.fixed_alerts
+        self.state.expire(now, coin_tickers)
+        
+        # All evaluators see exactly the same prices
+        with stage(stages, 'evaluation'):
+            self.check_relative_alerts(prices, now)
+            await asyncio.gather(
+                self.check_all_alerts(prices, fixed_alerts),
+                self.check_auto_alerts(prices, user_coins, now)
+            )
+            self.disarm_fired(now)
+        
+        # Notifications were queued during evaluation; the tick ends once they are delivered
+        with stage(stages, 'send'):
+            pending, self.pending_sends = self.pending_sends, []
+            await asyncio.gather(*pending, return_exceptions=True)
+    
+    async def check_all_alerts(self, prices: Optional[Dict[str, float]] = None, alerts: Optional[List[Dict]] = None):
         """Check all active alerts for price threshold breaches"""
         try:
             # Get all alerts from database
-            alerts = self.db.get_all_alerts()
+            if alerts is None:
+                alerts = self.db.get_all_alerts()
             if not alerts:
                 return
             
-            # Group alerts by coin ticker for efficient API calls
-            coin_tickers = list(set(alert['coin_ticker'] for alert in alerts))
-            
-            # Get current prices for all coins
-            prices = await self.crypto_api.get_multiple_prices(coin_tickers)
+            if prices is None:
+                # Group alerts by coin ticker for efficient API calls
+                coin_tickers = list(set(alert.coin_ticker for alert in alerts))
+                prices = await self.crypto_api.get_quotes(coin_tickers, {alert.currency for alert in alerts})
             
             # Check each alert
             for alert in alerts:
                 await self.check_single_alert(alert, prices)
                 
         except Exception as e:
-            print(f"{DARK_EMOJIS['error']} Error checking alerts: {e}")
+            logger.exception("Error checking alerts: %s", e)
+    
+    def check_relative_alerts(self, prices: Dict[str, float], now: int):
+        """Fire percent/trailing alerts crossed by this snapshot (they fire once)"""
+        for alert, current_price, reference_price in self.alert_index.evaluate(prices):
+            self.disarmed.append(alert.id)
+            self.send_relative_alert_notification(alert, current_price, reference_price)
+    
+    def disarm_fired(self, now: int):
+        """Mark this tick's fired one-shot alerts in one batch; the cleanup task deletes them"""
+        if not self.disarmed:
+            return
+        disarmed, self.disarmed = self.disarmed, []
+        try:
+            self.db.mark_alerts_triggered(disarmed, now)
+        except Exception as e:
+            logger.error("Error disarming fired alerts: %s", e)
     
-    async def check_single_alert(self, alert: Dict, prices: Dict[str, float]):
+    def rearm(self, alert: AlertRecord):
+        """Arm an alert whose notification was dropped unsent at shutdown"""
+        self.state.clear_triggered(alert.id)
+        if alert.one_shot or alert.threshold_type in RELATIVE_TYPES:
+            self.db.rearm_alert(alert.id)
+    
+    def send_relative_alert_notification(self, alert: AlertRecord, current_price: float, reference_price: float):
+        """Queue the notification of a fired percent/trailing alert"""
+        coin_ticker = alert.coin_ticker
+        currency = alert.currency
+        percent = alert.threshold_price
+        if alert.threshold_type == 'percent':
+            base_price = alert.base_price
+            change = (current_price - base_price) / base_price * 100
+            emoji = DARK_EMOJIS['up'] if change > 0 else DARK_EMOJIS['down']
+            message = (
+                f"{DARK_EMOJIS['alert']} **{coin_ticker} moved {change:+.2f}%!**\n"
+                f"{DARK_EMOJIS['bell']} Now: **{format_money(current_price, currency)}**\n"
+                f"{emoji} More than ±{percent:g}% from {format_money(base_price, currency)} when the alert was set"
+            )
+        else:
+            drawdown = (reference_price - current_price) / reference_price * 100
+            message = (
+                f"{DARK_EMOJIS['alert']} **{coin_ticker} trailing stop hit!**\n"
+                f"{DARK_EMOJIS['bell']} Now: **{format_money(current_price, currency)}**\n"
+                f"{DARK_EMOJIS['down']} {drawdown:.2f}% below the peak of {format_money(reference_price, currency)} (stop {percent:g}%)"
+            )
+        message += f"\n\n{DARK_EMOJIS['shadow']} *ShadowPrice Bot*"
+        # Undelivered at shutdown: arm it again so the next process fires it
+        self.queue_notification(alert.user_id, message, lambda: self.rearm(alert))
+    
+    async def check_single_alert(self, alert: AlertRecord, prices: Dict[str, float]):
         """Check if a single alert has been triggered"""
         try:
-            coin_ticker = alert['coin_ticker']
-            current_price = prices.get(coin_ticker)
+            current_price = prices.get(alert_price_key(alert))
             
             if current_price is None:
                 return
             
-            threshold_price = alert['threshold_price']
-            threshold_type = alert['threshold_type']
-            alert_id = alert['id']
-            
-            # Create unique key for this alert
-            alert_key = f"{alert_id}_{coin_ticker}_{threshold_type}_{threshold_price}"
+            threshold_price = alert.threshold_price
+            threshold_type = alert.threshold_type
+            alert_id = alert.id
             
             # Check if threshold is breached
             is_triggered = False
@@ -81,53 +507,53 @@ class PriceMonitor:
                 is_triggered = True
             
             # Send notification if triggered and not already sent
-            if is_triggered and alert_key not in self.triggered_alerts:
+            if is_triggered and not self.state.is_triggered(alert_id):
                 await self.send_alert_notification(alert, current_price)
-                self.triggered_alerts.add(alert_key)
+                self.state.mark_triggered(alert_id)
+                if alert.one_shot:
+                    self.disarmed.append(alert_id)
             
-            # Remove from triggered set if price is back to normal
-            elif not is_triggered and alert_key in self.triggered_alerts:
-                self.triggered_alerts.remove(alert_key)
+            # Remove from triggered set if price is back to normal (one-shot alerts never re-arm)
+            elif not is_triggered and self.state.is_triggered(alert_id) and not alert.one_shot:
+                self.state.clear_triggered(alert_id)
                 
         except Exception as e:
-            print(f"{DARK_EMOJIS['error']} Error checking alert {alert.get('id', 'unknown')}: {e}")
+            logger.error("Error checking alert: %s", e, extra={'alert_id': alert.id})
     
-    async def send_alert_notification(self, alert: Dict, current_price: float):
+    async def send_alert_notification(self, alert: AlertRecord, current_price: float):
         """Send notification to user about triggered alert"""
         try:
-            user_id = alert['user_id']
-            coin_ticker = alert['coin_ticker']
-            threshold_type = alert['threshold_type']
-            threshold_price = alert['threshold_price']
+            user_id = alert.user_id
+            coin_ticker = alert.coin_ticker
+            threshold_type = alert.threshold_type
+            threshold_price = alert.threshold_price
+            currency = alert.currency
             
             # Create dark-themed message
             if threshold_type == "above":
                 message = (
-                    f"{DARK_EMOJIS['alert']} **{coin_ticker} pierced {threshold_price:,.0f}$!**\n"
-                    f"{DARK_EMOJIS['bell']} Now: **{current_price:,.2f}$**\n"
+                    f"{DARK_EMOJIS['alert']} **{coin_ticker} pierced {format_money(threshold_price, currency, 0)}!**\n"
+                    f"{DARK_EMOJIS['bell']} Now: **{format_money(current_price, currency)}**\n"
                     f"{DARK_EMOJIS['up']} The price has risen above the threshold"
                 )
             else:
                 message = (
-                    f"{DARK_EMOJIS['alert']} **{coin_ticker} fell below {threshold_price:,.0f}$!**\n"
-                    f"{DARK_EMOJIS['bell']} Now: **{current_price:,.2f}$**\n"
+                    f"{DARK_EMOJIS['alert']} **{coin_ticker} fell below {format_money(threshold_price, currency, 0)}!**\n"
+                    f"{DARK_EMOJIS['bell']} Now: **{format_money(current_price, currency)}**\n"
                     f"{DARK_EMOJIS['down']} The price has fallen below the threshold"
                 )
             
             # Add dark theme footer
             message += f"\n\n{DARK_EMOJIS['shadow']} *ShadowPrice Bot*"
             
-            # Send message
-            await self.bot.send_message(
-                chat_id=user_id,
-                text=message,
-                parse_mode="Markdown"
-            )
+            # Queue message; if shutdown drops it unsent the alert fires again after restart
+            self.queue_notification(user_id, message, lambda: self.rearm(alert))
             
-            print(f"{DARK_EMOJIS['alert']} Alert sent to user {user_id}: {coin_ticker} {threshold_type} {threshold_price}")
+            logger.debug("Alert queued", extra={'user_id': user_id, 'ticker': coin_ticker,
+                                                'threshold_type': threshold_type, 'threshold_price': threshold_price})
             
         except Exception as e:
-            print(f"{DARK_EMOJIS['error']} Error sending alert notification: {e}")
+            logger.warning("Error sending alert notification: %s", e)
     
     async def force_check_user_alerts(self, user_id: int):
         """Force check alerts for a specific user (for testing)"""
@@ -136,14 +562,14 @@ class PriceMonitor:
             if not alerts:
                 return "No active reminders"
             
-            coin_tickers = list(set(alert['coin_ticker'] for alert in alerts))
-            prices = await self.crypto_api.get_multiple_prices(coin_tickers)
+            coin_tickers = list(set(alert.coin_ticker for alert in alerts))
+            prices = await self.crypto_api.get_quotes(coin_tickers, {alert.currency for alert in alerts})
             
             results = []
             for alert in alerts:
-                current_price = prices.get(alert['coin_ticker'])
+                current_price = prices.get(alert_price_key(alert))
                 if current_price:
-                    results.append(f"{alert['coin_ticker']}: ${current_price:,.2f}")
+                    results.append(f"{alert.coin_ticker}: {format_money(current_price, alert.currency)}")
             
             return f"📊 Current prices:\n" + "\n".join(results)
             
@@ -158,50 +584,15 @@ class PriceMonitor:
                 return
             
             # Get unique coin tickers
-            coin_tickers = list(set(alert['coin_ticker'] for alert in alerts))
+            coin_tickers = list(set(alert.coin_ticker for alert in alerts))
             
             # Get current prices
-            prices = await self.crypto_api.get_multiple_prices(coin_tickers)
+            prices = await self.crypto_api.get_quotes(coin_tickers, {alert.currency for alert in alerts})
             
-            if not prices:
+            summary = self.render_price_update(alerts, prices)
+            if not summary:
                 return
             
-            # Create summary message
-            summary = f"{DARK_EMOJIS['coin']} **Price update**\n\n"
-            
-            # Show top 3 most significant changes
-            price_changes = []
-            for alert in alerts:
-                ticker = alert['coin_ticker']
-                current_price = prices.get(ticker)
-                if current_price:
-                    threshold_price = alert['threshold_price']
-                    price_diff = current_price - threshold_price
-                    price_percent = (price_diff / threshold_price) * 100
-                    
-                    if alert['threshold_type'] == "above":
-                        if current_price >= threshold_price:
-                            status = f"🚨 {ticker}: ${current_price:,.2f} (THE THRESHOLD HAS BEEN CROSSED!)"
-                        else:
-                            status = f"📉 {ticker}: ${current_price:,.2f} (-{abs(price_percent):.1f}%)"
-                    else:
-                        if current_price <= threshold_price:
-                            status = f"🚨 {ticker}: ${current_price:,.2f} (THE THRESHOLD HAS BEEN CROSSED!)"
-                        else:
-                            status = f"📈 {ticker}: ${current_price:,.2f} (+{price_percent:.1f}%)"
-                    
-                    price_changes.append((abs(price_percent), status))
-            
-            # Sort by significance and show top 3
-            price_changes.sort(reverse=True)
-            for _, status in price_changes[:3]:
-                summary += f"{status}\n"
-            
-            if len(price_changes) > 3:
-                summary += f"\n... and more {len(price_changes) - 3} coins"
-            
-            summary += f"\n\n{DARK_EMOJIS['shadow']} *Automatic update*"
-            
             # Send update
             await self.bot.send_message(
                 chat_id=user_id,
@@ -210,56 +601,96 @@ class PriceMonitor:
             )
             
         except Exception as e:
-            print(f"{DARK_EMOJIS['error']} Error sending price update to user {user_id}: {e}") 
+            logger.warning("Error sending price update: %s", e, extra={'user_id': user_id})
+    
+    @staticmethod
+    def render_price_update(alerts: List[AlertRecord], prices: Dict[str, float]) -> Optional[str]:
+        """Build the price update message for one user's alerts"""
+        if not prices:
+            return None
+        
+        # Create summary message
+        summary = f"{DARK_EMOJIS['coin']} **Price update**\n\n"
+        
+        # Show top 3 most significant changes
+        price_changes = []
+        for alert in alerts:
+            if alert.threshold_type in RELATIVE_TYPES:
+                continue
+            ticker = alert.coin_ticker
+            current_price = prices.get(alert_price_key(alert))
+            if current_price:
+                shown = format_money(current_price, alert.currency)
+                threshold_price = alert.threshold_price
+                price_diff = current_price - threshold_price
+                price_percent = (price_diff / threshold_price) * 100
+                
+                if alert.threshold_type == "above":
+                    if current_price >= threshold_price:
+                        status = f"🚨 {ticker}: {shown} (THE THRESHOLD HAS BEEN CROSSED!)"
+                    else:
+                        status = f"📉 {ticker}: {shown} (-{abs(price_percent):.1f}%)"
+                else:
+                    if current_price <= threshold_price:
+                        status = f"🚨 {ticker}: {shown} (THE THRESHOLD HAS BEEN CROSSED!)"
+                    else:
+                        status = f"📈 {ticker}: {shown} (+{price_percent:.1f}%)"
+                
+                price_changes.append((abs(price_percent), status))
+        
+        if not price_changes:
+            return None
+        
+        # Sort by significance and show top 3
+        price_changes.sort(reverse=True)
+        for _, status in price_changes[:3]:
+            summary += f"{status}\n"
+        
+        if len(price_changes) > 3:
+            summary += f"\n... and more {len(price_changes) - 3} coins"
+        
+        summary += f"\n\n{DARK_EMOJIS['shadow']} *Automatic update*"
+        return summary
 
-    async def check_auto_alerts(self):
+    def get_auto_alert_coins(self, tickers: Optional[List[str]] = None) -> Dict[int, List[str]]:
+        """Collect enabled auto-alert coins per user (only `tickers` when given)"""
+        return self.db.get_enabled_auto_alerts(tickers)
+    
+    async def check_auto_alerts(self, prices: Optional[Dict[str, float]] = None,
+                                user_coins: Optional[Dict[int, List[str]]] = None, now: Optional[int] = None):
         """Check for price spikes/dumps for auto-alert coins"""
         # 1. Збираємо всіх користувачів з авто-сповіщеннями
-        users = self.db.get_all_users()
-        user_coins = {}
-        for user in users:
-            coins = [coin for coin, enabled in self.db.get_auto_alerts(user['user_id']) if enabled]
-            if coins:
-                user_coins[user['user_id']] = coins
+        if user_coins is None:
+            user_coins = self.get_auto_alert_coins()
         if not user_coins:
             return
-        # 2. Збираємо унікальні монети
-        all_coins = set()
-        for coins in user_coins.values():
-            all_coins.update(coins)
-        # 3. Отримуємо поточні ціни
-        prices = await self.crypto_api.get_multiple_prices(list(all_coins))
-        now = int(time.time())
-        # 4. Оновлюємо історію цін
-        for ticker, price in prices.items():
-            if ticker not in self.price_history:
-                self.price_history[ticker] = []
-            self.price_history[ticker].append((now, price))
-            # Тримаємо тільки останні 15 записів (на 10-15 хвилин)
-            self.price_history[ticker] = [p for p in self.price_history[ticker] if now - p[0] <= 900]
-        # 5. Перевіряємо спайки/дампи
+        if prices is None:
+            # Standalone call: fetch and record prices ourselves
+            all_coins = set()
+            for coins in user_coins.values():
+                all_coins.update(coins)
+            prices = await self.crypto_api.get_multiple_prices(list(all_coins))
+            now = int(self.clock())
+            self.state.add_prices(prices, now)
+        if now is None:
+            now = int(self.clock())
+        # 2. Перевіряємо спайки/дампи
         for user_id, coins in user_coins.items():
             for ticker in coins:
-                history = self.price_history.get(ticker, [])
-                if len(history) < 2:
-                    continue
                 # Знаходимо ціну 10 хвилин тому
-                old_prices = [p for p in history if now - p[0] >= 600]
-                if not old_prices:
+                change_points = self.state.price_change(ticker, now, 600)
+                if change_points is None:
                     continue
-                old_price = old_prices[0][1]
-                current_price = history[-1][1]
+                old_price, current_price = change_points
                 if old_price == 0:
                     continue
                 change = (current_price - old_price) / old_price * 100
                 # Якщо зміна більше 5% (вгору або вниз)
                 if abs(change) >= 5:
                     # Не спамити: не частіше ніж раз на 30 хвилин
-                    key = (user_id, ticker)
-                    last_alert = self.auto_alert_triggered.get(key, 0)
-                    if now - last_alert < 1800:
+                    if self.state.cooldown_active(user_id, ticker, now):
                         continue
-                    self.auto_alert_triggered[key] = now
+                    self.state.start_cooldown(user_id, ticker, now)
                     # Надсилаємо сповіщення
                     direction = f"{DARK_EMOJIS['up']} Shot!" if change > 0 else f"{DARK_EMOJIS['down']} Dump!"
                     emoji = DARK_EMOJIS['alert']
@@ -270,7 +701,7 @@ class PriceMonitor:
                         f"10 min ago: ${old_price:,.2f}\n\n"
                         f"{DARK_EMOJIS['shadow']} *Auto-notification*"
                     )
-                    try:
-                        await self.bot.send_message(user_id, msg, parse_mode="Markdown")
-                    except Exception as e:
-                        print(f"{DARK_EMOJIS['error']} Auto-alert send error: {e}") 
\ No newline at end of file
+                    self.queue_notification(
+                        user_id, msg,
+                        lambda user_id=user_id, ticker=ticker: self.state.clear_cooldown(user_id, ticker)
+                    ) 
\ No newline at end of file
@@ -0,0 +1,184 @@
+import glob
+import gzip
+import json
+import logging
+import os
+from collections import deque
+from typing import Deque, Dict, Iterable, Optional, Set, Tuple
+
+HISTORY_WINDOW = 900  # seconds of price history kept per ticker
+AUTO_ALERT_COOLDOWN = 1800  # seconds between auto-alerts for one (user, ticker)
+SNAPSHOT_VERSION = 1
+
+logger = logging.getLogger(__name__)
+
+class MonitorState:
+    """Bounded, self-pruning state of PriceMonitor.
+
+    - `triggered`: ids of threshold alerts that already fired
+    - `cooldowns`: {(user_id, ticker): last_auto_alert_time}
+    - `history`:   {ticker: deque[(timestamp, price)]} for auto-alerts
+    """
+
+    def __init__(self, history_window: int = HISTORY_WINDOW, cooldown: int = AUTO_ALERT_COOLDOWN):
+        self.history_window = history_window
+        self.cooldown = cooldown
+        self.triggered: Set[int] = set()
+        self.cooldowns: Dict[Tuple[int, str], int] = {}
+        self.history: Dict[str, Deque[Tuple[int, float]]] = {}
+        self.evictions = {'triggered': 0, 'cooldowns': 0, 'history': 0}
+        self.changes: Optional[Dict[str, Dict]] = None  # Recorded only when tracking for a handover
+
+    def track_changes(self):
+        """Record triggered/cooldown changes so a sharded worker can hand them over (see take_changes)"""
+        self.changes = {'triggered': {}, 'cooldowns': {}}
+
+    def take_changes(self) -> Tuple[Dict[int, bool], Dict[Tuple[int, str], int]]:
+        """Changes since the last call: {alert_id: triggered?}, {(user_id, ticker): cooldown start or 0}"""
+        if not self.changes:
+            return {}, {}
+        changes, self.changes = self.changes, {'triggered': {}, 'cooldowns': {}}
+        return changes['triggered'], changes['cooldowns']
+
+    # Threshold alerts
+    def is_triggered(self, alert_id: int) -> bool:
+        return alert_id in self.triggered
+
+    def mark_triggered(self, alert_id: int):
+        self.triggered.add(alert_id)
+        if self.changes is not None:
+            self.changes['triggered'][alert_id] = True
+
+    def clear_triggered(self, alert_id: int):
+        self.triggered.discard(alert_id)
+        if self.changes is not None:
+            self.changes['triggered'][alert_id] = False
+
+    def forget_alert(self, alert_id: int):
+        """Drop all state of a deleted alert"""
+        if alert_id in self.triggered:
+            self.triggered.discard(alert_id)
+            self.evictions['triggered'] += 1
+
+    def retain_alerts(self, active_ids: Iterable[int]):
+        """Evict triggered ids of alerts that no longer exist"""
+        stale = self.triggered.difference(active_ids)
+        if stale:
+            self.triggered.difference_update(stale)
+            self.evictions['triggered'] += len(stale)
+
+    # Auto-alerts
+    def add_prices(self, prices: Dict[str, float], now: int):
+        """Append a price snapshot and drop points older than the window"""
+        for ticker, price in prices.items():
+            points = self.history.get(ticker)
+            if points is None:
+                points = self.history[ticker] = deque()
+            points.append((now, price))
+            while points and now - points[0][0] > self.history_window:
+                points.popleft()
+
+    def price_change(self, ticker: str, now: int, min_age: int) -> Optional[Tuple[float, float]]:
+        """Return (old_price, current_price) where old_price is at least `min_age` seconds old"""
+        points = self.history.get(ticker)
+        if not points or len(points) < 2:
+            return None
+        # Points are in time order, so the oldest one is the first candidate
+        oldest_time, old_price = points[0]
+        if now - oldest_time < min_age:
+            return None
+        return old_price, points[-1][1]
+
+    def clear_cooldown(self, user_id: int, ticker: str):
+        self.cooldowns.pop((user_id, ticker), None)
+        if self.changes is not None:
+            self.changes['cooldowns'][(user_id, ticker)] = 0
+
+    def cooldown_active(self, user_id: int, ticker: str, now: int) -> bool:
+        return now - self.cooldowns.get((user_id, ticker), 0) < self.cooldown
+
+    def start_cooldown(self, user_id: int, ticker: str, now: int):
+        self.cooldowns[(user_id, ticker)] = now
+        if self.changes is not None:
+            self.changes['cooldowns'][(user_id, ticker)] = now
+
+    # Housekeeping
+    def expire(self, now: int, followed_tickers: Optional[Iterable[str]] = None):
+        """Expire finished cooldowns and history of tickers nobody follows"""
+        expired = [key for key, last in self.cooldowns.items() if now - last >= self.cooldown]
+        for key in expired:
+            del self.cooldowns[key]
+        self.evictions['cooldowns'] += len(expired)
+
+        if followed_tickers is not None:
+            followed = set(followed_tickers)
+            unfollowed = [ticker for ticker in self.history if ticker not in followed]
+            for ticker in unfollowed:
+                del self.history[ticker]
+            self.evictions['history'] += len(unfollowed)
+
+    def stats(self) -> Dict[str, int]:
+        """Sizes and eviction counters for memory monitoring"""
+        return {
+            'triggered_alerts': len(self.triggered),
+            'auto_alert_cooldowns': len(self.cooldowns),
+            'history_tickers': len(self.history),
+            'history_points': sum(len(points) for points in self.history.values()),
+            'evicted_triggered': self.evictions['triggered'],
+            'evicted_cooldowns': self.evictions['cooldowns'],
+            'evicted_history': self.evictions['history'],
+        }
+
+    # Warm-restart snapshots
+    def to_dict(self, now: int) -> Dict:
+        return {
+            'v': SNAPSHOT_VERSION,
+            'saved_at': now,
+            'triggered': sorted(self.triggered),
+            'cooldowns': [[user_id, ticker, last] for (user_id, ticker), last in self.cooldowns.items()],
+            'history': {ticker: [list(point) for point in points] for ticker, points in self.history.items()},
+        }
+
+    def merge_dict(self, data: Dict, now: int):
+        """Merge a snapshot into the current state, dropping expired entries"""
+        self.triggered.update(int(alert_id) for alert_id in data.get('triggered', []))
+        for user_id, ticker, last in data.get('cooldowns', []):
+            key = (int(user_id), ticker)
+            if now - last < self.cooldown and last > self.cooldowns.get(key, 0):
+                self.cooldowns[key] = last
+        for ticker, points in data.get('history', {}).items():
+            fresh = [(int(ts), float(price)) for ts, price in points if now - ts <= self.history_window]
+            if fresh and ticker not in self.history:
+                self.history[ticker] = deque(fresh)
+
+    def save_snapshot(self, path: str, now: int):
+        """Atomically write the state to a gzip-compressed JSON file"""
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=5) as f:
+            json.dump(self.to_dict(now), f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    def load_snapshot(self, pattern: str, now: int, max_age: int, own_path: Optional[str] = None) -> int:
+        """Load every snapshot matching `pattern` that is fresh enough, return how many were loaded.
+
+        A stale or old-format file is deleted only if it is `own_path`;
+        other workers' files (or anything else sharing the prefix) are skipped.
+        """
+        loaded = 0
+        for path in glob.glob(pattern):
+            if path.endswith('.tmp'):
+                continue
+            try:
+                with gzip.open(path, 'rt', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning("Skipping unreadable state snapshot: %s", e, extra={'path': path})
+                continue
+            if data.get('v') != SNAPSHOT_VERSION or now - data.get('saved_at', 0) > max_age:
+                # Too old to trust (or an old format) - start fresh for this file
+                if own_path and os.path.abspath(path) == os.path.abspath(own_path):
+                    os.remove(path)
+                continue
+            self.merge_dict(data, now)
+            loaded += 1
+        return loaded
@@ -0,0 +1,83 @@
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import signal
+from aiogram import Bot
+
+from config import (
+    validate_config, BOT_TOKEN, MONITOR_WORKERS, METRICS_HOST, LOG_LEVEL, PROFILE_DEFAULT_COUNT,
+    SHUTDOWN_DRAIN_TIMEOUT
+)
+from database import Database
+from monitor import PriceMonitor
+from sharding import ShardCoordinator
+from metrics import start_metrics_server
+from logging_setup import setup_logging, stop_logging
+from profiling import profiler
+from shutdown import ShutdownCoordinator
+
+logger = logging.getLogger(__name__)
+
+async def worker_main(metrics_port: int = 0):
+    """Run one sharded PriceMonitor until stopped"""
+    metrics_runner = await start_metrics_server(METRICS_HOST, metrics_port) if metrics_port else None
+    # `kill -USR1 <pid>` profiles the next ticks of this worker
+    asyncio.get_running_loop().add_signal_handler(signal.SIGUSR1, profiler.arm, 'tick', PROFILE_DEFAULT_COUNT)
+    bot = Bot(token=BOT_TOKEN)
+    shard = ShardCoordinator(Database())
+    shard.join()
+    heartbeat_task = asyncio.create_task(shard.run_heartbeat())
+    monitor = PriceMonitor(bot, shard=shard)
+    shutdown = ShutdownCoordinator()
+    shutdown.install_signal_handlers()
+    logger.info("Monitor worker started", extra={'worker_id': shard.worker_id})
+    try:
+        await asyncio.wait({asyncio.create_task(monitor.start_monitoring()), asyncio.create_task(shutdown.wait())},
+                           return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        # Finish the tick and deliver its alerts before handing the shard over
+        shutdown.add_step('stop_monitor', monitor.shutdown, SHUTDOWN_DRAIN_TIMEOUT)
+        shutdown.add_step('stop_heartbeat', heartbeat_task.cancel)
+        shutdown.add_step('leave_shard', shard.leave)
+        if metrics_runner:
+            shutdown.add_step('stop_metrics', metrics_runner.cleanup)
+        shutdown.add_step('close_session', bot.session.close)
+        await shutdown.run()
+
+def run_worker(metrics_port: int = 0):
+    """Process entry point"""
+    setup_logging(LOG_LEVEL)
+    validate_config()
+    try:
+        asyncio.run(worker_main(metrics_port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_logging()
+
+def main():
+    """Spawn N monitor worker processes on this host"""
+    parser = argparse.ArgumentParser(description="ShadowPrice sharded monitor workers")
+    parser.add_argument('--workers', type=int, default=MONITOR_WORKERS, help="number of worker processes")
+    parser.add_argument('--metrics-port', type=int, default=0,
+                        help="first metrics port, worker i listens on port + i (0 disables)")
+    args = parser.parse_args()
+
+    processes = []
+    for index in range(args.workers):
+        metrics_port = args.metrics_port + index if args.metrics_port else 0
+        process = multiprocessing.Process(target=run_worker, args=(metrics_port,))
+        process.start()
+        processes.append(process)
+    # Forward SIGTERM so every worker runs its graceful shutdown
+    signal.signal(signal.SIGTERM, lambda signum, frame: [process.terminate() for process in processes])
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.join()
+
+if __name__ == "__main__":
+    main()
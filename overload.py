@@ -0,0 +1,84 @@
+import asyncio
+import logging
+from config import (
+    CHECK_INTERVAL, OVERLOAD_QUEUE_DEPTH, OVERLOAD_ENTER, OVERLOAD_EXIT, OVERLOAD_RECOVER_TICKS, OVERLOAD_SLOW_EVERY
+)
+from metrics import OVERLOAD_LEVEL, OVERLOAD_TRANSITIONS
+
+logger = logging.getLogger(__name__)
+
+# Load-shedding stages; each one keeps the measures of the stages below it
+LEVELS = ('normal', 'shed_cold_auto_alerts', 'slow_far_tickers', 'pause_broadcasts')
+
+class OverloadController:
+    """Staged load shedding driven by tick duration and send queue depth.
+
+    A pressured tick raises the level by one stage, OVERLOAD_RECOVER_TICKS
+    calm ticks in a row lower it by one, so the monitor degrades and
+    recovers gradually instead of flapping. Threshold alerts are never
+    dropped, only slowed: at stage 2 tickers far from every threshold are
+    fetched on every OVERLOAD_SLOW_EVERY-th tick only.
+    """
+
+    def __init__(self, interval: float = CHECK_INTERVAL, queue_limit: int = OVERLOAD_QUEUE_DEPTH):
+        self.interval = interval
+        self.queue_limit = queue_limit
+        self.level = 0
+        self.pressure = 0.0
+        self.calm_ticks = 0
+        self.ticks = 0
+        self.broadcasts_allowed = asyncio.Event()
+        self.broadcasts_allowed.set()
+        OVERLOAD_LEVEL.set(0)
+
+    @property
+    def name(self) -> str:
+        return LEVELS[self.level]
+
+    @property
+    def shed_cold_auto_alerts(self) -> bool:
+        return self.level >= 1
+
+    @property
+    def slow_far_tickers(self) -> bool:
+        return self.level >= 2
+
+    @property
+    def refresh_tick(self) -> bool:
+        """Shed tickers are fetched on every OVERLOAD_SLOW_EVERY-th tick so their state stays current"""
+        return self.ticks % OVERLOAD_SLOW_EVERY == 0
+
+    def observe(self, tick_seconds: float, queue_depth: int) -> int:
+        """Account one finished tick and return the level for the next one"""
+        self.ticks += 1
+        self.pressure = max(tick_seconds / self.interval, queue_depth / self.queue_limit)
+        if self.pressure >= OVERLOAD_ENTER:
+            self.calm_ticks = 0
+            if self.level < len(LEVELS) - 1:
+                self._set_level(self.level + 1, tick_seconds, queue_depth)
+        elif self.pressure < OVERLOAD_EXIT:
+            self.calm_ticks += 1
+            if self.level and self.calm_ticks >= OVERLOAD_RECOVER_TICKS:
+                self.calm_ticks = 0
+                self._set_level(self.level - 1, tick_seconds, queue_depth)
+        else:
+            self.calm_ticks = 0
+        return self.level
+
+    def _set_level(self, level: int, tick_seconds: float, queue_depth: int):
+        raised = level > self.level
+        self.level = level
+        OVERLOAD_LEVEL.set(level)
+        OVERLOAD_TRANSITIONS.inc(level=self.name)
+        if level >= 3:
+            self.broadcasts_allowed.clear()
+        else:
+            self.broadcasts_allowed.set()
+        log = logger.warning if raised else logger.info
+        log("Overload level %s", "raised" if raised else "lowered",
+            extra={'level': self.name, 'pressure': round(self.pressure, 2),
+                   'tick_seconds': round(tick_seconds, 2), 'queue_depth': queue_depth})
+
+    async def wait_broadcasts_allowed(self):
+        """Block a broadcast between pages while broadcasts are paused"""
+        await self.broadcasts_allowed.wait()
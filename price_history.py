@@ -0,0 +1,57 @@
+import re
+from typing import List, Optional, Tuple
+from config import DARK_EMOJIS, PRICE_HISTORY_RETENTION
+
+# Range suffix -> seconds
+RANGE_UNITS = {'m': 60, 'h': 3600, 'd': 86400, 'w': 7 * 86400, 'y': 365 * 86400}
+DEFAULT_RANGE = '24h'
+SPARK_BLOCKS = '▁▂▃▄▅▆▇█'
+SPARK_WIDTH = 24
+
+def parse_range(text: str) -> Optional[int]:
+    """'90m', '24h', '7d', '2w', '1y' -> seconds (None if invalid or beyond retention)"""
+    match = re.fullmatch(r'(\d+)([mhdwy])', text.strip().lower())
+    if not match:
+        return None
+    seconds = int(match.group(1)) * RANGE_UNITS[match.group(2)]
+    if not seconds or seconds > max(PRICE_HISTORY_RETENTION.values()):
+        return None
+    return seconds
+
+def pick_resolution(seconds: int) -> int:
+    """Finest resolution that still covers the range and keeps the bar count reasonable"""
+    for resolution in sorted(PRICE_HISTORY_RETENTION):
+        if seconds <= PRICE_HISTORY_RETENTION[resolution] and seconds // resolution <= 1500:
+            return resolution
+    return max(PRICE_HISTORY_RETENTION)
+
+def sparkline(values: List[float], width: int = SPARK_WIDTH) -> str:
+    """Downsample `values` to `width` points and draw them with block characters"""
+    if len(values) > width:
+        step = len(values) / width
+        values = [values[min(len(values) - 1, int((i + 1) * step) - 1)] for i in range(width)]
+    low, high = min(values), max(values)
+    if high == low:
+        return SPARK_BLOCKS[len(SPARK_BLOCKS) // 2] * len(values)
+    scale = (len(SPARK_BLOCKS) - 1) / (high - low)
+    return ''.join(SPARK_BLOCKS[round((value - low) * scale)] for value in values)
+
+def render_history(ticker: str, range_text: str, bars: List[Tuple]) -> Optional[str]:
+    """Build the /history message from (bucket, open, high, low, close) bars"""
+    if not bars:
+        return None
+    first_price = bars[0][1]
+    last_price = bars[-1][4]
+    high = max(bar[2] for bar in bars)
+    low = min(bar[3] for bar in bars)
+    change = (last_price - first_price) / first_price * 100 if first_price else 0.0
+    trend = DARK_EMOJIS['up'] if change >= 0 else DARK_EMOJIS['down']
+    return (
+        f"{DARK_EMOJIS['coin']} **{ticker} — last {range_text}**\n\n"
+        f"`{sparkline([bar[4] for bar in bars])}`\n\n"
+        f"{trend} Change: **{change:+.2f}%**\n"
+        f"💰 Now: **${last_price:,.2f}**\n"
+        f"⬆️ High: ${high:,.2f}\n"
+        f"⬇️ Low: ${low:,.2f}\n\n"
+        f"{DARK_EMOJIS['shadow']} *Local history, {len(bars)} bars*"
+    )
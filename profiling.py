@@ -0,0 +1,117 @@
+import cProfile
+import json
+import logging
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Optional
+from config import PROFILE_DIR
+from metrics import TICK_STAGE_DURATION
+
+logger = logging.getLogger(__name__)
+
+@contextmanager
+def stage(stages: Dict[str, float], name: str):
+    """Add the duration of the block to stages[name]"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stages[name] = stages.get(name, 0.0) + time.perf_counter() - started
+
+def observe_stages(stages: Dict[str, float]):
+    for name, seconds in stages.items():
+        TICK_STAGE_DURATION.observe(seconds, stage=name)
+
+class Capture:
+    """One profiled run: CPU profile plus allocation snapshots"""
+
+    def __init__(self, kind: str, index: int, started_tracemalloc: bool):
+        self.kind = kind
+        self.index = index
+        self.started_tracemalloc = started_tracemalloc
+        self.profile = cProfile.Profile()
+        self.snapshot_before = tracemalloc.take_snapshot()
+        self.started = time.perf_counter()
+        self.profile.enable()
+
+class Profiler:
+    """On-demand profiling of the next N monitor ticks or handler calls.
+
+    Writes `<kind>-<timestamp>-<n>.prof` (cProfile/pstats, e.g. for snakeviz),
+    `.tracemalloc` (tracemalloc.Snapshot.dump) and `.json` (stage breakdown
+    and top allocation growth) to PROFILE_DIR.
+    """
+
+    def __init__(self, output_dir: str = PROFILE_DIR):
+        self.output_dir = output_dir
+        self.remaining = {'tick': 0, 'handler': 0}
+        self.active: Optional[Capture] = None
+        self.session = ''
+        self.counter = 0
+
+    def arm(self, kind: str, count: int):
+        """Profile the next `count` runs of `kind` ('tick' or 'handler')"""
+        if kind not in self.remaining:
+            raise ValueError(f"unknown profiling target: {kind}")
+        self.remaining[kind] = count
+        self.session = time.strftime('%Y%m%d-%H%M%S')
+        self.counter = 0
+        logger.info("Profiling armed", extra={'kind': kind, 'count': count, 'dir': self.output_dir})
+
+    def begin(self, kind: str) -> Optional[Capture]:
+        """Start a capture if `kind` is armed (cheap no-op otherwise)"""
+        if not self.remaining.get(kind) or self.active:
+            # Only one cProfile can be active per thread
+            return None
+        self.remaining[kind] -= 1
+        self.counter += 1
+        started_tracemalloc = not tracemalloc.is_tracing()
+        if started_tracemalloc:
+            tracemalloc.start(10)
+        self.active = Capture(kind, self.counter, started_tracemalloc)
+        return self.active
+
+    def end(self, capture: Capture, stages: Optional[Dict[str, float]] = None, label: str = ''):
+        """Stop a capture and write its files"""
+        capture.profile.disable()
+        elapsed = time.perf_counter() - capture.started
+        try:
+            snapshot_after = tracemalloc.take_snapshot()
+            os.makedirs(self.output_dir, exist_ok=True)
+            base = os.path.join(self.output_dir, f"{capture.kind}-{self.session}-{capture.index}")
+            capture.profile.dump_stats(f"{base}.prof")
+            snapshot_after.dump(f"{base}.tracemalloc")
+            growth = snapshot_after.compare_to(capture.snapshot_before, 'lineno')[:20]
+            with open(f"{base}.json", 'w') as f:
+                json.dump({
+                    'kind': capture.kind,
+                    'label': label,
+                    'elapsed_seconds': elapsed,
+                    'stages_seconds': stages or {},
+                    'top_allocations': [str(stat) for stat in growth],
+                }, f, indent=2)
+            logger.info("Profile written", extra={'path': base, 'elapsed': round(elapsed, 4)})
+        except Exception as e:
+            logger.error("Error writing profile: %s", e)
+        finally:
+            if capture.started_tracemalloc:
+                tracemalloc.stop()
+            self.active = None
+
+profiler = Profiler()
+
+class ProfilingMiddleware:
+    """aiogram outer middleware profiling armed handler calls"""
+
+    async def __call__(self, handler, event, data):
+        capture = profiler.begin('handler')
+        if capture is None:
+            return await handler(event, data)
+        stages = {}
+        try:
+            with stage(stages, 'handler'):
+                return await handler(event, data)
+        finally:
+            profiler.end(capture, stages, label=type(event).__name__)
@@ -0,0 +1,49 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+from alert_record import AlertRecord
+from config import MAX_ALERTS_PER_USER, MAX_TICKERS_PER_USER, PRICE_BATCH_SIZE
+
+def quota_error(usage: Dict[str, int], ticker: str) -> Optional[Tuple[str, str]]:
+    """(reason, message) if a user with `usage` ({ticker: armed alerts}) may not add an alert for `ticker`"""
+    if MAX_ALERTS_PER_USER and sum(usage.values()) >= MAX_ALERTS_PER_USER:
+        return 'alerts', (f"You already have {MAX_ALERTS_PER_USER} active alerts, the maximum. "
+                          f"Delete some before adding new ones.")
+    if MAX_TICKERS_PER_USER and ticker not in usage and len(usage) >= MAX_TICKERS_PER_USER:
+        return 'tickers', (f"You already follow {MAX_TICKERS_PER_USER} different coins, the maximum. "
+                           f"Add alerts for those coins or delete one first.")
+    return None
+
+def ticker_fetch_cost(ticker: str, coin_ids: Dict) -> float:
+    """Upstream requests per tick spent on one ticker.
+
+    Tickers with a CoinGecko id share a batched /simple/price request; the
+    others need a Binance request of their own (and a /search retry whenever
+    the cached miss expires).
+    """
+    cached = coin_ids.get(ticker)
+    if cached and cached[1]:
+        return 1 / PRICE_BATCH_SIZE
+    return 1.0
+
+def user_costs(alerts: Iterable[AlertRecord], user_coins: Dict[int, List[str]], coin_ids: Dict) -> Dict[int, Dict[str, float]]:
+    """Monitor cost per user: armed alerts, distinct tickers and their share of upstream requests per tick.
+
+    A ticker's fetch cost is split evenly between the users following it, so
+    a coin nobody else watches is charged in full to its only follower.
+    """
+    followers: Dict[str, set] = {}
+    alert_counts: Dict[int, int] = {}
+    for alert in alerts:
+        followers.setdefault(alert.coin_ticker, set()).add(alert.user_id)
+        alert_counts[alert.user_id] = alert_counts.get(alert.user_id, 0) + 1
+    for user_id, coins in user_coins.items():
+        for coin in coins:
+            followers.setdefault(coin, set()).add(user_id)
+
+    costs: Dict[int, Dict[str, float]] = {}
+    for ticker, users in followers.items():
+        share = ticker_fetch_cost(ticker, coin_ids) / len(users)
+        for user_id in users:
+            cost = costs.setdefault(user_id, {'alerts': alert_counts.get(user_id, 0), 'tickers': 0, 'requests': 0.0})
+            cost['tickers'] += 1
+            cost['requests'] += share
+    return costs
@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+from aiogram.exceptions import TelegramRetryAfter
+from config import SEND_RATE_LIMIT, SEND_CONCURRENCY
+from metrics import SEND_QUEUE_DEPTH, MESSAGES_SENT, TELEGRAM_ERRORS
+
+logger = logging.getLogger(__name__)
+
+class RateLimiter:
+    """Spaces out operations to at most `rate` per second"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate
+        self.next_slot = 0.0
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            now = time.monotonic()
+            wait = self.next_slot - now
+            self.next_slot = max(now, self.next_slot) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+class NotificationSender:
+    """Rate-limited concurrent Telegram sender backed by a queue"""
+
+    def __init__(self, bot, rate: float = SEND_RATE_LIMIT, concurrency: int = SEND_CONCURRENCY):
+        self.bot = bot
+        self.concurrency = concurrency
+        self.limiter = RateLimiter(rate)
+        self.queue: Optional[asyncio.Queue] = None
+        self.workers = []
+        self.sent_count = 0
+        self.error_count = 0
+        self.accepting = True
+        SEND_QUEUE_DEPTH.set_function(lambda: self.queue_depth)
+
+    @property
+    def queue_depth(self) -> int:
+        return self.queue.qsize() if self.queue else 0
+
+    def start(self):
+        """Start the worker tasks (done lazily on first submit)"""
+        if self.workers:
+            return
+        self.queue = asyncio.Queue()
+        self.workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    def submit(self, chat_id: int, text: str, **kwargs) -> asyncio.Future:
+        """Queue a message, the returned future resolves to True when it was delivered.
+
+        The future is cancelled when the message was never attempted because
+        the sender shut down (after `drain`).
+        """
+        future = asyncio.get_running_loop().create_future()
+        if not self.accepting:
+            future.cancel()
+            return future
+        self.start()
+        self.queue.put_nowait((chat_id, text, kwargs, future))
+        return future
+
+    async def send(self, chat_id: int, text: str, **kwargs) -> bool:
+        """Queue a message and wait until it is delivered"""
+        return await self.submit(chat_id, text, **kwargs)
+
+    async def _worker(self):
+        while True:
+            chat_id, text, kwargs, future = await self.queue.get()
+            try:
+                delivered = await self._deliver(chat_id, text, kwargs)
+                if not future.done():
+                    future.set_result(delivered)
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            finally:
+                self.queue.task_done()
+
+    async def _deliver(self, chat_id: int, text: str, kwargs: dict) -> bool:
+        for attempt in range(3):
+            await self.limiter.acquire()
+            try:
+                await self.bot.send_message(chat_id=chat_id, text=text, **kwargs)
+                self.sent_count += 1
+                MESSAGES_SENT.inc()
+                return True
+            except TelegramRetryAfter as e:
+                TELEGRAM_ERRORS.inc(error=type(e).__name__)
+                # Flood control: back off as long as Telegram asks
+                await asyncio.sleep(e.retry_after)
+            except Exception as e:
+                TELEGRAM_ERRORS.inc(error=type(e).__name__)
+                logger.warning("Error sending message: %s", e, extra={'user_id': chat_id})
+                break
+        self.error_count += 1
+        return False
+
+    async def drain(self, timeout: float):
+        """Stop accepting messages and deliver the queued ones within `timeout` seconds"""
+        self.accepting = False
+        if self.queue and self.workers:
+            pending = self.queue_depth
+            try:
+                await asyncio.wait_for(self.queue.join(), timeout)
+                logger.info("Send queue drained", extra={'messages': pending})
+            except asyncio.TimeoutError:
+                logger.warning("Send queue not drained in time", extra={'left': self.queue_depth})
+        await self.stop()
+
+    async def stop(self):
+        """Cancel the worker tasks and the futures of messages still queued"""
+        for worker in self.workers:
+            worker.cancel()
+        if self.workers:
+            await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+        while self.queue and not self.queue.empty():
+            _, _, _, future = self.queue.get_nowait()
+            future.cancel()
@@ -0,0 +1,76 @@
+import asyncio
+import hashlib
+import logging
+import os
+import socket
+import time
+from typing import List, Optional
+from database import Database
+from config import WORKER_HEARTBEAT_INTERVAL, WORKER_TTL
+
+logger = logging.getLogger(__name__)
+
+class ShardCoordinator:
+    """Ticker partitioning between monitor workers sharing one SQLite database.
+
+    Every worker heartbeats into the `monitor_workers` table. The set of live
+    workers is the shard map: a ticker belongs to the live worker with the
+    highest rendezvous hash for it, so a worker joining or leaving only moves
+    the tickers it gains or loses.
+    """
+
+    def __init__(self, db: Database, worker_id: Optional[str] = None):
+        self.db = db
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.workers: List[str] = [self.worker_id]
+        self.is_running = False
+
+    @staticmethod
+    def _weight(worker_id: str, ticker: str) -> int:
+        """Stable rendezvous weight (same in every process and host)"""
+        digest = hashlib.md5(f"{worker_id}|{ticker}".encode()).digest()
+        return int.from_bytes(digest[:8], 'big')
+
+    def owner_of(self, ticker: str) -> str:
+        """Return the worker that owns a ticker"""
+        ticker = ticker.upper()
+        return max(self.workers, key=lambda worker_id: self._weight(worker_id, ticker))
+
+    def owns(self, ticker: str) -> bool:
+        """Check if this worker is responsible for a ticker"""
+        return self.owner_of(ticker) == self.worker_id
+
+    def join(self):
+        """Register this worker and load the current membership"""
+        self.db.heartbeat_worker(self.worker_id, int(time.time()))
+        self.refresh()
+
+    def leave(self):
+        """Unregister this worker so the others take over its tickers"""
+        self.is_running = False
+        self.db.remove_worker(self.worker_id)
+
+    def refresh(self) -> bool:
+        """Reload live workers, return True if the shard map changed"""
+        now = int(time.time())
+        self.db.prune_workers(now - WORKER_TTL)
+        workers = self.db.get_live_workers(now - WORKER_TTL)
+        if self.worker_id not in workers:
+            # Our heartbeat may have been pruned after a stall - re-register
+            self.db.heartbeat_worker(self.worker_id, now)
+            workers = sorted(workers + [self.worker_id])
+        changed = workers != self.workers
+        if changed:
+            logger.info("Shard rebalance", extra={'worker_id': self.worker_id, 'live_workers': len(workers)})
+        self.workers = workers
+        return changed
+
+    async def run_heartbeat(self):
+        """Send heartbeats in the background while the worker is alive"""
+        self.is_running = True
+        while self.is_running:
+            try:
+                self.db.heartbeat_worker(self.worker_id, int(time.time()))
+            except Exception as e:
+                logger.error("Heartbeat error: %s", e, extra={'worker_id': self.worker_id})
+            await asyncio.sleep(WORKER_HEARTBEAT_INTERVAL)
@@ -0,0 +1,87 @@
+import asyncio
+import inspect
+import logging
+import signal
+import time
+from typing import Callable, List, Tuple
+from config import SHUTDOWN_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+class ShutdownCoordinator:
+    """Ordered shutdown steps run once, on a signal or when the app exits.
+
+    Every step is bounded by what is left of the overall deadline; a step that
+    fails or times out is logged and the remaining steps still run, so state
+    is always flushed before the process exits.
+    """
+
+    def __init__(self, timeout: float = SHUTDOWN_TIMEOUT):
+        self.timeout = timeout
+        self.steps: List[Tuple[str, Callable, tuple]] = []
+        self.requested = asyncio.Event()
+        self.finished = False
+
+    def add_step(self, name: str, func: Callable, *args):
+        """Append a step (sync function or coroutine function)"""
+        self.steps.append((name, func, args))
+
+    def install_signal_handlers(self, signals=(signal.SIGTERM, signal.SIGINT)):
+        loop = asyncio.get_running_loop()
+        for sig in signals:
+            try:
+                loop.add_signal_handler(sig, self.request, sig.name)
+            except (NotImplementedError, AttributeError):
+                pass
+
+    def request(self, reason: str = 'requested'):
+        if not self.requested.is_set():
+            logger.info("Shutdown requested", extra={'reason': reason})
+            self.requested.set()
+
+    async def wait(self):
+        await self.requested.wait()
+
+    async def run(self):
+        """Run all steps in order (only the first call does anything)"""
+        if self.finished:
+            return
+        self.finished = True
+        self.requested.set()
+        deadline = time.monotonic() + self.timeout
+        for name, func, args in self.steps:
+            started = time.perf_counter()
+            try:
+                result = func(*args)
+                if inspect.isawaitable(result):
+                    await asyncio.wait_for(result, max(0.1, deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                logger.warning("Shutdown step timed out", extra={'step': name})
+            except Exception as e:
+                logger.error("Shutdown step %s failed: %s", name, e)
+            logger.debug("Shutdown step done", extra={'step': name, 'seconds': round(time.perf_counter() - started, 3)})
+        logger.info("Shutdown complete")
+
+class InFlightMiddleware:
+    """aiogram outer middleware counting updates being handled, so shutdown can wait for them"""
+
+    def __init__(self):
+        self.in_flight = 0
+        self.idle = asyncio.Event()
+        self.idle.set()
+
+    async def __call__(self, handler, event, data):
+        self.in_flight += 1
+        self.idle.clear()
+        try:
+            return await handler(event, data)
+        finally:
+            self.in_flight -= 1
+            if not self.in_flight:
+                self.idle.set()
+
+    async def wait_idle(self, timeout: float):
+        try:
+            await asyncio.wait_for(self.idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Handlers still running at shutdown", extra={'in_flight': self.in_flight})
@@ -0,0 +1,41 @@
+import asyncio
+import inspect
+import logging
+import time
+from typing import Dict
+from metrics import STARTUP_PHASE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Reference point for "time since start" measurements (time-to-ready, time-to-first-alert)
+PROCESS_STARTED = time.monotonic()
+
+class StartupSequence:
+    """Named, timed startup phases and a readiness flag"""
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+        self.ready = asyncio.Event()
+
+    def record(self, name: str, seconds: float):
+        self.timings[name] = seconds
+        STARTUP_PHASE_SECONDS.set(seconds, phase=name)
+
+    async def phase(self, name: str, func, *args):
+        """Run one phase (sync function or coroutine function) and time it"""
+        started = time.perf_counter()
+        try:
+            result = func(*args)
+            if inspect.isawaitable(result):
+                result = await result
+            return result
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def mark_ready(self):
+        """Report per-phase timings and flag the process as ready to serve"""
+        self.record('time_to_ready', time.monotonic() - PROCESS_STARTED)
+        logger.info("Startup complete", extra={name: round(seconds, 3) for name, seconds in self.timings.items()})
+        self.ready.set()
+
+startup = StartupSequence()
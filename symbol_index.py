@@ -0,0 +1,119 @@
+import bisect
+import difflib
+import gzip
+import json
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+from config import COIN_LIST_PATH, COIN_LIST_MAX_AGE
+
+logger = logging.getLogger(__name__)
+
+class SymbolIndex:
+    """In-memory index of CoinGecko symbols and names.
+
+    Both are kept as sorted arrays, so membership and prefix lookups are
+    binary searches; it is built from a cached `/coins/list` snapshot and
+    never touches the network itself.
+    """
+
+    def __init__(self):
+        self.symbols: List[str] = []  # sorted, upper case
+        self.names: List[Tuple[str, str]] = []  # sorted (lower case name, symbol)
+        self.symbol_names: Dict[str, str] = {}
+        self.symbol_ids: Dict[str, List[str]] = {}
+        self.loaded_at = 0.0
+
+    @property
+    def is_loaded(self) -> bool:
+        return bool(self.symbols)
+
+    def build(self, coins: List[Dict]):
+        """Build the index from /coins/list entries ({id, symbol, name})"""
+        symbol_ids: Dict[str, List[str]] = {}
+        symbol_names: Dict[str, str] = {}
+        for coin in coins:
+            symbol = (coin.get('symbol') or '').upper()
+            if not symbol:
+                continue
+            symbol_ids.setdefault(symbol, []).append(coin['id'])
+            symbol_names.setdefault(symbol, coin.get('name') or symbol)
+        self.symbol_ids = symbol_ids
+        self.symbol_names = symbol_names
+        self.symbols = sorted(symbol_ids)
+        self.names = sorted((name.lower(), symbol) for symbol, name in symbol_names.items())
+        self.loaded_at = time.time()
+
+    def contains(self, symbol: str) -> bool:
+        symbol = symbol.upper()
+        i = bisect.bisect_left(self.symbols, symbol)
+        return i < len(self.symbols) and self.symbols[i] == symbol
+
+    def coin_id(self, symbol: str) -> Optional[str]:
+        """CoinGecko id when the symbol is unambiguous (otherwise let /search rank it)"""
+        ids = self.symbol_ids.get(symbol.upper())
+        return ids[0] if ids and len(ids) == 1 else None
+
+    def name(self, symbol: str) -> str:
+        return self.symbol_names.get(symbol.upper(), symbol.upper())
+
+    def prefix(self, query: str, limit: int = 20) -> List[str]:
+        """Symbols starting with `query`, then symbols whose name starts with it"""
+        query = query.strip()
+        if not query:
+            return []
+        results: List[str] = []
+        upper = query.upper()
+        i = bisect.bisect_left(self.symbols, upper)
+        while i < len(self.symbols) and self.symbols[i].startswith(upper) and len(results) < limit:
+            results.append(self.symbols[i])
+            i += 1
+        lower = query.lower()
+        i = bisect.bisect_left(self.names, (lower, ''))
+        while i < len(self.names) and self.names[i][0].startswith(lower) and len(results) < limit:
+            if self.names[i][1] not in results:
+                results.append(self.names[i][1])
+            i += 1
+        return results
+
+    def suggest(self, query: str, limit: int = 3) -> List[str]:
+        """Close matches for a mistyped symbol"""
+        query = query.upper()
+        # Only symbols of similar length can be close matches
+        candidates = [symbol for symbol in self.symbols if abs(len(symbol) - len(query)) <= 1]
+        return difflib.get_close_matches(query, candidates, n=limit, cutoff=0.6)
+
+    def load_snapshot(self, path: str = COIN_LIST_PATH) -> bool:
+        """Load the cached coin list, return True if it exists (fresh or not)"""
+        if not os.path.exists(path):
+            return False
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                coins = json.load(f)
+            self.build(coins)
+            self.loaded_at = os.path.getmtime(path)
+            logger.info("Symbol index loaded", extra={'symbols': len(self.symbols), 'path': path})
+            return True
+        except (OSError, ValueError) as e:
+            logger.warning("Could not load coin list snapshot: %s", e)
+            return False
+
+    def is_stale(self, max_age: int = COIN_LIST_MAX_AGE) -> bool:
+        return time.time() - self.loaded_at > max_age
+
+    async def refresh(self, crypto_api, path: str = COIN_LIST_PATH) -> bool:
+        """Download /coins/list, rebuild the index and cache it on disk"""
+        coins = await crypto_api.get_coin_list()
+        if not coins:
+            return False
+        self.build(coins)
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump([{'id': c['id'], 'symbol': c['symbol'], 'name': c['name']} for c in coins], f,
+                      separators=(',', ':'))
+        os.replace(tmp_path, path)
+        logger.info("Symbol index refreshed", extra={'symbols': len(self.symbols)})
+        return True
+
+symbol_index = SymbolIndex()
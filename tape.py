@@ -0,0 +1,71 @@
+import gzip
+import json
+import random
+from typing import Dict, Iterator, List, Optional, Tuple
+from config import PRICE_TAPE_FLUSH_INTERVAL
+
+Frame = Tuple[int, Dict[str, float]]
+
+class TapeWriter:
+    """Appends per-tick price snapshots to a gzip-compressed JSON-lines tape.
+
+    Each line is `[timestamp, tickers, prices]`; `tickers` is only written
+    when the ticker set changed since the previous line (null otherwise), and
+    `prices` lists the prices in that ticker order. Reopening an existing tape
+    appends a new gzip member, which readers see as one stream.
+
+    Frames are flushed every `flush_interval` seconds of tape time and on
+    close: every flush forces a sync block and costs compression, so a
+    crash loses at most the last interval.
+    """
+
+    def __init__(self, path: str, flush_interval: int = PRICE_TAPE_FLUSH_INTERVAL):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.file = None
+        self.tickers: Optional[List[str]] = None
+        self.flushed_at = 0
+
+    def write(self, timestamp: int, prices: Dict[str, float]):
+        if self.file is None:
+            self.file = gzip.open(self.path, 'at', encoding='utf-8', compresslevel=6)
+            self.flushed_at = timestamp
+        tickers = sorted(ticker for ticker, price in prices.items() if price is not None)
+        header = tickers if tickers != self.tickers else None
+        self.tickers = tickers
+        self.file.write(json.dumps([timestamp, header, [prices[ticker] for ticker in tickers]],
+                                   separators=(',', ':')) + '\n')
+        if timestamp - self.flushed_at >= self.flush_interval:
+            self.file.flush()
+            self.flushed_at = timestamp
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+def read_tape(path: str) -> Iterator[Frame]:
+    """Yield (timestamp, {ticker: price}) frames of a tape in recorded order"""
+    tickers: List[str] = []
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        try:
+            for line in f:
+                try:
+                    timestamp, header, values = json.loads(line)
+                except ValueError:
+                    break  # Truncated last line
+                if header is not None:
+                    tickers = header
+                yield timestamp, dict(zip(tickers, values))
+        except EOFError:
+            pass  # Tape is still being written
+
+def synthetic_tape(tickers: Dict[str, float], ticks: int, start: int = 0, interval: int = 60,
+                   volatility: float = 0.01, seed: int = 42) -> Iterator[Frame]:
+    """Random-walk frames from the given start prices"""
+    rng = random.Random(seed)
+    prices = dict(tickers)
+    for index in range(ticks):
+        for ticker, price in prices.items():
+            prices[ticker] = max(1e-6, price * (1 + rng.gauss(0, volatility)))
+        yield start + index * interval, dict(prices)
@@ -0,0 +1,20 @@
+import os
+import sys
+
+import pytest
+
+# Modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """Database on a fresh file"""
+    import database
+    monkeypatch.setattr(database, 'DATABASE_PATH', str(tmp_path / 'bot.db'))
+    return database.Database()
+
+@pytest.fixture
+def db_path(db):
+    """Path of the fresh database file, with the schema in place"""
+    import database
+    return database.DATABASE_PATH
@@ -0,0 +1,92 @@
+import pytest
+from alert_index import AlertIndex
+from alert_record import AlertRecord
+
+def trailing(alert_id, peak, percent=5.0, ticker='BTC'):
+    return AlertRecord(alert_id, 1, ticker, 'trailing', percent, base_price=peak, peak_price=peak)
+
+def percent(alert_id, base, percent=10.0, ticker='BTC'):
+    return AlertRecord(alert_id, 1, ticker, 'percent', percent, base_price=base)
+
+def fired(index, price, ticker='BTC'):
+    return sorted((alert.id, reference) for alert, _, reference in index.evaluate({ticker: price}))
+
+@pytest.mark.parametrize('order', [(1, 2), (2, 1)])
+def test_trailing_peaks_do_not_depend_on_insertion_order(order):
+    alerts = {1: trailing(1, 100.0), 2: trailing(2, 92.0)}
+    index = AlertIndex()
+    for alert_id in order:
+        index.add(alerts[alert_id])
+    ticker = index.tickers['BTC']
+    assert ticker.peak_of(1) == 100.0
+    assert ticker.peak_of(2) == 92.0
+    # 5% under 100 fires A; B's stop is 87.4
+    assert fired(index, 91.0) == [(1, 100.0)]
+    assert fired(index, 87.0) == [(2, 92.0)]
+
+def test_equal_peaks_share_a_group():
+    index = AlertIndex()
+    index.add(trailing(1, 100.0, percent=5.0))
+    index.add(trailing(2, 100.0, percent=2.0))
+    ticker = index.tickers['BTC']
+    assert len(ticker.groups) == 1
+    assert fired(index, 97.0) == [(2, 100.0)]
+    assert fired(index, 95.0) == [(1, 100.0)]
+
+def test_price_raises_and_merges_lower_peaks():
+    index = AlertIndex()
+    index.add(trailing(1, 100.0))
+    index.add(trailing(2, 92.0))
+    index.add(trailing(3, 120.0, percent=20.0))
+    assert fired(index, 110.0) == []
+    ticker = index.tickers['BTC']
+    assert ticker.peak_of(1) == ticker.peak_of(2) == 110.0
+    assert ticker.peak_of(3) == 120.0
+    assert fired(index, 104.0) == [(1, 110.0), (2, 110.0)]
+    assert fired(index, 96.0) == [(3, 120.0)]
+
+def test_percent_alert_fires_once_on_either_bound():
+    index = AlertIndex()
+    index.add(percent(1, 100.0))
+    index.add(percent(2, 100.0))
+    assert fired(index, 105.0) == []
+    assert fired(index, 111.0) == [(1, 111.0), (2, 111.0)]
+    assert fired(index, 85.0) == []
+    assert len(index) == 0
+
+def test_tickers_and_currencies_are_separate():
+    index = AlertIndex()
+    index.add(trailing(1, 100.0))
+    index.add(trailing(2, 100.0, ticker='ETH'))
+    index.add(trailing(3, 100.0).replace(currency='eur'))
+    assert sorted(index.tickers) == ['BTC', 'BTC/EUR', 'ETH']
+    assert fired(index, 90.0) == [(1, 100.0)]
+
+def test_sync_adds_removes_and_skips_fired():
+    index = AlertIndex()
+    index.sync([trailing(1, 100.0), trailing(2, 100.0)])
+    assert fired(index, 95.0) == [(1, 100.0), (2, 100.0)]
+    # Still listed until the DB marks them: not re-added
+    index.sync([trailing(1, 100.0), trailing(2, 100.0), trailing(3, 100.0)])
+    assert len(index) == 1
+    index.sync([])
+    assert len(index) == 0 and not index.fired
+
+def test_compact_keeps_peaks_and_order():
+    index = AlertIndex()
+    index.add(trailing(1, 100.0))
+    index.add(trailing(2, 92.0))
+    fired(index, 96.0)
+    index.remove(1)
+    index.compact()
+    assert index.tickers['BTC'].peak_of(2) == 96.0
+    assert fired(index, 91.0) == [(2, 96.0)]
+
+def test_checkpoint_returns_moved_peaks_once():
+    index = AlertIndex()
+    index.add(trailing(1, 100.0))
+    index.add(trailing(2, 130.0))
+    assert index.checkpoint_peaks() == []
+    fired(index, 110.0)
+    assert index.checkpoint_peaks() == [(110.0, 1)]
+    assert index.checkpoint_peaks() == []
@@ -0,0 +1,81 @@
+import json
+import pytest
+from alert_io import dump_alerts, parse_alert_row, parse_alerts_file
+from alert_record import UserAlertRecord
+
+NOW = 1_700_000_000
+
+def parse(text, filename='alerts.csv'):
+    return parse_alerts_file(text.encode('utf-8'), filename, NOW)
+
+def test_csv_rows_and_defaults():
+    rows, errors = parse("ticker,type,value\nbtc,above,\"30,000\"\neth,percent,5%\n")
+    assert errors == []
+    assert [(row['ticker'], row['type'], row['value'], row['currency'], row['once'], row['line']) for row in rows] == [
+        ('BTC', 'above', 30000.0, 'usd', False, 2),
+        ('ETH', 'percent', 5.0, 'usd', True, 3),
+    ]
+
+def test_json_list_or_alerts_object():
+    items = [{'ticker': 'BTC', 'type': 'below', 'value': 20000, 'currency': 'EUR', 'expires_at': '24h'}]
+    for payload in (items, {'alerts': items}):
+        rows, errors = parse(json.dumps(payload), 'alerts.json')
+        assert errors == []
+        assert rows[0]['currency'] == 'eur'
+        assert rows[0]['expires_at'] == NOW + 86400
+        assert rows[0]['once']
+
+@pytest.mark.parametrize('item, reason', [
+    ({'ticker': 'B', 'type': 'above', 'value': '1'}, 'bad ticker'),
+    ({'ticker': 'BTC', 'type': 'sideways', 'value': '1'}, 'type must be'),
+    ({'ticker': 'BTC', 'type': 'above', 'value': '-1'}, 'positive'),
+    ({'ticker': 'BTC', 'type': 'percent', 'value': '150'}, 'between 0 and 100'),
+    ({'ticker': 'BTC', 'type': 'percent', 'value': '5', 'currency': 'eur'}, 'USD only'),
+    ({'ticker': 'BTC', 'type': 'above', 'value': '1', 'currency': 'jpy'}, 'unsupported currency'),
+    ({'ticker': 'BTC', 'type': 'above', 'value': '1', 'expires_at': str(NOW - 1)}, 'already expired'),
+    ({'ticker': 'BTC', 'type': 'above', 'value': 'nan'}, 'finite'),
+    ({'ticker': 'BTC', 'type': 'below', 'value': 'inf'}, 'finite'),
+    ({'ticker': 'BTC', 'type': 'percent', 'value': '5', 'base_price': 'inf'}, 'finite'),
+    ({'ticker': 'BTC', 'type': 'above', 'value': '1', 'expires_at': 'inf'}, 'finite'),
+])
+def test_invalid_rows(item, reason):
+    with pytest.raises(ValueError, match=reason):
+        parse_alert_row(item, NOW)
+
+def test_trailing_base_price_is_ignored():
+    for base in ('1e9', 'inf', '95'):
+        row = parse_alert_row({'ticker': 'BTC', 'type': 'trailing', 'value': '5', 'base_price': base}, NOW)
+        assert row['base_price'] is None
+
+def test_bad_rows_are_reported_per_line():
+    rows, errors = parse("ticker,type,value\nBTC,above,1\nBTC,above,nan\nETH,below,x\n")
+    assert [row['line'] for row in rows] == [2]
+    assert [error.split(':')[0] for error in errors] == ['line 3', 'line 4']
+
+@pytest.mark.parametrize('data', [b'\xff\xfe\x00garbage', b'[{"ticker": '])
+def test_unreadable_file(data):
+    rows, errors = parse_alerts_file(data, 'alerts.json', NOW)
+    assert rows == []
+    assert errors[0].startswith('Unreadable file')
+
+def alert(alert_id, threshold_type, value, **fields):
+    return UserAlertRecord(alert_id, 1, 'BTC', threshold_type, value, **fields)
+
+@pytest.mark.parametrize('fmt', ['csv', 'json'])
+def test_export_import_round_trip(fmt):
+    alerts = [
+        alert(1, 'above', 30000.0, currency='eur'),
+        alert(2, 'percent', 5.0, base_price=25000.0, one_shot=1),
+        alert(3, 'trailing', 3.0, base_price=25000.0, peak_price=1e9, one_shot=1, expires_at=NOW + 3600),
+        alert(4, 'below', 20000.0, triggered_at=NOW - 10),  # fired: not exported
+        alert(5, 'below', 20000.0, expires_at=NOW),  # expired: not exported
+    ]
+    rows, errors = parse_alerts_file(dump_alerts(alerts, fmt, NOW), f'alerts.{fmt}', NOW)
+    assert errors == []
+    assert [(row['type'], row['value'], row['currency'], row['base_price'], row['once'], row['expires_at'])
+            for row in rows] == [
+        ('above', 30000.0, 'eur', None, False, None),
+        ('percent', 5.0, 'usd', 25000.0, True, None),
+        # The stale peak is not carried over
+        ('trailing', 3.0, 'usd', None, True, NOW + 3600),
+    ]
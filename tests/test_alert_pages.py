@@ -0,0 +1,64 @@
+import sqlite3
+
+PAGE = 4
+
+def add_alerts(db, user_id, count, created_at=None):
+    db.add_user(user_id, 'user', 'User')
+    for index in range(count):
+        db.add_alert(user_id, f'C{index}', 'above', 1.0 + index)
+    if created_at:
+        # Spread creation times over a few seconds, several alerts per second
+        with sqlite3.connect(db.db_path) as conn:
+            conn.execute("UPDATE alerts SET created_at = datetime(?, '+' || ((id - 1) / 3) || ' seconds') WHERE user_id = ?",
+                         (created_at, user_id))
+
+def position(alert):
+    return alert.created_at, alert.id
+
+def walk_forward(db, user_id):
+    pages, last = [], None
+    while True:
+        page = db.get_user_alerts_page(user_id, PAGE, last)
+        if not page:
+            return pages
+        pages.append([alert.id for alert in page])
+        last = position(page[-1])
+
+def test_first_page_is_newest(db):
+    add_alerts(db, 1, 10, created_at='2024-01-01 00:00:00')
+    page = db.get_user_alerts_page(1, PAGE)
+    assert [alert.id for alert in page] == [10, 9, 8, 7]
+    assert page[0].created_at == '2024-01-01 00:00:03'
+
+def test_forward_pages_cover_every_alert_once(db):
+    add_alerts(db, 1, 10, created_at='2024-01-01 00:00:00')
+    add_alerts(db, 2, 3)
+    assert walk_forward(db, 1) == [[10, 9, 8, 7], [6, 5, 4, 3], [2, 1]]
+
+def test_equal_created_at_breaks_ties_by_id(db):
+    add_alerts(db, 1, 9)  # Same second for all of them
+    assert walk_forward(db, 1) == [[9, 8, 7, 6], [5, 4, 3, 2], [1]]
+
+def test_backward_returns_the_previous_page_newest_first(db):
+    add_alerts(db, 1, 10, created_at='2024-01-01 00:00:00')
+    second = db.get_user_alerts_page(1, PAGE, position(db.get_user_alerts_page(1, PAGE)[-1]))
+    third = db.get_user_alerts_page(1, PAGE, position(second[-1]))
+    assert [alert.id for alert in third] == [2, 1]
+    second = db.get_user_alerts_page(1, PAGE, position(third[0]), backward=True)
+    assert [alert.id for alert in second] == [6, 5, 4, 3]
+    first = db.get_user_alerts_page(1, PAGE, position(second[0]), backward=True)
+    assert [alert.id for alert in first] == [10, 9, 8, 7]
+    assert db.get_user_alerts_page(1, PAGE, position(first[0]), backward=True) == []
+
+def test_pages_only_show_the_owner(db):
+    add_alerts(db, 1, 2)
+    add_alerts(db, 2, 2)
+    assert {alert.user_id for alert in db.get_user_alerts_page(2, PAGE)} == {2}
+
+def test_bulk_delete_only_removes_own_alerts(db):
+    add_alerts(db, 1, 5)
+    add_alerts(db, 2, 2)
+    assert db.delete_user_alerts(1, [1, 3, 6, 99]) == [1, 3]
+    assert sorted(alert.id for alert in db.get_user_alerts(1)) == [2, 4, 5]
+    assert len(db.get_user_alerts(2)) == 2
+    assert db.delete_user_alerts(1, []) == []
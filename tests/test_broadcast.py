@@ -0,0 +1,70 @@
+import asyncio
+import time
+from broadcast import BroadcastPipeline
+
+class FakeQuotes:
+    """CryptoAPI stand-in serving fixed quotes keyed by price_key()"""
+
+    def __init__(self, quotes):
+        self.quotes = quotes
+        self.calls = []
+
+    async def get_quotes(self, tickers, currencies):
+        self.calls.append((sorted(tickers), sorted(currencies)))
+        return dict(self.quotes)
+
+class RecordingSender:
+    def __init__(self):
+        self.messages = {}
+
+    def submit(self, user_id, text, parse_mode=None):
+        self.messages[user_id] = text
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(True)
+        return future
+
+def run_broadcast(db, quotes):
+    api, sender = FakeQuotes(quotes), RecordingSender()
+    pipeline = BroadcastPipeline(db, api, sender, page_size=1)
+    run = {'id': db.create_broadcast_run(0), 'cursor_user_id': 0, 'sent': 0, 'failed': 0}
+    result = asyncio.run(pipeline.run(run))
+    return result, api, sender
+
+def test_non_usd_alerts_are_broadcast(db):
+    db.add_user(1, 'user', 'User')
+    db.add_user(2, 'other', 'Other')
+    db.add_alert(1, 'BTC', 'above', 30000.0, currency='eur')
+    db.add_alert(2, 'ETH', 'below', 1500.0)
+    result, api, sender = run_broadcast(db, {'BTC': 27000.0, 'BTC/EUR': 25000.0, 'ETH': 1600.0})
+    # One batched request for every ticker and currency in use
+    assert api.calls == [(['BTC', 'ETH'], ['eur', 'usd'])]
+    assert result['sent'] == 2
+    assert 'BTC: 25,000.00€' in sender.messages[1]
+    assert 'ETH: 1,600.00$' in sender.messages[2]
+
+def test_fresh_monitor_snapshot_is_reused_with_currency_keys(db):
+    class Monitor:
+        last_prices = {'BTC': 27000.0, 'BTC/EUR': 25000.0}
+        last_prices_time = time.time()
+
+    db.add_user(1, 'user', 'User')
+    db.add_alert(1, 'BTC', 'above', 30000.0, currency='eur')
+    api, sender = FakeQuotes({}), RecordingSender()
+    pipeline = BroadcastPipeline(db, api, sender, monitor=Monitor())
+    assert asyncio.run(pipeline.take_snapshot()) == {'BTC/EUR': 25000.0}
+    assert api.calls == []
+
+def test_fired_and_expired_alerts_are_not_broadcast(db):
+    db.add_user(1, 'user', 'User')
+    db.add_user(2, 'other', 'Other')
+    db.add_alert(1, 'BTC', 'above', 20000.0, one_shot=True)
+    db.add_alert(1, 'ETH', 'below', 1500.0, expires_at=int(time.time()) - 10)
+    db.add_alert(1, 'SOL', 'above', 200.0)
+    db.add_alert(2, 'BTC', 'below', 10000.0, one_shot=True)
+    db.mark_alerts_triggered([1, 4], int(time.time()))  # Both one-shot BTC alerts fired
+    page = db.get_alerts_page_by_user(0, 10)
+    # User 2 has nothing armed and takes no slot of the page
+    assert {user_id: [alert.coin_ticker for alert in alerts] for user_id, alerts in page.items()} == {1: ['SOL']}
+    result, _, sender = run_broadcast(db, {'BTC': 27000.0, 'ETH': 1600.0, 'SOL': 150.0})
+    assert result['sent'] == 1
+    assert 'CROSSED' not in sender.messages[1]
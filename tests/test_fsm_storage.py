@@ -0,0 +1,85 @@
+import asyncio
+import sqlite3
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import StorageKey
+
+from fsm_storage import SQLiteStorage
+
+KEY = StorageKey(bot_id=1, chat_id=42, user_id=42)
+
+
+def run(db_path, scenario):
+    """Run a scenario against a fresh storage and close it afterwards"""
+    async def main():
+        storage = SQLiteStorage(db_path, cache_ttl=60, flush_interval=60)
+        try:
+            return await scenario(storage)
+        finally:
+            await storage.close()
+    return asyncio.run(main())
+
+
+def test_state_and_data_round_trip(db_path):
+    async def scenario(storage):
+        await storage.set_state(KEY, State('AlertForm:price'))
+        await storage.set_data(KEY, {'ticker': 'BTC'})
+        return await storage.get_state(KEY), await storage.get_data(KEY)
+
+    assert run(db_path, scenario) == ('AlertForm:price', {'ticker': 'BTC'})
+
+
+def test_update_data_merges_and_keeps_state(db_path):
+    async def scenario(storage):
+        await storage.set_state(KEY, 'AlertForm:price')
+        await storage.set_data(KEY, {'ticker': 'BTC', 'currency': 'usd'})
+        merged = await storage.update_data(KEY, {'currency': 'eur', 'price': 25000.0})
+        return merged, await storage.get_state(KEY)
+
+    merged, state = run(db_path, scenario)
+    assert merged == {'ticker': 'BTC', 'currency': 'eur', 'price': 25000.0}
+    assert state == 'AlertForm:price'
+
+
+def test_returned_data_is_a_copy(db_path):
+    async def scenario(storage):
+        await storage.set_data(KEY, {'ticker': 'BTC'})
+        (await storage.get_data(KEY))['ticker'] = 'ETH'
+        return await storage.get_data(KEY)
+
+    assert run(db_path, scenario) == {'ticker': 'BTC'}
+
+
+def test_close_flushes_pending_writes(db_path):
+    async def write(storage):
+        await storage.set_state(KEY, 'AlertForm:price')
+        await storage.update_data(KEY, {'ticker': 'BTC'})
+
+    async def read(storage):
+        return await storage.get_state(KEY), await storage.get_data(KEY)
+
+    run(db_path, write)
+    assert run(db_path, read) == ('AlertForm:price', {'ticker': 'BTC'})
+
+
+def test_cleared_key_is_deleted_on_flush(db_path):
+    async def write(storage):
+        await storage.set_state(KEY, 'AlertForm:price')
+        await storage.set_data(KEY, {'ticker': 'BTC'})
+        storage.flush()
+        await storage.set_state(KEY, None)
+        await storage.set_data(KEY, {})
+
+    run(db_path, write)
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute('SELECT COUNT(*) FROM fsm_states').fetchone()[0] == 0
+
+
+def test_other_keys_are_independent(db_path):
+    other = StorageKey(bot_id=1, chat_id=7, user_id=7)
+
+    async def scenario(storage):
+        await storage.set_state(KEY, 'AlertForm:price')
+        return await storage.get_state(other), await storage.get_data(other)
+
+    assert run(db_path, scenario) == (None, {})
@@ -0,0 +1,76 @@
+import gzip
+import json
+import os
+from monitor_state import MonitorState, SNAPSHOT_VERSION
+
+NOW = 1_700_000_000
+
+def filled_state():
+    state = MonitorState(history_window=900, cooldown=1800)
+    state.mark_triggered(1)
+    state.mark_triggered(2)
+    state.start_cooldown(10, 'BTC', NOW - 100)
+    state.start_cooldown(11, 'ETH', NOW - 2000)  # Already finished
+    state.add_prices({'BTC': 100.0, 'ETH': 10.0}, NOW - 1000)  # Leaves the window
+    state.add_prices({'BTC': 101.0, 'ETH': 11.0}, NOW - 600)
+    state.add_prices({'BTC': 102.0, 'ETH': 12.0}, NOW)
+    return state
+
+def test_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / 'state.snapshot')
+    filled_state().save_snapshot(path, NOW)
+    restored = MonitorState(history_window=900, cooldown=1800)
+    assert restored.load_snapshot(path, NOW + 60, max_age=3600) == 1
+    assert restored.triggered == {1, 2}
+    assert restored.cooldowns == {(10, 'BTC'): NOW - 100}
+    assert list(restored.history['BTC']) == [(NOW - 600, 101.0), (NOW, 102.0)]
+    assert restored.price_change('BTC', NOW + 60, 600) == (101.0, 102.0)
+
+def test_stale_or_old_format_snapshots_are_discarded(tmp_path):
+    old = str(tmp_path / 'state.snapshot')
+    filled_state().save_snapshot(old, NOW - 7200)
+    other = str(tmp_path / 'state.snapshot.worker')
+    with gzip.open(other, 'wt', encoding='utf-8') as f:
+        json.dump({'v': SNAPSHOT_VERSION + 1, 'saved_at': NOW, 'triggered': [3]}, f)
+    state = MonitorState()
+    assert state.load_snapshot(str(tmp_path / 'state.snapshot*'), NOW, max_age=3600, own_path=old) == 0
+    assert not state.triggered
+    # Only this worker's own file is removed; other workers' files are left alone
+    assert not os.path.exists(old) and os.path.exists(other)
+
+def test_stale_snapshots_of_other_workers_are_kept(tmp_path):
+    other = str(tmp_path / 'state.snapshot.worker')
+    filled_state().save_snapshot(other, NOW - 7200)
+    unrelated = tmp_path / 'state.snapshot.bak'
+    unrelated.write_bytes(b'not gzip')
+    pattern = str(tmp_path / 'state.snapshot*')
+    assert MonitorState().load_snapshot(pattern, NOW, max_age=3600, own_path=str(tmp_path / 'state.snapshot.me')) == 0
+    assert os.path.exists(other) and unrelated.exists()
+
+def test_unreadable_snapshot_is_skipped(tmp_path):
+    (tmp_path / 'state.snapshot').write_bytes(b'not gzip')
+    assert MonitorState().load_snapshot(str(tmp_path / 'state.snapshot'), NOW, max_age=3600) == 0
+
+def test_worker_snapshots_are_merged(tmp_path):
+    first, second = MonitorState(), MonitorState()
+    first.mark_triggered(1)
+    first.start_cooldown(10, 'BTC', NOW - 300)
+    second.mark_triggered(2)
+    second.start_cooldown(10, 'BTC', NOW - 100)
+    first.save_snapshot(str(tmp_path / 'state.snapshot.a'), NOW)
+    second.save_snapshot(str(tmp_path / 'state.snapshot.b'), NOW)
+    merged = MonitorState()
+    assert merged.load_snapshot(str(tmp_path / 'state.snapshot*'), NOW, max_age=3600) == 2
+    assert merged.triggered == {1, 2}
+    # The latest cooldown start wins
+    assert merged.cooldowns == {(10, 'BTC'): NOW - 100}
+
+def test_expire_and_retain_keep_state_bounded():
+    state = filled_state()
+    state.retain_alerts([2, 3])
+    assert state.triggered == {2}
+    state.expire(NOW, followed_tickers=['BTC'])
+    assert state.cooldowns == {(10, 'BTC'): NOW - 100}
+    assert set(state.history) == {'BTC'}
+    stats = state.stats()
+    assert (stats['evicted_triggered'], stats['evicted_cooldowns'], stats['evicted_history']) == (1, 1, 1)
@@ -0,0 +1,40 @@
+import quotas
+from alert_record import AlertRecord
+
+def alert(alert_id, user_id, ticker):
+    return AlertRecord(alert_id, user_id, ticker, 'above', 1.0)
+
+def test_alert_limit(monkeypatch):
+    monkeypatch.setattr(quotas, 'MAX_ALERTS_PER_USER', 3)
+    assert quotas.quota_error({'BTC': 2}, 'BTC') is None
+    reason, _ = quotas.quota_error({'BTC': 2, 'ETH': 1}, 'BTC')
+    assert reason == 'alerts'
+
+def test_ticker_limit_only_for_new_tickers(monkeypatch):
+    monkeypatch.setattr(quotas, 'MAX_ALERTS_PER_USER', 0)
+    monkeypatch.setattr(quotas, 'MAX_TICKERS_PER_USER', 2)
+    usage = {'BTC': 5, 'ETH': 1}
+    assert quotas.quota_error(usage, 'ETH') is None
+    assert quotas.quota_error(usage, 'SOL')[0] == 'tickers'
+
+def test_zero_disables_limits(monkeypatch):
+    monkeypatch.setattr(quotas, 'MAX_ALERTS_PER_USER', 0)
+    monkeypatch.setattr(quotas, 'MAX_TICKERS_PER_USER', 0)
+    assert quotas.quota_error({f'C{i}': 100 for i in range(100)}, 'NEW') is None
+
+def test_fetch_cost_by_source(monkeypatch):
+    monkeypatch.setattr(quotas, 'PRICE_BATCH_SIZE', 100)
+    coin_ids = {'BTC': (0.0, 'bitcoin'), 'XYZ': (0.0, None)}
+    assert quotas.ticker_fetch_cost('BTC', coin_ids) == 0.01
+    assert quotas.ticker_fetch_cost('XYZ', coin_ids) == 1.0
+    assert quotas.ticker_fetch_cost('NEW', coin_ids) == 1.0
+
+def test_user_costs_split_shared_tickers(monkeypatch):
+    monkeypatch.setattr(quotas, 'PRICE_BATCH_SIZE', 100)
+    coin_ids = {'BTC': (0.0, 'bitcoin')}
+    alerts = [alert(1, 1, 'BTC'), alert(2, 1, 'BTC'), alert(3, 2, 'XYZ')]
+    costs = quotas.user_costs(alerts, {2: ['BTC'], 3: ['BTC']}, coin_ids)
+    assert costs[1] == {'alerts': 2, 'tickers': 1, 'requests': 0.01 / 3}
+    assert costs[2]['alerts'] == 1 and costs[2]['tickers'] == 2
+    assert costs[2]['requests'] == 1.0 + 0.01 / 3
+    assert costs[3] == {'alerts': 0, 'tickers': 1, 'requests': 0.01 / 3}
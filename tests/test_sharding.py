@@ -0,0 +1,63 @@
+import database
+from monitor_state import MonitorState
+from sharding import ShardCoordinator
+
+NOW = 1_700_000_000
+
+def test_rendezvous_ownership_moves_only_lost_tickers(db):
+    shard = ShardCoordinator(db, worker_id='a')
+    tickers = [f'C{index}' for index in range(200)]
+    shard.workers = ['a', 'b']
+    before = {ticker: shard.owner_of(ticker) for ticker in tickers}
+    assert set(before.values()) == {'a', 'b'}
+    shard.workers = ['a', 'b', 'c']
+    after = {ticker: shard.owner_of(ticker) for ticker in tickers}
+    assert all(after[ticker] in (before[ticker], 'c') for ticker in tickers)
+
+def test_reads_are_filtered_by_ticker(db, monkeypatch):
+    monkeypatch.setattr(database, 'TICKER_FILTER_CHUNK', 2)
+    for user_id in (1, 2):
+        db.add_user(user_id, 'user', 'User')
+    for ticker in ('BTC', 'ETH', 'SOL'):
+        db.add_alert(1, ticker, 'above', 1.0)
+    db.set_auto_alert(2, 'ETH', True)
+    db.set_auto_alert(2, 'DOGE', True)
+    db.set_auto_alert(2, 'ADA', False)
+    assert sorted(db.get_followed_tickers()) == ['BTC', 'DOGE', 'ETH', 'SOL']
+    assert sorted(alert.coin_ticker for alert in db.get_all_alerts(['BTC', 'SOL', 'DOGE'])) == ['BTC', 'SOL']
+    assert db.get_all_alerts([]) == []
+    assert len(db.get_all_alerts()) == 3
+    assert db.get_enabled_auto_alerts() == {2: ['DOGE', 'ETH']}
+    assert db.get_enabled_auto_alerts(['BTC', 'ETH']) == {2: ['ETH']}
+
+def test_state_changes_are_handed_over(db):
+    previous = MonitorState(cooldown=1800)
+    previous.track_changes()
+    previous.mark_triggered(1)
+    previous.mark_triggered(2)
+    previous.clear_triggered(2)
+    previous.start_cooldown(10, 'BTC', NOW - 100)
+    previous.start_cooldown(11, 'ETH', NOW - 50)
+    previous.clear_cooldown(11, 'ETH')  # Notification dropped at shutdown
+    db.save_monitor_handover(*previous.take_changes())
+    assert previous.take_changes() == ({}, {})
+
+    owner = MonitorState(cooldown=1800)
+    triggered, cooldowns = db.get_monitor_handover(NOW - 1800)
+    owner.merge_dict({'triggered': triggered, 'cooldowns': cooldowns}, NOW)
+    assert owner.triggered == {1}
+    assert owner.cooldowns == {(10, 'BTC'): NOW - 100}
+
+def test_untracked_state_records_nothing():
+    state = MonitorState()
+    state.mark_triggered(1)
+    state.start_cooldown(10, 'BTC', NOW)
+    assert state.take_changes() == ({}, {})
+
+def test_handover_pruning(db):
+    db.add_user(1, 'user', 'User')
+    db.add_alert(1, 'BTC', 'above', 1.0)
+    alert_id = db.get_user_alerts(1)[0].id
+    db.save_monitor_handover({alert_id: True, alert_id + 1: True}, {(1, 'BTC'): NOW - 3600, (1, 'ETH'): NOW})
+    assert db.prune_monitor_handover(NOW - 1800) == 2
+    assert db.get_monitor_handover(0) == ([alert_id], [(1, 'ETH', NOW)])
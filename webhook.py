@@ -0,0 +1,73 @@
+import asyncio
+import hmac
+import logging
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from config import WEBHOOK_PATH, WEBHOOK_SECRET, WEBHOOK_CONCURRENCY
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+class WebhookServer:
+    """aiohttp endpoint feeding Telegram webhook updates into the dispatcher.
+
+    Requests are answered as soon as the update is accepted; at most
+    `concurrency` updates are processed at once, further requests wait for a
+    free slot (Telegram keeps them queued on its side meanwhile).
+    """
+
+    def __init__(self, dp: Dispatcher, bot: Bot, secret: str = WEBHOOK_SECRET,
+                 concurrency: int = WEBHOOK_CONCURRENCY, path: str = WEBHOOK_PATH):
+        self.dp = dp
+        self.bot = bot
+        self.secret = secret
+        self.path = path
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.tasks = set()
+        self.is_accepting = True
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post(self.path, self.handle_update)
+        app.router.add_get('/healthz', self.handle_health)
+        return app
+
+    async def handle_health(self, request: web.Request) -> web.Response:
+        return web.json_response({'status': 'ok', 'in_flight': len(self.tasks)})
+
+    async def handle_update(self, request: web.Request) -> web.Response:
+        if self.secret and not hmac.compare_digest(request.headers.get(SECRET_HEADER, ''), self.secret):
+            return web.Response(status=401)
+        if not self.is_accepting:
+            # Shutting down: Telegram redelivers the update to another instance later
+            return web.Response(status=503)
+        try:
+            update = Update.model_validate(await request.json(), context={'bot': self.bot})
+        except Exception as e:
+            logger.warning("Invalid update payload: %s", e)
+            return web.Response(status=400)
+
+        await self.semaphore.acquire()
+        task = asyncio.create_task(self._process(update))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return web.Response()
+
+    async def _process(self, update: Update):
+        try:
+            await self.dp.feed_update(self.bot, update)
+        except Exception as e:
+            logger.exception("Error processing update %s: %s", update.update_id, e)
+        finally:
+            self.semaphore.release()
+
+    async def start(self, host: str, port: int) -> web.AppRunner:
+        runner = web.AppRunner(self.make_app())
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        logger.info("Webhook server listening", extra={'host': host, 'port': port, 'path': self.path})
+        if not self.secret:
+            logger.warning("Webhook secret is not set, updates are accepted from anyone who can reach %s", self.path)
+        return runner